@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark di carico per start_server.py
+
+Simula N analisti che aprono la dashboard in parallelo: ogni client scarica
+tutti gli asset reali (index.html, CSS, JS e i CSV in data/results/) per un
+certo numero di giri. Alla fine stampa richieste/secondo e latenze p50/p99
+per ogni modalita' del server.
+
+Uso:
+    python benchmark_server.py                       # confronta single e thread
+    python benchmark_server.py --mode thread --clients 32 --rounds 10
+    python benchmark_server.py --encoding gzip       # come un browser con Accept-Encoding
+    python benchmark_server.py --revalidate          # dal 2o giro manda If-None-Match
+"""
+
+import argparse
+import functools
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import start_server
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CSV_DASHBOARD = [
+    "data/results/anomalies_temporal_v2.csv",
+    "data/results/cluster_profiles_v2.csv",
+]
+
+class QuietHandler(start_server.MyHTTPRequestHandler):
+    # niente log per ogni richiesta, altrimenti misuro la velocita' del terminale
+    def log_message(self, format, *args):
+        pass
+
+def asset_dashboard():
+    """Lista degli asset che il browser scarica aprendo index.html."""
+    with open(os.path.join(ROOT, "index.html"), encoding="utf-8") as f:
+        html = f.read()
+    percorsi = ["index.html"]
+    for rif in re.findall(r'(?:src|href)="([^"]+)"', html):
+        if rif.startswith(("http://", "https://", "//")):
+            continue  # D3 arriva dalla CDN, non dal nostro server
+        percorsi.append(rif.split("?")[0])
+    percorsi += CSV_DASHBOARD
+    return [p for p in percorsi if os.path.exists(os.path.join(ROOT, p))]
+
+def percentile(valori, p):
+    if not valori:
+        return 0.0
+    ordinati = sorted(valori)
+    k = min(len(ordinati) - 1, max(0, int(round(p / 100 * len(ordinati))) - 1))
+    return ordinati[k]
+
+def esegui(mode, workers, clients, rounds, asset, encoding=None, revalidate=False):
+    handler = functools.partial(QuietHandler, directory=ROOT)
+    server = start_server.crea_server(mode, 0, workers, handler=handler)
+    port = server.server_address[1]
+    thread_server = threading.Thread(target=server.serve_forever, daemon=True)
+    thread_server.start()
+
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    latenze = []
+    byte_totali = [0]
+    errori = [0]
+    lock = threading.Lock()
+
+    def client():
+        locali, nbyte, nerr = [], 0, 0
+        etags = {}  # come la cache del browser: percorso -> ETag visto
+        for _ in range(rounds):
+            for percorso in asset:
+                h = dict(headers)
+                if revalidate and percorso in etags:
+                    h['If-None-Match'] = etags[percorso]
+                t0 = time.perf_counter()
+                try:
+                    req = urllib.request.Request(f"http://127.0.0.1:{port}/{percorso}", headers=h)
+                    with urllib.request.urlopen(req) as r:
+                        nbyte += len(r.read())
+                        if r.headers.get('ETag'):
+                            etags[percorso] = r.headers['ETag']
+                except urllib.error.HTTPError as e:
+                    if e.code != 304:
+                        nerr += 1
+                        continue
+                except OSError:
+                    nerr += 1
+                    continue
+                locali.append(time.perf_counter() - t0)
+        with lock:
+            latenze.extend(locali)
+            byte_totali[0] += nbyte
+            errori[0] += nerr
+
+    t_inizio = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    durata = time.perf_counter() - t_inizio
+
+    server.shutdown()
+    server.server_close()
+
+    return {
+        "mode": mode,
+        "richieste": len(latenze),
+        "errori": errori[0],
+        "durata": durata,
+        "req_s": len(latenze) / durata if durata else 0.0,
+        "p50_ms": percentile(latenze, 50) * 1000,
+        "p99_ms": percentile(latenze, 99) * 1000,
+        "mb": byte_totali[0] / 1e6,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark di carico per start_server.py")
+    parser.add_argument('--mode', choices=start_server.MODI + ('all',), default='all')
+    parser.add_argument('--workers', type=int, default=start_server.WORKERS)
+    parser.add_argument('--clients', type=int, default=16, help="client concorrenti")
+    parser.add_argument('--rounds', type=int, default=5, help="caricamenti completi per client")
+    parser.add_argument('--encoding', default=None,
+                        help="valore di Accept-Encoding da inviare (es. 'gzip, br')")
+    parser.add_argument('--revalidate', action='store_true',
+                        help="simula la cache del browser: If-None-Match con l'ETag ricevuto")
+    args = parser.parse_args(argv)
+
+    asset = asset_dashboard()
+    print(f"Asset dashboard: {len(asset)} file")
+    for p in asset:
+        print(f"   {p}")
+    print(f"Client: {args.clients}  Giri: {args.rounds}  Worker: {args.workers}  "
+          f"Accept-Encoding: {args.encoding or '-'}  Rivalidazione: {'si' if args.revalidate else 'no'}\n")
+
+    modi = start_server.MODI if args.mode == 'all' else (args.mode,)
+    print(f"{'modo':<8} {'richieste':>9} {'errori':>6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'MB':>8}")
+    for mode in modi:
+        r = esegui(mode, args.workers, args.clients, args.rounds, asset, args.encoding,
+                   args.revalidate)
+        print(f"{r['mode']:<8} {r['richieste']:>9} {r['errori']:>6} {r['req_s']:>9.1f} "
+              f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['mb']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
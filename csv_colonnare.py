@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Conversione di anomalies_temporal_v2.csv in un formato binario colonnare
+
+Il browser, invece di fare il parsing del CSV e convertire ogni cella in JS,
+mappa direttamente i buffer in Float32Array / Int32Array.
+
+Layout del file (tutto little-endian):
+    [uint32 lunghezza header][header JSON UTF-8][padding a 4 byte][colonne...]
+
+L'header contiene il numero di righe e, per ogni colonna, nome, tipo e offset
+assoluto del suo buffer (sempre allineato a 4 byte):
+    float32  ->  rows x float32
+    int32    ->  rows x int32   (insider, cluster, week; float32 se hanno celle NaN/inf
+                                 o non intere, es. 2.5: non le tronco)
+    dict     ->  rows x int32 (codici) + "dictionary": lista dei valori stringa
+
+Uso:
+    python csv_colonnare.py                                   # percorsi di default
+    python csv_colonnare.py input.csv output.bin
+"""
+
+import csv
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+
+CSV_DEFAULT = "data/results/anomalies_temporal_v2.csv"
+BIN_DEFAULT = "data/anomalies.bin"
+VERSIONE = 1
+
+# stesse regole di DataLoader.loadData: queste restano stringhe, queste sono interi
+COLONNE_STRINGA = {'user_id', 'role', 'b_unit', 'f_unit', 'dept', 'team', 'ITAdmin', 'timestamp'}
+COLONNE_INTERE = {'insider', 'cluster', 'week'}
+
+def numero(valore):
+    """Come `+valore` in JS: stringa vuota = 0, None se non e' un numero."""
+    valore = valore.strip()
+    if valore == '':
+        return 0.0
+    try:
+        return float(valore)
+    except ValueError:
+        return None
+
+def chiave_filtro(valore):
+    """Valore confrontabile: i numeri come float ("3" == "3.0"), il resto come testo."""
+    testo = str(valore).strip()
+    n = numero(testo) if testo else None
+    return n if n is not None else testo
+
+def condizioni_filtro(nomi, filtro, percorso_csv=''):
+    """filtro = {colonna: valore o lista di valori} -> [(indice colonna, chiavi ammesse)]."""
+    indice = {nome: j for j, nome in enumerate(nomi)}
+    condizioni = []
+    for nome, valori in (filtro or {}).items():
+        if nome not in indice:
+            raise ValueError(f"colonna del filtro non trovata in {percorso_csv}: {nome}")
+        if not isinstance(valori, (list, tuple, set)):
+            valori = [valori]
+        condizioni.append((indice[nome], {chiave_filtro(v) for v in valori}))
+    return condizioni
+
+def rispetta(riga, condizioni):
+    """True se la riga passa tutte le condizioni di condizioni_filtro."""
+    return all(chiave_filtro(riga[j]) in ammessi for j, ammessi in condizioni)
+
+def _allinea(n):
+    return (n + 3) & ~3
+
+def inferisci_tipi(percorso_csv):
+    """Prima passata: decide il tipo di ogni colonna. Ritorna (nomi, tipi, righe)."""
+    with open(percorso_csv, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        nomi = next(reader)
+        numeriche = [n not in COLONNE_STRINGA for n in nomi]
+        # solo valori finiti e interi: le colonne intere possono restare int32
+        intere = [True] * len(nomi)
+        righe = 0
+        for riga in reader:
+            righe += 1
+            # campi oltre l'header: li ignoro (anche converti li scarta)
+            for j, valore in enumerate(riga[:len(nomi)]):
+                if not numeriche[j]:
+                    continue
+                n = numero(valore)
+                if n is None:
+                    numeriche[j] = False
+                elif not math.isfinite(n) or not n.is_integer():
+                    intere[j] = False
+    tipi = []
+    for nome, numerica, intera in zip(nomi, numeriche, intere):
+        if not numerica:
+            tipi.append('dict')
+        elif nome in COLONNE_INTERE and intera:
+            tipi.append('int32')
+        else:
+            tipi.append('float32')
+    return nomi, tipi, righe
+
+def converti(percorso_csv):
+    """Converte il CSV nel formato colonnare e ritorna i byte del file."""
+    nomi, tipi, righe = inferisci_tipi(percorso_csv)
+
+    # seconda passata: riempio un buffer per colonna
+    buffer = [array('f') if t == 'float32' else array('i') for t in tipi]
+    dizionari = [{} if t == 'dict' else None for t in tipi]
+    with open(percorso_csv, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for riga in reader:
+            for j, tipo in enumerate(tipi):
+                valore = riga[j] if j < len(riga) else ''
+                if tipo == 'float32':
+                    buffer[j].append(numero(valore))
+                elif tipo == 'int32':
+                    buffer[j].append(int(numero(valore)))
+                else:
+                    codici = dizionari[j]
+                    codice = codici.get(valore)
+                    if codice is None:
+                        codice = codici[valore] = len(codici)
+                    buffer[j].append(codice)
+
+    for b in buffer:
+        if sys.byteorder != 'little':
+            b.byteswap()
+
+    # header con offset assoluti: lo serializzo finche' la sua lunghezza non si stabilizza
+    colonne = []
+    for nome, tipo, diz in zip(nomi, tipi, dizionari):
+        col = {'name': nome, 'type': tipo, 'offset': 0}
+        if tipo == 'dict':
+            col['dictionary'] = list(diz)
+        colonne.append(col)
+    header = {'version': VERSIONE, 'rows': righe, 'columns': colonne}
+
+    inizio_dati = 0
+    while True:
+        offset = inizio_dati
+        for col in colonne:
+            col['offset'] = offset
+            offset += righe * 4
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        nuovo_inizio = _allinea(4 + len(header_bytes))
+        if nuovo_inizio == inizio_dati:
+            break
+        inizio_dati = nuovo_inizio
+
+    parti = [struct.pack('<I', len(header_bytes)), header_bytes,
+             b'\0' * (inizio_dati - 4 - len(header_bytes))]
+    parti += [b.tobytes() for b in buffer]
+    return b''.join(parti)
+
+def scrivi(percorso_csv=CSV_DEFAULT, percorso_bin=BIN_DEFAULT):
+    dati = converti(percorso_csv)
+    os.makedirs(os.path.dirname(percorso_bin) or '.', exist_ok=True)
+    # scrivo su un file temporaneo e poi rinomino: chi legge non vede mai un file a meta'
+    tmp = f"{percorso_bin}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(dati)
+    os.replace(tmp, percorso_bin)
+    return len(dati)
+
+def aggiorna(percorso_csv=CSV_DEFAULT, percorso_bin=BIN_DEFAULT):
+    """Rigenera il .bin solo se manca o e' piu' vecchio del CSV. True se l'ha riscritto."""
+    if not os.path.exists(percorso_csv):
+        return False
+    if os.path.exists(percorso_bin) and os.path.getmtime(percorso_bin) >= os.path.getmtime(percorso_csv):
+        return False
+    scrivi(percorso_csv, percorso_bin)
+    return True
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    percorso_csv = argv[0] if len(argv) > 0 else CSV_DEFAULT
+    percorso_bin = argv[1] if len(argv) > 1 else BIN_DEFAULT
+    if not os.path.exists(percorso_csv):
+        sys.exit(f"ERRORE: {percorso_csv} non trovato")
+    n = scrivi(percorso_csv, percorso_bin)
+    print(f"Salvato: {percorso_bin}  ({n / 1e6:.2f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Genera molti deck in parallelo a partire da un manifest JSON.
+
+Ogni job del manifest indica i CSV di ingresso, un filtro opzionale sulle righe
+del CSV temporale e il file di uscita:
+
+    [
+      {"temporal": "data/results/anomalies_temporal_v2.csv",
+       "profili":  "data/results/cluster_profiles_v2.csv",
+       "filtro":   {"cluster": [0, 1]},
+       "top":      200,
+       "out":      "_docs/deck_cluster_01.pptx"},
+      {"filtro": {"week": 3}, "out": "_docs/deck_settimana_3.pptx"}
+    ]
+
+(va bene anche {"jobs": [...]}). I percorsi relativi partono dalla cartella del
+manifest; se mancano "temporal" o "profili" uso i CSV di default di genera_ppt.py.
+"top" (opzionale) aggiunge la tabella dei top N utenti per rischio;
+"grafici": false toglie i grafici renderizzati (vedi grafici_deck.py).
+
+I job girano in un pool di processi: ogni processo costruisce il template della
+presentazione una volta sola (initializer) e lo riusa per tutti i suoi deck.
+Alla fine stampa il tempo di ogni deck e il totale.
+
+Uso:
+    python genera_batch.py manifest.json
+    python genera_batch.py manifest.json --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import genera_ppt
+
+# template del processo corrente (lo riempie _init_worker)
+_TEMPLATE = None
+
+def _init_worker():
+    global _TEMPLATE
+    _TEMPLATE = genera_ppt.crea_template()
+
+def leggi_manifest(percorso):
+    """Lista di job con i percorsi gia' risolti rispetto alla cartella del manifest."""
+    with open(percorso, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if isinstance(manifest, dict):
+        manifest = manifest.get("jobs", [])
+    base = os.path.dirname(os.path.abspath(percorso))
+
+    def risolvi(p):
+        return p if os.path.isabs(p) else os.path.join(base, p)
+
+    jobs = []
+    for i, job in enumerate(manifest):
+        if "out" not in job:
+            raise ValueError(f"job {i} del manifest senza 'out'")
+        jobs.append({
+            "temporal": risolvi(job.get("temporal", genera_ppt.CSV_TEMPORAL)),
+            "profili":  risolvi(job.get("profili", genera_ppt.CSV_PROFILI)),
+            "filtro":   job.get("filtro") or {},
+            "top":      int(job.get("top", 0)),
+            "grafici":  bool(job.get("grafici", True)),
+            "out":      risolvi(job["out"]),
+        })
+    return jobs
+
+def esegui_job(job):
+    """Genera un deck nel worker; ritorna (slide, righe, secondi)."""
+    t0 = time.perf_counter()
+    # i grafici li disegno nel worker stesso: il parallelismo c'e' gia' tra i deck
+    n_slide, righe = genera_ppt.genera(job["temporal"], job["profili"], job["out"],
+                                       filtro=job["filtro"], template=_TEMPLATE, top=job["top"],
+                                       grafici=job["grafici"], workers_grafici=1)
+    return n_slide, righe, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera piu' deck in parallelo da un manifest JSON")
+    parser.add_argument("manifest", help="file JSON con la lista dei job")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processi in parallelo (default: numero di CPU)")
+    args = parser.parse_args()
+
+    jobs = leggi_manifest(args.manifest)
+    if not jobs:
+        print("Manifest vuoto, niente da generare")
+        return 0
+
+    print(f"{len(jobs)} deck con {args.workers} processi")
+    t0 = time.perf_counter()
+    errori = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        futuri = {pool.submit(esegui_job, job): job for job in jobs}
+        for futuro in as_completed(futuri):
+            job = futuri[futuro]
+            try:
+                n_slide, righe, secondi = futuro.result()
+            except Exception as e:
+                errori += 1
+                print(f"  ERRORE {job['out']}: {e}")
+                continue
+            print(f"  {secondi:6.2f} s  {job['out']}  ({n_slide} slide, {righe} righe)")
+    totale = time.perf_counter() - t0
+    print(f"Totale: {totale:.2f} s per {len(jobs) - errori}/{len(jobs)} deck")
+    return 1 if errori else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
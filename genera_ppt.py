@@ -2,12 +2,39 @@
 genera_ppt.py — presentazione InfoVis
 Intermedio (~3 min): codice D3 mostrato esplicitamente
 Finale   (~7 min): solo schemi, flussi, tabelle — niente snippet
+
+I numeri delle slide del progetto finale (righe, utenti, settimane, tipi e range
+delle colonne, dimensioni e insider dei cluster) sono letti dai CSV con una sola
+passata in streaming, quindi il deck si rigenera per ogni run di scoring.
+
+Uso:
+    python genera_ppt.py
+    python genera_ppt.py anomalies.csv profili.csv output.pptx
+    python genera_ppt.py anomalies.csv profili.csv output.pptx 200   # + top 200 utenti
+
+Se numpy e matplotlib sono installati, dopo le slide di istogramma, scatter, linea
+temporale e heatmap c'e' anche il grafico vero renderizzato dai CSV (grafici_deck.py,
+con cache su disco: rigenerare il deck non ridisegna i grafici gia' fatti).
+
+Per generare molti deck in parallelo (uno per unita', settimana, modello...) vedi
+genera_batch.py.
 """
 
+import csv
+import heapq
+import io
+import math
+import os
+import sys
+
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_ALIGN
+from pptx.enum.text import MSO_ANCHOR, PP_ALIGN
+from pptx.oxml.ns import qn
+
+import grafici_deck
+from csv_colonnare import COLONNE_STRINGA, condizioni_filtro, numero, rispetta
 
 SFONDO  = RGBColor(0x1A, 0x1A, 0x2E)
 ACCENT  = RGBColor(0x0F, 0x3A, 0x60)
@@ -17,24 +44,34 @@ GRIGIO  = RGBColor(0xB0, 0xC4, 0xDE)
 ROSSO   = RGBColor(0xE7, 0x4C, 0x3C)
 VERDE   = RGBColor(0x27, 0xAE, 0x60)
 GIALLO  = RGBColor(0xF5, 0xA6, 0x23)
+RIGA_SCURA = RGBColor(0x10, 0x10, 0x25)
 
 W = Inches(13.33)
 H = Inches(7.5)
+ALTEZZA_BARRA = Inches(1.05)
 
+# layout del template: 6 = vuoto (solo sfondo), 5 = con barra del titolo e separatore
+LAYOUT_VUOTO  = 6
+LAYOUT_TITOLO = 5
 
-# ─── Helper ──────────────────────────────────────────────────────────────────
+# stile tabella "No Style, No Grid" di PowerPoint
+STILE_TABELLA = "{2D5ABB26-0587-4C30-8999-92F81FD0307C}"
 
-def nuova_slide(prs):
-    return prs.slides.add_slide(prs.slide_layouts[6])
+CSV_TEMPORAL = "data/results/anomalies_temporal_v2.csv"
+CSV_PROFILI  = "data/results/cluster_profiles_v2.csv"
+PPTX_OUT     = "_docs/presentazione_infovis.pptx"
 
-def sfondo_slide(slide):
-    shp = slide.shapes.add_shape(1, Inches(0), Inches(0), W, H)
-    shp.fill.solid()
-    shp.fill.fore_color.rgb = SFONDO
-    shp.line.fill.background()
-    el = shp._element
-    el.getparent().remove(el)
-    slide.shapes._spTree.insert(2, el)
+
+# ─── Helper ──────────────────────────────────────────────────────────────────
+
+def nuova_slide(prs, titolo=None, size=26):
+    """Slide con lo sfondo scuro del master; con titolo usa il layout che ha gia'
+    barra e separatore (vedi crea_template) e aggiunge solo il testo."""
+    if titolo is None:
+        return prs.slides.add_slide(prs.slide_layouts[LAYOUT_VUOTO])
+    sl = prs.slides.add_slide(prs.slide_layouts[LAYOUT_TITOLO])
+    barra_titolo(sl, titolo, size)
+    return sl
 
 def rettangolo(slide, x, y, w, h, colore):
     shp = slide.shapes.add_shape(1, x, y, w, h)
@@ -44,9 +81,11 @@ def rettangolo(slide, x, y, w, h, colore):
     return shp
 
 def barra_titolo(slide, testo, size=26):
-    shp = rettangolo(slide, Inches(0), Inches(0), W, Inches(1.05), ACCENT)
-    tf = shp.text_frame
+    # il rettangolo della barra e' nel layout, qui c'e' solo il testo sopra
+    txb = slide.shapes.add_textbox(Inches(0), Inches(0), W, ALTEZZA_BARRA)
+    tf = txb.text_frame
     tf.word_wrap = False
+    tf.vertical_anchor = MSO_ANCHOR.MIDDLE
     p = tf.paragraphs[0]
     p.alignment = PP_ALIGN.CENTER
     run = p.add_run()
@@ -98,31 +137,70 @@ def codice(slide, testo, x, y, w, h, size=11):
     run.font.size = Pt(size)
     run.font.color.rgb = AZZURRO
 
-def tabella(slide, intestaz, righe, x, y, col_w, riga_h):
-    x0, y0 = x, y
-    for j, (h_txt, cw) in enumerate(zip(intestaz, col_w)):
-        x_c = x0 + sum(col_w[:j])
-        cella = rettangolo(slide, x_c, y0, cw, riga_h, ACCENT)
-        tf = cella.text_frame
-        p = tf.paragraphs[0]
-        p.alignment = PP_ALIGN.CENTER
-        run = p.add_run()
-        run.text = h_txt
-        run.font.size = Pt(12)
-        run.font.bold = True
-        run.font.color.rgb = AZZURRO
+def _testo_cella(cella, testo, size, colore, fondo, bold=False, align=PP_ALIGN.LEFT):
+    cella.fill.solid()
+    cella.fill.fore_color.rgb = fondo
+    cella.vertical_anchor = MSO_ANCHOR.MIDDLE
+    p = cella.text_frame.paragraphs[0]
+    p.alignment = align
+    run = p.add_run()
+    run.text = str(testo)
+    run.font.size = Pt(size)
+    run.font.bold = bold
+    run.font.color.rgb = colore
+
+def tabella(slide, intestaz, righe, x, y, col_w, riga_h,
+            size=12, colori=None, grassetto=(), fondi=(RIGA_SCURA, SFONDO), allinea=None):
+    """Tabella nativa di PowerPoint: un solo oggetto sulla slide, non una forma per cella.
+
+    intestaz=None -> niente riga di intestazione; colori = colore del testo per colonna,
+    grassetto = indici delle colonne in grassetto, fondi = colori alternati delle righe,
+    allinea = allineamento per colonna (default a sinistra).
+    colori e grassetto possono anche essere funzioni (riga, j) quando dipendono dalla
+    riga (es. una riga evidenziata): ricevono la riga e non l'indice, cosi' funzionano
+    anche sui blocchi di tabella_paginata.
+    """
+    n_int = 0 if intestaz is None else 1
+    grafico = slide.shapes.add_table(len(righe) + n_int, len(col_w), x, y,
+                                     sum(col_w), riga_h * (len(righe) + n_int))
+    # senza lo stile del tema (bordi bianchi, righe a bande): i colori li metto io
+    grafico._element.graphic.graphicData.tbl.tblPr.find(qn("a:tableStyleId")).text = STILE_TABELLA
+    tab = grafico.table
+    for colonna, cw in zip(tab.columns, col_w):
+        colonna.width = cw
+    for riga in tab.rows:
+        riga.height = riga_h
+    if colori is None:
+        colori = [GRIGIO] * len(col_w)
+    if allinea is None:
+        allinea = [PP_ALIGN.LEFT] * len(col_w)
+    colore = colori if callable(colori) else lambda riga, j: colori[j]
+    bold = grassetto if callable(grassetto) else lambda riga, j: j in grassetto
+
+    if intestaz is not None:
+        for cella, h_txt in zip(tab.rows[0].cells, intestaz):
+            _testo_cella(cella, h_txt, size, AZZURRO, ACCENT, bold=True, align=PP_ALIGN.CENTER)
     for i, riga in enumerate(righe):
-        bg_r = RGBColor(0x10, 0x10, 0x25) if i % 2 == 0 else SFONDO
-        for j, (val, cw) in enumerate(zip(riga, col_w)):
-            x_c = x0 + sum(col_w[:j])
-            cella = rettangolo(slide, x_c, y0 + riga_h * (i + 1), cw, riga_h, bg_r)
-            tf = cella.text_frame
-            p = tf.paragraphs[0]
-            p.alignment = PP_ALIGN.LEFT
-            run = p.add_run()
-            run.text = str(val)
-            run.font.size = Pt(12)
-            run.font.color.rgb = GRIGIO
+        fondo = fondi[i % 2]
+        for j, (cella, val) in enumerate(zip(tab.rows[i + n_int].cells, riga)):
+            _testo_cella(cella, val, size, colore(riga, j), fondo, bold=bold(riga, j),
+                         align=allinea[j])
+    return tab
+
+def tabella_paginata(prs, titolo, intestaz, righe, col_w, riga_h,
+                     x=Inches(0.5), y=Inches(1.4), y_max=H - Inches(0.4), **stile):
+    """Tabella lunga divisa su piu' slide (intestazione ripetuta su ognuna).
+
+    Ritorna le slide create; se sono piu' di una il titolo diventa "titolo (k/n)".
+    """
+    per_slide = max(1, (y_max - y) // riga_h - (0 if intestaz is None else 1))
+    blocchi = [righe[i:i + per_slide] for i in range(0, len(righe), per_slide)] or [[]]
+    slide = []
+    for k, blocco in enumerate(blocchi, 1):
+        sl = nuova_slide(prs, f"{titolo}  ({k}/{len(blocchi)})" if len(blocchi) > 1 else titolo)
+        tabella(sl, intestaz, blocco, x, y, col_w, riga_h, **stile)
+        slide.append(sl)
+    return slide
 
 def nodo(slide, testo, x, y, w, h, col=ACCENT, col_testo=BIANCO, size=12):
     """Box con barra laterale azzurra — usato per i flussi."""
@@ -136,13 +214,250 @@ def freccia_txt(slide, x, y):
         size=17, bold=True, colore=AZZURRO, align=PP_ALIGN.CENTER)
 
 
+# ─── Statistiche dai CSV ─────────────────────────────────────────────────────
+
+def _nuova_colonna():
+    return {"numerica": True, "intera": True, "min": None, "max": None}
+
+def _aggiorna_colonna(col, valore):
+    """Tipo e range di una colonna, un valore alla volta (stesse regole di csv_colonnare)."""
+    if not col["numerica"]:
+        return
+    v = numero(valore)
+    if v is None:
+        col["numerica"] = False
+        return
+    if col["intera"] and not v.is_integer():
+        col["intera"] = False
+    if col["min"] is None or v < col["min"]:
+        col["min"] = v
+    if col["max"] is None or v > col["max"]:
+        col["max"] = v
+
+def tipo_colonna(col):
+    """Testo per la colonna "tipo" della slide: stringa, 0 / 1, int a-b, int, float."""
+    if col is None or not col["numerica"] or col["min"] is None:
+        return "stringa"
+    lo, hi = col["min"], col["max"]
+    if col["intera"]:
+        if lo == 0 and hi == 1:
+            return "0 / 1"
+        if hi - lo <= 20:
+            return f"int {lo:.0f}-{hi:.0f}"
+        return "int"
+    return "float"
+
+def _numero_valido(valore):
+    """float della cella, None se vuota, non numerica o NaN/inf (da non sommare)."""
+    if not valore.strip():
+        return None
+    n = numero(valore)
+    return n if n is not None and math.isfinite(n) else None
+
+def _settimana(valore):
+    """Settimana normalizzata: "1" e "1.0" sono la stessa (int se intera)."""
+    n = _numero_valido(valore)
+    if n is None:
+        return valore.strip()
+    return int(n) if n.is_integer() else n
+
+def leggi_temporal(percorso, filtro=None, aggregati=None):
+    """Una passata sul CSV utente x settimana: non tengo le righe, solo contatori.
+
+    La memoria dipende da utenti, settimane e cluster, non dal numero di righe.
+    filtro = {colonna: valore o lista di valori}: conto solo le righe che li rispettano.
+    Le etichette dei cluster (k del modello) le raccolgo invece su tutte le righe:
+    il filtro cambia cosa mostro, non il numero di cluster di K-Means.
+    aggregati = grafici_deck.Aggregati (facoltativo): gli passo le righe filtrate a
+    blocchi, cosi' i grafici si calcolano in questa stessa passata.
+    """
+    colonne = {}
+    utenti = set()
+    insider = set()
+    settimane = set()
+    cluster = {}  # id cluster -> {righe, utenti, insider, somma_score, n_score}
+    rischio = {}  # utente -> (score massimo, settimana del massimo, cluster)
+    etichette = set()  # cluster presenti nel CSV intero, prima del filtro
+    righe = 0
+    with open(percorso, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        nomi = next(reader)
+        for nome in nomi:
+            colonne[nome] = _nuova_colonna()
+        stringhe = [nome in COLONNE_STRINGA for nome in nomi]
+        for nome, stringa in zip(nomi, stringhe):
+            if stringa:
+                colonne[nome]["numerica"] = False
+        indice = {nome: j for j, nome in enumerate(nomi)}
+        condizioni = condizioni_filtro(nomi, filtro, percorso)
+        if aggregati is not None:
+            aggregati.inizia(nomi)
+        blocco = []
+        i_user, i_week = indice.get("user_id"), indice.get("week")
+        i_cluster, i_insider = indice.get("cluster"), indice.get("insider")
+        i_score = indice.get("final_anomaly_score")
+
+        for riga in reader:
+            if not riga:
+                continue
+            if len(riga) < len(nomi):
+                # riga troncata: celle mancanti vuote, come in csv_colonnare.converti
+                riga += [""] * (len(nomi) - len(riga))
+            if i_cluster is not None and condizioni:
+                c = _numero_valido(riga[i_cluster])
+                if c is not None:
+                    etichette.add(int(c))
+            if not rispetta(riga, condizioni):
+                continue
+            righe += 1
+            if aggregati is not None:
+                blocco.append(riga)
+                if len(blocco) >= grafici_deck.BLOCCO:
+                    aggregati.aggiungi(blocco)
+                    blocco = []
+            for nome, valore in zip(nomi, riga):
+                _aggiorna_colonna(colonne[nome], valore)
+
+            user = riga[i_user] if i_user is not None else None
+            if user is not None:
+                utenti.add(user)
+            settimana = _settimana(riga[i_week]) if i_week is not None else ""
+            if i_week is not None:
+                settimane.add(settimana)
+            if i_cluster is None:
+                continue
+            c = _numero_valido(riga[i_cluster])
+            if c is None:
+                continue  # riga senza cluster: conta nelle righe ma non nei cluster
+            c = int(c)
+            etichette.add(c)
+            stat = cluster.get(c)
+            if stat is None:
+                stat = cluster[c] = {"righe": 0, "utenti": set(), "insider": set(),
+                                     "somma_score": 0.0, "n_score": 0}
+            stat["righe"] += 1
+            stat["utenti"].add(user)
+            if i_insider is not None and numero(riga[i_insider]) == 1:
+                stat["insider"].add(user)
+                insider.add(user)
+            score = _numero_valido(riga[i_score]) if i_score is not None else None
+            if score is not None:
+                # celle vuote o NaN non entrano nelle medie
+                stat["somma_score"] += score
+                stat["n_score"] += 1
+                r = rischio.get(user)
+                if r is None or score > r[0]:
+                    rischio[user] = (score, settimana, c)
+        if aggregati is not None:
+            aggregati.aggiungi(blocco)
+
+    return {
+        "percorso": percorso,
+        "filtro": filtro or {},
+        "righe": righe,
+        "nomi": nomi,
+        "colonne": colonne,
+        "utenti": len(utenti),
+        "insider": len(insider),
+        "settimane": len(settimane),
+        # utente -> (score massimo, settimana, cluster, insider)
+        "rischio": {u: (*r, u in insider) for u, r in rischio.items()},
+        "cluster": {
+            c: {"righe": st["righe"], "utenti": len(st["utenti"]), "insider": len(st["insider"]),
+                "score_medio": st["somma_score"] / st["n_score"] if st["n_score"] else 0.0}
+            for c, st in sorted(cluster.items())
+        },
+        "etichette_cluster": sorted(etichette),
+    }
+
+# colonne descritte nella slide dei CSV: (colonne, etichetta, descrizione)
+# tipo e range li ricavo dai dati; le colonne assenti dal file non compaiono
+COLONNE_TEMPORAL = [
+    (("user_id",),             "user_id",             "identificatore utente"),
+    (("week",),                "week",                "settimana di osservazione"),
+    (("cluster",),             "cluster",             "cluster K-Means assegnato"),
+    (("insider",),             "insider",             "etichetta reale: 1 = insider confermato"),
+    (("rank",),                "rank",                "posizione classifica rischio (1 = piu' anomalo)"),
+    (("final_anomaly_score",), "final_anomaly_score", "score Isolation Forest (puo' essere negativo)"),
+    (("n_logon", "n_usb", "n_file", "n_email", "n_http"),
+     "n_logon / n_usb / n_file / n_email / n_http", "conteggi attivita' per tipo"),
+    (("n_afterhourallact",),   "n_afterhourallact",   "attivita' totali fuori orario lavorativo"),
+    (("n_allact",),            "n_allact",            "attivita' totali"),
+    (("O", "C", "E", "A", "N"), "O, C, E, A, N",      "Big Five personality traits"),
+    (("cluster_distance",),    "cluster_distance",    "distanza dal centroide del proprio cluster"),
+]
+
+COLONNE_PROFILI = [
+    (("cluster", ""),           "cluster",             "identificatore cluster"),
+    (("n_logon",),              "n_logon",             "media logon nel cluster"),
+    (("n_usb",),                "n_usb",               "media eventi USB"),
+    (("n_file",),               "n_file",              "media operazioni su file"),
+    (("n_email",),              "n_email",             "media email inviate"),
+    (("n_http",),               "n_http",              "media richieste HTTP"),
+    (("n_afterhourallact",),    "n_afterhourallact",   "media attivita' fuori orario"),
+    (("final_anomaly_score",),  "final_anomaly_score", "media score Isolation Forest"),
+    (("cluster_distance",),     "cluster_distance",    "distanza media dal centroide"),
+    (("O", "C", "E", "A", "N"), "O, C, E, A, N",       "media Big Five per cluster"),
+]
+
+def righe_colonne(spec, colonne):
+    """(etichetta, tipo, descrizione) per le colonne presenti; un gruppo ha il tipo dell'unione."""
+    righe = []
+    for nomi, etichetta, desc in spec:
+        presenti = [colonne[n] for n in nomi if n in colonne]
+        if not presenti:
+            continue
+        unione = _nuova_colonna()
+        for col in presenti:
+            unione["numerica"] = unione["numerica"] and col["numerica"]
+            unione["intera"] = unione["intera"] and col["intera"]
+            for chiave, scegli in (("min", min), ("max", max)):
+                if col[chiave] is not None:
+                    unione[chiave] = col[chiave] if unione[chiave] is None else scegli(unione[chiave], col[chiave])
+        righe.append((etichetta, tipo_colonna(unione), desc))
+    return righe
+
+def descrivi_etichette(ids):
+    """"k=5, etichette 0-4" dalle etichette dei cluster trovate nei dati."""
+    ids = sorted(ids)
+    if not ids:
+        return "k=0"
+    if ids == list(range(ids[0], ids[-1] + 1)):
+        return f"k={len(ids)}, etichette {ids[0]}-{ids[-1]}"
+    return f"k={len(ids)}, etichette {', '.join(map(str, ids))}"
+
+def filtrati(t, testo):
+    """Aggiunge "(filtrati)" ai conteggi che dipendono dal filtro del manifest."""
+    return f"{testo}  (filtrati)" if t["filtro"] else testo
+
+def range_settimane(t):
+    """(prima, ultima) settimana del CSV, None se la colonna manca o non e' numerica."""
+    sett = t["colonne"].get("week")
+    if sett and sett["numerica"] and sett["min"] is not None:
+        return sett["min"], sett["max"]
+    return None
+
+def percentuale(parte, totale):
+    return f"{parte / totale * 100:.0f}%" if totale else "0%"
+
+def nome_file(percorso):
+    return os.path.basename(percorso)
+
+def leggi_profili(percorso):
+    """Righe e colonne del CSV dei profili (anche questo in streaming)."""
+    with open(percorso, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        nomi = next(reader)
+        righe = sum(1 for riga in reader if riga)
+    return {"percorso": percorso, "righe": righe, "nomi": nomi}
+
+
 # ════════════════════════════════════════════════════════════════════════════════
 # SLIDE 1 — Copertina
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_copertina(prs):
     sl = nuova_slide(prs)
-    sfondo_slide(sl)
     rettangolo(sl, Inches(0), Inches(0), Inches(0.35), H, AZZURRO)
     txt(sl, "Visualizzazione delle Informazioni — A.A. 2024/2025",
         Inches(0.7), Inches(1.8), Inches(12.2), Inches(0.6), size=18, colore=GRIGIO)
@@ -163,7 +478,6 @@ def slide_copertina(prs):
 
 def slide_sep_intermedio(prs):
     sl = nuova_slide(prs)
-    sfondo_slide(sl)
     rettangolo(sl, Inches(0), Inches(2.6), W, Inches(2.2), ACCENT)
     txt(sl, "PARTE 1  —  3 minuti", Inches(0), Inches(1.9), W, Inches(0.6),
         size=15, colore=AZZURRO, align=PP_ALIGN.CENTER)
@@ -179,10 +493,7 @@ def slide_sep_intermedio(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_intermedio_overview(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Intermedio — Obiettivo e Struttura")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Progetto Intermedio — Obiettivo e Struttura")
 
     txt(sl, "Cosa fa", Inches(0.5), Inches(1.3), Inches(5.9), Inches(0.45),
         size=16, bold=True, colore=AZZURRO)
@@ -222,10 +533,7 @@ def slide_intermedio_overview(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_intermedio_d3(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Intermedio — I Concetti D3 in Pratica")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Progetto Intermedio — I Concetti D3 in Pratica")
 
     # sx: scale + data join
     txt(sl, "1. Scale lineari", Inches(0.5), Inches(1.3), Inches(5.9), Inches(0.4),
@@ -293,10 +601,7 @@ def slide_intermedio_d3(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_intermedio_glifo(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Intermedio — Il Glifo e la Logica Click")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Progetto Intermedio — Il Glifo e la Logica Click")
 
     txt(sl, "createStickman(gruppo, scale)  — anatomia SVG  (size = 25px con scale=1)",
         Inches(0.5), Inches(1.3), Inches(12.3), Inches(0.45),
@@ -348,7 +653,6 @@ def slide_intermedio_glifo(prs):
 
 def slide_sep_finale(prs):
     sl = nuova_slide(prs)
-    sfondo_slide(sl)
     rettangolo(sl, Inches(0), Inches(2.6), W, Inches(2.2), ACCENT)
     txt(sl, "PARTE 2  —  7 minuti", Inches(0), Inches(1.9), W, Inches(0.6),
         size=15, colore=AZZURRO, align=PP_ALIGN.CENTER)
@@ -363,26 +667,24 @@ def slide_sep_finale(prs):
 # SLIDE 7 — Problema e dataset
 # ════════════════════════════════════════════════════════════════════════════════
 
-def slide_dataset(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Finale — Il Problema e il Dataset")
-    sep_orizz(sl)
+def slide_dataset(prs, dati):
+    t = dati["temporal"]
+    sl = nuova_slide(prs, "Progetto Finale — Il Problema e il Dataset")
 
     rettangolo(sl, Inches(0.5), Inches(1.3), Inches(12.3), Inches(0.85), ACCENT)
     rettangolo(sl, Inches(0.5), Inches(1.3), Inches(0.1), Inches(0.85), ROSSO)
-    txt(sl, "Un analista SOC deve identificare chi, tra 300 dipendenti, ha "
-            "comportamenti anomali — senza scorrere 2400 righe CSV.",
+    txt(sl, f"Un analista SOC deve identificare chi, tra {t['utenti']} dipendenti, ha "
+            f"comportamenti anomali — senza scorrere {t['righe']} righe CSV.",
         Inches(0.7), Inches(1.4), Inches(12.0), Inches(0.65),
         size=15, bold=True, colore=BIANCO)
 
     txt(sl, "Struttura dati", Inches(0.5), Inches(2.35), Inches(5.9), Inches(0.4),
         size=15, bold=True, colore=AZZURRO)
     bullets(sl, [
-        "300 utenti  x  8 settimane  =  2400 righe",
-        "15 insider reali (5% del totale)",
+        filtrati(t, f"{t['utenti']} utenti  x  {t['settimane']} settimane  =  {t['righe']} righe"),
+        filtrati(t, f"{t['insider']} insider reali ({percentuale(t['insider'], t['utenti'])} del totale)"),
         "Due CSV: profili utente + serie temporale settimanale",
-        "Pipeline ML gia' eseguita: Isolation Forest + K-Means k=5",
+        f"Pipeline ML gia' eseguita: Isolation Forest + K-Means k={len(t['etichette_cluster'])}",
         "La dashboard non fa ML: visualizza il risultato",
     ], Inches(0.5), Inches(2.82), Inches(5.9), Inches(3.2), size=14)
 
@@ -391,7 +693,7 @@ def slide_dataset(prs):
     feats = [
         ("final_anomaly_score", "score Isolation Forest"),
         ("rank",                "posizione in classifica rischio"),
-        ("cluster",             "K-Means k=5, etichetta 0-4"),
+        ("cluster",             f"K-Means {descrivi_etichette(t['etichette_cluster'])}"),
         ("is_it_admin",         "flag 0/1"),
         ("work_hour_ratio",     "% accessi in orario"),
         ("after_hour_ratio",    "% accessi fuori orario"),
@@ -412,74 +714,43 @@ def slide_dataset(prs):
 # SLIDE 8 — I due file CSV: struttura e colonne
 # ════════════════════════════════════════════════════════════════════════════════
 
-def slide_dati_csv(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Finale — I Dati: i due file CSV")
-    sep_orizz(sl)
+def slide_dati_csv(prs, dati):
+    t, pr = dati["temporal"], dati["profili"]
+    sl = nuova_slide(prs, "Progetto Finale — I Dati: i due file CSV")
 
     # ── CSV 1 (sinistra) ──────────────────────────────────────────────────────
     rettangolo(sl, Inches(0.4), Inches(1.28), Inches(6.1), Inches(0.55),
                RGBColor(0x06, 0x0B, 0x1A))
     rettangolo(sl, Inches(0.4), Inches(1.28), Inches(0.1), Inches(0.55), AZZURRO)
-    txt(sl, "anomalies_temporal_v2.csv  —  2400 righe  (300 utenti x 8 settimane)",
+    txt(sl, f"{nome_file(t['percorso'])}  —  {t['righe']} righe  ({t['utenti']} utenti x {t['settimane']} settimane)",
         Inches(0.6), Inches(1.35), Inches(5.75), Inches(0.42),
         size=12, bold=True, colore=AZZURRO)
 
-    cols_temporal = [
-        ("user_id",              "stringa",  "identificatore utente"),
-        ("week",                 "int 1-8",  "settimana di osservazione"),
-        ("cluster",              "int 0-4",  "cluster K-Means assegnato"),
-        ("insider",              "0 / 1",    "etichetta reale: 1 = insider confermato"),
-        ("rank",                 "int",      "posizione classifica rischio (1 = piu' anomalo)"),
-        ("final_anomaly_score",  "float",    "score Isolation Forest (puo' essere negativo)"),
-        ("n_logon / n_usb / n_file / n_email / n_http", "int", "conteggi attivita' per tipo"),
-        ("n_afterhourallact",    "int",      "attivita' totali fuori orario lavorativo"),
-        ("n_allact",             "int",      "attivita' totali"),
-        ("O, C, E, A, N",        "float",    "Big Five personality traits"),
-        ("cluster_distance",     "float",    "distanza dal centroide del proprio cluster"),
-    ]
-    for i, (col, tipo, desc) in enumerate(cols_temporal):
-        y_r = Inches(1.9) + i * Inches(0.44)
-        bg_r = ACCENT if i % 2 == 0 else RGBColor(0x10, 0x10, 0x25)
-        rettangolo(sl, Inches(0.4), y_r, Inches(6.1), Inches(0.42), bg_r)
-        txt(sl, col,  Inches(0.5),  y_r + Inches(0.05), Inches(2.3), Inches(0.33), size=10, bold=True, colore=AZZURRO)
-        txt(sl, tipo, Inches(2.85), y_r + Inches(0.05), Inches(0.9), Inches(0.33), size=10, colore=GIALLO)
-        txt(sl, desc, Inches(3.8),  y_r + Inches(0.05), Inches(2.6), Inches(0.33), size=10, colore=GRIGIO)
+    tabella(sl, None, righe_colonne(COLONNE_TEMPORAL, t["colonne"]),
+            Inches(0.4), Inches(1.9), [Inches(2.45), Inches(0.95), Inches(2.7)], Inches(0.44),
+            size=10, colori=[AZZURRO, GIALLO, GRIGIO], grassetto=(0,), fondi=(ACCENT, RIGA_SCURA))
 
     # ── CSV 2 (destra) ───────────────────────────────────────────────────────
     rettangolo(sl, Inches(6.85), Inches(1.28), Inches(6.1), Inches(0.55),
                RGBColor(0x06, 0x0B, 0x1A))
     rettangolo(sl, Inches(6.85), Inches(1.28), Inches(0.1), Inches(0.55), VERDE)
-    txt(sl, "cluster_profiles_v2.csv  —  5 righe  (una per cluster)",
+    txt(sl, f"{nome_file(pr['percorso'])}  —  {pr['righe']} righe  (una per cluster)",
         Inches(7.05), Inches(1.35), Inches(5.75), Inches(0.42),
         size=12, bold=True, colore=VERDE)
 
-    cols_profiles = [
-        ("cluster",           "int 0-4",  "identificatore cluster"),
-        ("n_logon",           "float",    "media logon nel cluster"),
-        ("n_usb",             "float",    "media eventi USB"),
-        ("n_file",            "float",    "media operazioni su file"),
-        ("n_email",           "float",    "media email inviate"),
-        ("n_http",            "float",    "media richieste HTTP"),
-        ("n_afterhourallact", "float",    "media attivita' fuori orario"),
-        ("final_anomaly_score","float",   "media score Isolation Forest"),
-        ("cluster_distance",  "float",    "distanza media dal centroide"),
-        ("O, C, E, A, N",     "float",    "media Big Five per cluster"),
-    ]
-    for i, (col, tipo, desc) in enumerate(cols_profiles):
-        y_r = Inches(1.9) + i * Inches(0.44)
-        bg_r = ACCENT if i % 2 == 0 else RGBColor(0x10, 0x10, 0x25)
-        rettangolo(sl, Inches(6.85), y_r, Inches(6.1), Inches(0.42), bg_r)
-        txt(sl, col,  Inches(6.95), y_r + Inches(0.05), Inches(2.3), Inches(0.33), size=10, bold=True, colore=VERDE)
-        txt(sl, tipo, Inches(9.3),  y_r + Inches(0.05), Inches(0.9), Inches(0.33), size=10, colore=GIALLO)
-        txt(sl, desc, Inches(10.25),y_r + Inches(0.05), Inches(2.6), Inches(0.33), size=10, colore=GRIGIO)
+    # le medie per cluster sono tutte float; mostro solo le colonne presenti nel file
+    cols_profiles = [(etichetta, "int" if "cluster" in colonne else "float", desc)
+                     for colonne, etichetta, desc in COLONNE_PROFILI
+                     if any(c in pr["nomi"] for c in colonne)]
+    tabella(sl, None, cols_profiles,
+            Inches(6.85), Inches(1.9), [Inches(2.45), Inches(0.95), Inches(2.7)], Inches(0.44),
+            size=10, colori=[VERDE, GIALLO, GRIGIO], grassetto=(0,), fondi=(ACCENT, RIGA_SCURA))
 
     # ── nota chi usa cosa ────────────────────────────────────────────────────
     rettangolo(sl, Inches(0.4), Inches(6.7), Inches(12.55), Inches(0.6), ACCENT)
     rettangolo(sl, Inches(0.4), Inches(6.7), Inches(0.08), Inches(0.6), AZZURRO)
     txt(sl, "anomalies_temporal_v2  ->  univariate, bivariate, trivariate, temporal, parallel-coord  (dati filtrabili)   |   "
-            "cluster_profiles_v2  ->  radar + heatmap  (medie fisse per cluster)",
+            "radar + heatmap  ->  medie per cluster sui dati filtrati (worker)",
         Inches(0.6), Inches(6.77), Inches(12.2), Inches(0.48),
         size=11, bold=True, colore=GRIGIO)
 
@@ -489,10 +760,7 @@ def slide_dati_csv(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_architettura(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Finale — Architettura del Codice")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Progetto Finale — Architettura del Codice")
 
     # layer INPUT
     txt(sl, "INPUT", Inches(0.5), Inches(1.35), Inches(2.5), Inches(0.35),
@@ -546,11 +814,10 @@ def slide_architettura(prs):
 # SLIDE 10 — Architettura dati → grafici (schema colonne)
 # ════════════════════════════════════════════════════════════════════════════════
 
-def slide_architettura_dati(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Finale — Quale Colonna Entra in Quale Grafico")
-    sep_orizz(sl)
+def slide_architettura_dati(prs, dati):
+    sl = nuova_slide(prs, "Progetto Finale — Quale Colonna Entra in Quale Grafico")
+    sett = range_settimane(dati["temporal"])
+    asse_sett = f"asse X temporale ({sett[0]:.0f}-{sett[1]:.0f})" if sett else "asse X temporale"
 
     txt(sl, "anomalies_temporal_v2.csv  (righe per utente x settimana)",
         Inches(0.4), Inches(1.28), Inches(8.0), Inches(0.4),
@@ -567,37 +834,26 @@ def slide_architettura_dati(prs):
         ("cluster",             "Bubble, Line, Parallel",                      "colore ordinale (schemeCategory10)"),
         ("n_afterhourallact",   "Bubble (asse X), Parallel (asse)",            "posizione X / asse verticale"),
         ("n_allact",            "Bubble (dimensione cerchio)",                 "scaleSqrt -> raggio"),
-        ("week",                "Line chart",                                  "asse X temporale (1-8)"),
+        ("week",                "Line chart",                                  asse_sett),
         ("n_logon/usb/file/email/http", "Parallel, Radar*, Heatmap*",         "assi paralleli / raggi / celle"),
         ("O, C, E, A, N",       "Parallel, Heatmap*",                         "assi paralleli / celle"),
         ("cluster_distance",    "Heatmap*",                                    "cella feature"),
     ]
-    col_w_m = [Inches(3.2), Inches(5.4), Inches(3.85)]
-    x0, y0, rh = Inches(0.4), Inches(1.75), Inches(0.46)
-
-    for j, (h, cw) in enumerate(zip(["Colonna CSV", "Grafico(i) che la usano", "Encoding D3"], col_w_m)):
-        x_c = x0 + sum(col_w_m[:j])
-        cella = rettangolo(sl, x_c, y0, cw, rh, ACCENT)
-        tf = cella.text_frame
-        p = tf.paragraphs[0]; p.alignment = PP_ALIGN.CENTER
-        run = p.add_run(); run.text = h
-        run.font.size = Pt(11); run.font.bold = True; run.font.color.rgb = AZZURRO
-
-    for i, (col, grafici, enc) in enumerate(righe_mappa):
-        bg_r = RGBColor(0x10, 0x10, 0x25) if i % 2 == 0 else SFONDO
-        col_testo = VERDE if "*" in grafici else GRIGIO
-        grafici_clean = grafici.replace("*", "")
-        for j, (val, cw) in enumerate(zip([col, grafici_clean, enc], col_w_m)):
-            x_c = x0 + sum(col_w_m[:j])
-            cella = rettangolo(sl, x_c, y0 + rh * (i + 1), cw, rh, bg_r)
-            tf = cella.text_frame
-            p = tf.paragraphs[0]; p.alignment = PP_ALIGN.LEFT
-            run = p.add_run(); run.text = val
-            run.font.size = Pt(10)
-            run.font.color.rgb = (AZZURRO if j == 0 else col_testo if j == 1 else GIALLO)
+    # in verde i grafici che usano le medie per cluster (nota * sotto la tabella)
+    verdi = {col for col, grafici, _ in righe_mappa if "*" in grafici}
+    righe_mappa = [(col, grafici.replace("*", ""), enc) for col, grafici, enc in righe_mappa]
+
+    def colore(riga, j):
+        if j == 1:
+            return VERDE if riga[0] in verdi else GRIGIO
+        return AZZURRO if j == 0 else GIALLO
+
+    tabella(sl, ["Colonna CSV", "Grafico(i) che la usano", "Encoding D3"], righe_mappa,
+            Inches(0.4), Inches(1.75), [Inches(3.2), Inches(5.4), Inches(3.85)], Inches(0.46),
+            size=10, colori=colore)
 
     rettangolo(sl, Inches(0.4), Inches(6.6), Inches(12.55), Inches(0.6), ACCENT)
-    txt(sl, "* Radar e Heatmap leggono cluster_profiles_v2.csv direttamente — non usano filteredData",
+    txt(sl, "* Radar e Heatmap: medie per cluster calcolate nel worker sulle righe filtrate (cluster_profiles_v2.csv solo con profiles.mode = 'csv')",
         Inches(0.6), Inches(6.67), Inches(12.2), Inches(0.48),
         size=11, italic=True, colore=VERDE)
 
@@ -607,10 +863,7 @@ def slide_architettura_dati(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_graf_istogramma(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Grafico 1 — Istogramma  (univariate.js)")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Grafico 1 — Istogramma  (univariate.js)")
 
     # header badges
     for i, (label, col) in enumerate([("Univariata", AZZURRO), ("filteredData", VERDE), ("scaleLinear", GIALLO)]):
@@ -659,11 +912,9 @@ def slide_graf_istogramma(prs):
 # SLIDE 12 — Grafico 2: Scatter rank vs score
 # ════════════════════════════════════════════════════════════════════════════════
 
-def slide_graf_scatter(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Grafico 2 — Scatter rank vs score  (bivariate.js)")
-    sep_orizz(sl)
+def slide_graf_scatter(prs, dati):
+    t = dati["temporal"]
+    sl = nuova_slide(prs, "Grafico 2 — Scatter rank vs score  (bivariate.js)")
 
     for i, (label, col) in enumerate([("Bivariata", AZZURRO), ("filteredData", VERDE), ("scaleLinear x2", GIALLO)]):
         x_b = Inches(0.5) + i * Inches(2.55)
@@ -679,10 +930,10 @@ def slide_graf_scatter(prs):
     txt(sl, "Aggregazione per utente (fix dataset temporale)", Inches(0.5), Inches(2.55), Inches(6.0), Inches(0.38),
         size=14, bold=True, colore=AZZURRO)
     flusso_b = [
-        ("PROBLEMA",  "CSV ha 2400 righe: 300 utenti x 8 settimane -> rank diverso ogni settimana"),
-        ("FIX",       "d3.rollup(data, media, user_id) -> 300 punti unici (un punto per utente)"),
-        ("RANK",      "media dei rank nelle 8 settimane"),
-        ("SCORE",     "media del final_anomaly_score nelle 8 settimane"),
+        ("PROBLEMA",  f"CSV ha {t['righe']} righe: {t['utenti']} utenti x {t['settimane']} settimane -> rank diverso ogni settimana"),
+        ("FIX",       f"d3.rollup(data, media, user_id) -> {t['utenti']} punti unici (un punto per utente)"),
+        ("RANK",      f"media dei rank nelle {t['settimane']} settimane"),
+        ("SCORE",     f"media del final_anomaly_score nelle {t['settimane']} settimane"),
         ("INSIDER",   "valore fisso (non cambia nel tempo)"),
     ]
     for i, (label, desc) in enumerate(flusso_b):
@@ -695,7 +946,7 @@ def slide_graf_scatter(prs):
     txt(sl, "Interazione e scelte tecniche", Inches(7.0), Inches(2.55), Inches(5.8), Inches(0.38),
         size=14, bold=True, colore=AZZURRO)
     bullets(sl, [
-        "Ogni punto = un utente unico (300 punti, media 8 settimane)",
+        f"Ogni punto = un utente unico ({t['utenti']} punti, media {t['settimane']} settimane)",
         "Encoding: X = rank medio, Y = score medio, Colore = insider (rosso/verde)",
         "mouseover: raggio 4px -> 8px + tooltip (user_id, rank medio, score medio, tipo)",
         "Animazione entrata: raggio 0 -> 4px con delay i*5ms (effetto cascata)",
@@ -708,11 +959,9 @@ def slide_graf_scatter(prs):
 # SLIDE 13 — Grafico 3: Bubble chart
 # ════════════════════════════════════════════════════════════════════════════════
 
-def slide_graf_bubble(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Grafico 3 — Bubble chart  (trivariate.js)")
-    sep_orizz(sl)
+def slide_graf_bubble(prs, dati):
+    t = dati["temporal"]
+    sl = nuova_slide(prs, "Grafico 3 — Bubble chart  (trivariate.js)")
 
     for i, (label, col) in enumerate([("Trivariata", AZZURRO), ("filteredData", VERDE), ("scaleSqrt", GIALLO)]):
         x_b = Inches(0.5) + i * Inches(2.55)
@@ -728,10 +977,10 @@ def slide_graf_bubble(prs):
     txt(sl, "Aggregazione per utente (fix dataset temporale)", Inches(0.5), Inches(2.55), Inches(6.0), Inches(0.38),
         size=14, bold=True, colore=AZZURRO)
     flusso_bub = [
-        ("PROBLEMA",  "CSV 2400 righe: 300 utenti x 8 settimane -> dati diversi per settimana"),
-        ("FIX",       "d3.rollup(data, media, user_id) -> 300 bolle uniche per utente"),
-        ("X",         "media di n_afterhourallact sulle 8 settimane"),
-        ("Y / SIZE",  "media di final_anomaly_score / n_allact sulle 8 settimane"),
+        ("PROBLEMA",  f"CSV {t['righe']} righe: {t['utenti']} utenti x {t['settimane']} settimane -> dati diversi per settimana"),
+        ("FIX",       f"d3.rollup(data, media, user_id) -> {t['utenti']} bolle uniche per utente"),
+        ("X",         f"media di n_afterhourallact sulle {t['settimane']} settimane"),
+        ("Y / SIZE",  f"media di final_anomaly_score / n_allact sulle {t['settimane']} settimane"),
         ("CLUSTER",   "valore fisso per utente (non cambia nel tempo)"),
     ]
     for i, (label, desc) in enumerate(flusso_bub):
@@ -756,11 +1005,12 @@ def slide_graf_bubble(prs):
 # SLIDE 14 — Grafico 4: Line chart temporale
 # ════════════════════════════════════════════════════════════════════════════════
 
-def slide_graf_line(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Grafico 4 — Line chart temporale  (temporal.js)")
-    sep_orizz(sl)
+def slide_graf_line(prs, dati):
+    t = dati["temporal"]
+    n_cl = len(t["cluster"])
+    sett = range_settimane(t)
+    dominio = f"[{sett[0]:.0f},{sett[1]:.0f}]" if sett else "dai dati"
+    sl = nuova_slide(prs, "Grafico 4 — Line chart temporale  (temporal.js)")
 
     for i, (label, col) in enumerate([("Temporale", AZZURRO), ("filteredData", VERDE), ("d3.rollup", GIALLO)]):
         x_b = Inches(0.5) + i * Inches(2.55)
@@ -773,14 +1023,14 @@ def slide_graf_line(prs):
         Inches(0.65), Inches(1.89), Inches(12.0), Inches(0.42),
         size=13, italic=True, colore=BIANCO)
 
-    txt(sl, "Aggregazione: da 2400 righe a 5 linee", Inches(0.5), Inches(2.55), Inches(6.0), Inches(0.38),
+    txt(sl, f"Aggregazione: da {t['righe']} righe a {n_cl} linee", Inches(0.5), Inches(2.55), Inches(6.0), Inches(0.38),
         size=14, bold=True, colore=AZZURRO)
     agg = [
-        ("INPUT",    "2400 righe  (300 utenti x 8 settimane)"),
+        ("INPUT",    f"{t['righe']} righe  ({t['utenti']} utenti x {t['settimane']} settimane)"),
         ("RAGGRUPPA","d3.rollup(data, mean(score), cluster, week)"),
         ("RISULTATO","Map annidata: cluster -> settimana -> score medio"),
-        ("LINEE",    "5 path SVG  (una per cluster), 8 punti ciascuna"),
-        ("ASSE X",   "scaleLinear  domain=[1,8]  — le settimane"),
+        ("LINEE",    f"{n_cl} path SVG  (una per cluster), {t['settimane']} punti ciascuna"),
+        ("ASSE X",   f"scaleLinear  domain={dominio}  — le settimane"),
         ("ASSE Y",   "scaleLinear  domain=[0, max_score]"),
     ]
     for i, (label, desc) in enumerate(agg):
@@ -807,10 +1057,7 @@ def slide_graf_line(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_graf_parallel(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Grafico 5 — Parallel coordinates  (parallel-coordinates.js)")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Grafico 5 — Parallel coordinates  (parallel-coordinates.js)")
 
     for i, (label, col) in enumerate([("Multivariata 6D", AZZURRO), ("filteredData", VERDE), ("scalePoint", GIALLO)]):
         x_b = Inches(0.5) + i * Inches(2.55)
@@ -833,20 +1080,17 @@ def slide_graf_parallel(prs):
         ("n_file",              "scaleLinear", "asse 5 — operazioni su file"),
         ("rank",                "scaleLinear", "asse 6 — classifica rischio"),
     ]
-    for i, (col_csv, scala, desc) in enumerate(assi):
-        y_a = Inches(3.0) + i * Inches(0.57)
-        rettangolo(sl, Inches(0.5), y_a, Inches(6.0), Inches(0.52), ACCENT if i%2==0 else SFONDO)
-        rettangolo(sl, Inches(0.5), y_a, Inches(0.06), Inches(0.52), AZZURRO)
-        txt(sl, col_csv, Inches(0.7), y_a+Inches(0.07), Inches(2.2), Inches(0.38), size=11, bold=True, colore=AZZURRO)
-        txt(sl, scala,   Inches(2.95), y_a+Inches(0.07), Inches(1.1), Inches(0.38), size=11, colore=GIALLO)
-        txt(sl, desc,    Inches(4.1),  y_a+Inches(0.07), Inches(2.3), Inches(0.38), size=11, colore=GRIGIO)
+    tabella(sl, None, assi, Inches(0.5), Inches(3.0),
+            [Inches(2.45), Inches(1.15), Inches(2.4)], Inches(0.57),
+            size=11, colori=[AZZURRO, GIALLO, GRIGIO], grassetto=(0,), fondi=(ACCENT, SFONDO))
+    rettangolo(sl, Inches(0.5), Inches(3.0), Inches(0.06), Inches(0.57) * len(assi), AZZURRO)
 
     txt(sl, "Scelte tecniche", Inches(7.0), Inches(2.55), Inches(5.8), Inches(0.38),
         size=14, bold=True, colore=AZZURRO)
     bullets(sl, [
         "scalePoint per l'asse X: posiziona i 6 assi equidistanti sulla larghezza",
         "Una scaleLinear separata per ogni asse (range valori molto diversi tra loro)",
-        "Campionamento a 200 utenti se dataset > 200 (shuffle casuale .slice(0,200))",
+        "Oltre 200 utenti le linee passano su canvas: tutte disegnate, niente campionamento",
         "2 layer: linee grigie opache (contesto) + linee cluster colorate (focus)",
         "mouseover: linea si ispessisce + .raise() la porta in primo piano",
         "Nota testuale in basso indica quanti utenti sono visualizzati",
@@ -858,10 +1102,7 @@ def slide_graf_parallel(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_graf_radar(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Grafico 6 — Radar chart  (multivariate.js)")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Grafico 6 — Radar chart  (multivariate.js)")
 
     for i, (label, col) in enumerate([("Multivariata 6D", AZZURRO), ("cluster_profiles_v2.csv", VERDE), ("d3.lineRadial", GIALLO)]):
         x_b = Inches(0.5) + i * Inches(2.85)
@@ -894,7 +1135,7 @@ def slide_graf_radar(prs):
     txt(sl, "Scelte tecniche chiave", Inches(7.0), Inches(2.55), Inches(5.8), Inches(0.38),
         size=14, bold=True, colore=AZZURRO)
     bullets(sl, [
-        "Fonte: cluster_profiles_v2.csv — 5 righe (medie gia' calcolate, non filtrabili)",
+        "Fonte: medie per cluster sulle righe filtrate, calcolate nel Web Worker (seguono i filtri)",
         "Normalizzazione per-feature tra cluster: extent sui soli 5 valori -> [0.1, 0.9]",
         "Senza normalizzazione tutti i poligoni sarebbero sovrapposti vicino al centro",
         "d3.lineRadial() con curveLinearClosed: chiude automaticamente il poligono",
@@ -908,10 +1149,7 @@ def slide_graf_radar(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_graf_heatmap(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Grafico 7 — Heatmap  (multivariate.js)")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Grafico 7 — Heatmap  (multivariate.js)")
 
     for i, (label, col) in enumerate([("Multivariata 11D", AZZURRO), ("cluster_profiles_v2.csv", VERDE), ("scaleBand", GIALLO)]):
         x_b = Inches(0.5) + i * Inches(2.85)
@@ -959,10 +1197,7 @@ def slide_graf_heatmap(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_flusso_viz(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Finale — Come Funziona Ogni Visualizzazione")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Progetto Finale — Come Funziona Ogni Visualizzazione")
 
     txt(sl, "Ogni modulo segue lo stesso schema interno:",
         Inches(0.5), Inches(1.28), Inches(12.3), Inches(0.4),
@@ -1012,21 +1247,20 @@ def slide_flusso_viz(prs):
 # SLIDE 11 — Flusso aggregazione dati + animazione linee
 # ════════════════════════════════════════════════════════════════════════════════
 
-def slide_flusso_temporale(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Finale — Flusso: Aggregazione e Animazione")
-    sep_orizz(sl)
+def slide_flusso_temporale(prs, dati):
+    t = dati["temporal"]
+    n_cl = len(t["cluster"])
+    sl = nuova_slide(prs, "Progetto Finale — Flusso: Aggregazione e Animazione")
 
-    txt(sl, "Line chart — da 2400 righe a 5 linee animate:",
+    txt(sl, f"Line chart — da {t['righe']} righe a {n_cl} linee animate:",
         Inches(0.5), Inches(1.28), Inches(12.3), Inches(0.4),
         size=14, bold=True, colore=AZZURRO)
 
     steps1 = [
-        "2400 righe CSV\n(utente x settimana)",
+        f"{t['righe']} righe CSV\n(utente x settimana)",
         "Aggrega per\ncluster + settimana\n(media score)",
-        "5 serie\n(una per cluster,\n8 punti ciascuna)",
-        "5 path SVG\ncurveMonotoneX",
+        f"{n_cl} serie\n(una per cluster,\n{t['settimane']} punti ciascuna)",
+        f"{n_cl} path SVG\ncurveMonotoneX",
         "Animazione\nstroke-dasharray",
     ]
     for i, label in enumerate(steps1):
@@ -1059,8 +1293,8 @@ def slide_flusso_temporale(prs):
         size=13, italic=True, colore=GIALLO)
 
     rettangolo(sl, Inches(0.5), Inches(5.6), Inches(12.3), Inches(0.75), ACCENT)
-    txt(sl, "Parallel coordinates — scelta analoga: 300 utenti -> 200 campionati (shuffle casuale) "
-            "per evitare overplotting e blocco del browser.",
+    txt(sl, f"Parallel coordinates — {t['utenti']} utenti: oltre 200 linee disegno su canvas "
+            "(tutte, senza campionare) per evitare migliaia di path SVG e blocchi del browser.",
         Inches(0.65), Inches(5.67), Inches(12.0), Inches(0.62),
         size=13, colore=GRIGIO)
 
@@ -1070,10 +1304,7 @@ def slide_flusso_temporale(prs):
 # ════════════════════════════════════════════════════════════════════════════════
 
 def slide_coordinated(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Finale — Flusso dei Filtri")
-    sep_orizz(sl)
+    sl = nuova_slide(prs, "Progetto Finale — Flusso dei Filtri")
 
     txt(sl, "Ogni filtro si propaga simultaneamente a tutte e 7 le visualizzazioni:",
         Inches(0.5), Inches(1.28), Inches(12.3), Inches(0.4),
@@ -1144,71 +1375,91 @@ def slide_coordinated(prs):
 # SLIDE 13 — I 5 cluster
 # ════════════════════════════════════════════════════════════════════════════════
 
-def slide_cluster(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Progetto Finale — I 5 Cluster")
-    sep_orizz(sl)
-
-    txt(sl, "K-Means k=5 sui pattern comportamentali — i numeri 0-4 sono arbitrari",
-        Inches(0.5), Inches(1.28), Inches(12.3), Inches(0.4),
-        size=13, italic=True, colore=GRIGIO)
-
-    colori_cl = [GRIGIO, AZZURRO, VERDE, AZZURRO, ROSSO]
-    clusters = [
-        ("C0", "Poco attivi",     "0",  "pochi logon, bassa attivita' generale"),
-        ("C1", "After-hour",      "0",  "after_hour_ratio il piu' alto — non sono insider"),
-        ("C2", "Alta intensita'", "0",  "score medio 1.46 — il piu' alto del dataset, zero insider"),
-        ("C3", "File-heavy",      "0",  "molte operazioni su file, attivi in orario"),
-        ("C4", "Insider",         "15", "TUTTI i 15 insider reali — 25% del cluster"),
-    ]
-    col_w_cl = [Inches(1.2), Inches(2.4), Inches(1.2), Inches(7.6)]
-    x0, riga_h, y0 = Inches(0.5), Inches(0.65), Inches(1.82)
-
-    for j, (h_txt, cw) in enumerate(zip(["Cluster","Profilo","Insider","Note"], col_w_cl)):
-        x_c = x0 + sum(col_w_cl[:j])
-        cella = rettangolo(sl, x_c, y0, cw, riga_h, ACCENT)
-        tf = cella.text_frame
-        p = tf.paragraphs[0]
-        p.alignment = PP_ALIGN.CENTER
-        run = p.add_run()
-        run.text = h_txt
-        run.font.size = Pt(13)
-        run.font.bold = True
-        run.font.color.rgb = AZZURRO
-
-    for i, (cn, profilo, ins, note) in enumerate(clusters):
-        bg_r = RGBColor(0x10, 0x10, 0x25) if i % 2 == 0 else SFONDO
-        for j, (val, cw) in enumerate(zip([cn, profilo, ins, note], col_w_cl)):
-            x_c = x0 + sum(col_w_cl[:j])
-            cella = rettangolo(sl, x_c, y0 + riga_h * (i + 1), cw, riga_h, bg_r)
-            tf = cella.text_frame
-            p = tf.paragraphs[0]
-            p.alignment = PP_ALIGN.CENTER if j < 3 else PP_ALIGN.LEFT
-            run = p.add_run()
-            run.text = val
-            run.font.size = Pt(13)
-            run.font.bold = (i == 4)
-            run.font.color.rgb = (colori_cl[i] if j == 0
-                                  else ROSSO if (i == 4 and j == 2)
-                                  else GRIGIO)
-
-    rettangolo(sl, Inches(0.5), Inches(6.2), Inches(12.3), Inches(0.85), ACCENT)
-    txt(sl, "Insight: score medio C4 = 0.92  <  C2 = 1.46.  "
-            "Alto score NON identifica gli insider — conta il pattern comportamentale.",
-        Inches(0.65), Inches(6.27), Inches(12.0), Inches(0.7),
-        size=13, bold=True, colore=ROSSO)
+# nome breve del profilo di ogni cluster (come CLUSTER_LABELS in js/config.js)
+PROFILI_CLUSTER = {
+    0: ("Poco attivi",     "pochi logon, bassa attivita' generale"),
+    1: ("After-hour",      "after_hour_ratio il piu' alto"),
+    2: ("Alta intensita'", "molta attivita' in orario"),
+    3: ("File-heavy",      "molte operazioni su file, attivi in orario"),
+    4: ("Insider",         "pattern after-hour / USB / file"),
+}
+
+def slide_cluster(prs, dati):
+    t = dati["temporal"]
+    cl = t["cluster"]
+    ids = list(cl)
+    # k viene dal CSV intero: col filtro restano solo alcuni cluster
+    tutti_ids = t["etichette_cluster"]
+    sottotitolo = (f"K-Means k={len(tutti_ids)} sui pattern comportamentali — i numeri "
+                   f"{min(tutti_ids, default=0)}-{max(tutti_ids, default=0)} sono arbitrari")
+    if t["filtro"]:
+        sottotitolo += f"  |  numeri filtrati: {len(ids)} cluster su {len(tutti_ids)}"
+
+    # cluster con piu' insider (evidenziato) e cluster con lo score medio piu' alto
+    c_ins = max(ids, key=lambda c: cl[c]["insider"], default=None)
+    if c_ins is not None and cl[c_ins]["insider"] == 0:
+        c_ins = None
+    c_top = max(ids, key=lambda c: cl[c]["score_medio"], default=None)
+    tot_ins = sum(st["insider"] for st in cl.values())
+
+    clusters = []
+    for c in ids:
+        st = cl[c]
+        profilo, nota = PROFILI_CLUSTER.get(c, (f"Cluster {c}", ""))
+        note = [nota] if nota else []
+        note.append(f"{st['utenti']} utenti, score medio {st['score_medio']:.2f}")
+        if c == c_top:
+            note.append("il piu' alto tra i filtrati" if t["filtro"] else "il piu' alto del dataset")
+        if c == c_ins:
+            tutti = "TUTTI i" if st["insider"] == tot_ins else ""
+            note.append(f"{tutti} {st['insider']} insider reali — "
+                        f"{percentuale(st['insider'], st['utenti'])} del cluster".strip())
+        elif st["insider"] == 0:
+            note.append("zero insider")
+        clusters.append((f"C{c}", profilo, str(st["insider"]), " — ".join(note)))
+
+    colori_cl = [GRIGIO, AZZURRO, VERDE, AZZURRO]
+    evidenziata = f"C{c_ins}"  # riga del cluster con gli insider
+
+    def colore(riga, j):
+        if riga[0] == evidenziata and j in (0, 2):
+            return ROSSO
+        return colori_cl[int(riga[0][1:]) % len(colori_cl)] if j == 0 else GRIGIO
+
+    if c_ins is None:
+        insight = "Nessun insider etichettato in questo run: la slide mostra solo i profili."
+    elif c_ins != c_top:
+        insight = (f"Insight: score medio C{c_ins} = {cl[c_ins]['score_medio']:.2f}  <  "
+                   f"C{c_top} = {cl[c_top]['score_medio']:.2f}.  "
+                   "Alto score NON identifica gli insider — conta il pattern comportamentale.")
+    else:
+        insight = (f"Insight: C{c_ins} ha anche lo score medio piu' alto "
+                   f"({cl[c_ins]['score_medio']:.2f}) — score e pattern comportamentale concordano.")
+
+    # con tanti cluster la tabella continua sulle slide successive
+    slide = tabella_paginata(prs, f"Progetto Finale — I {len(tutti_ids)} Cluster",
+                             ["Cluster", "Profilo", "Insider", "Note"], clusters,
+                             [Inches(1.2), Inches(2.4), Inches(1.2), Inches(7.6)], Inches(0.65),
+                             x=Inches(0.5), y=Inches(1.82), y_max=Inches(6.1), size=13,
+                             colori=colore, grassetto=lambda riga, j: riga[0] == evidenziata,
+                             allinea=[PP_ALIGN.CENTER] * 3 + [PP_ALIGN.LEFT])
+    for sl in slide:
+        txt(sl, sottotitolo,
+            Inches(0.5), Inches(1.28), Inches(12.3), Inches(0.4),
+            size=13, italic=True, colore=GRIGIO)
+        rettangolo(sl, Inches(0.5), Inches(6.2), Inches(12.3), Inches(0.85), ACCENT)
+        txt(sl, insight,
+            Inches(0.65), Inches(6.27), Inches(12.0), Inches(0.7),
+            size=13, bold=True, colore=ROSSO)
+    return slide
 
 
 # ════════════════════════════════════════════════════════════════════════════════
 # SLIDE 14 — Conclusioni
 # ════════════════════════════════════════════════════════════════════════════════
 
-def slide_conclusioni(prs):
-    sl = nuova_slide(prs)
-    sfondo_slide(sl)
-    barra_titolo(sl, "Conclusioni")
-    sep_orizz(sl)
+def slide_conclusioni(prs, dati):
+    sl = nuova_slide(prs, "Conclusioni")
 
     txt(sl, "Cosa ho imparato su D3.js", Inches(0.5), Inches(1.3),
         Inches(5.9), Inches(0.45), size=16, bold=True, colore=AZZURRO)
@@ -1226,7 +1477,7 @@ def slide_conclusioni(prs):
     tabella(sl,
         ["", "Intermedio", "Finale"],
         [
-            ("Dati",          "JSON, 10 record",     "CSV, 300 record"),
+            ("Dati",          "JSON, 10 record",     f"CSV, {dati['temporal']['utenti']} record"),
             ("Caricamento",   "d3.json()",           "d3.csv() x2 + join"),
             ("Scale",         "scaleLinear x2",      "bin / sqrt / point / band"),
             ("Interazione",   "click su glifo",      "filtri coordinated"),
@@ -1244,41 +1495,136 @@ def slide_conclusioni(prs):
 
 
 # ════════════════════════════════════════════════════════════════════════════════
-# Main
+# SLIDE opzionali — grafico renderizzato dai CSV (vedi grafici_deck.py)
 # ════════════════════════════════════════════════════════════════════════════════
 
-def genera():
+def slide_grafico(prs, immagini, nome, titolo, didascalia):
+    """Immagine del grafico centrata sotto la barra; niente slide se l'immagine non c'e'."""
+    immagine = immagini.get(nome)
+    if immagine is None:
+        return None
+    sl = nuova_slide(prs, titolo)
+    pic = sl.shapes.add_picture(immagine, Inches(0), Inches(1.35), height=Inches(5.45))
+    pic.left = (W - pic.width) // 2
+    txt(sl, didascalia, Inches(0.5), Inches(6.9), Inches(12.3), Inches(0.45),
+        size=12, italic=True, colore=GRIGIO, align=PP_ALIGN.CENTER)
+    return sl
+
+
+# ════════════════════════════════════════════════════════════════════════════════
+# SLIDE opzionali — Top N utenti per rischio (tabella su piu' slide)
+# ════════════════════════════════════════════════════════════════════════════════
+
+def slide_top_utenti(prs, dati, n):
+    """Gli n utenti con lo score massimo piu' alto; la tabella continua sulle slide successive."""
+    rischio = dati["temporal"]["rischio"]
+    top = heapq.nlargest(n, rischio.items(), key=lambda kv: kv[1][0])
+    righe = [(pos, user, c, "si" if ins else "no", f"{score:.3f}", settimana)
+             for pos, (user, (score, settimana, c, ins)) in enumerate(top, 1)]
+    return tabella_paginata(prs, f"Progetto Finale — Top {len(righe)} utenti per rischio",
+                            ["#", "Utente", "Cluster", "Insider", "Score max", "Settimana"],
+                            righe, [Inches(0.9), Inches(3.6), Inches(1.7), Inches(1.7), Inches(2.4), Inches(2.0)],
+                            Inches(0.4), x=Inches(0.5), y=Inches(1.4), size=11)
+
+
+def crea_template():
+    """Presentazione vuota gia' impostata, salvata in memoria.
+
+    Sfondo, barra del titolo e separatore sono disegnati qui una volta sola (nel
+    master e nel layout LAYOUT_TITOLO), non su ogni slide. Nei batch la costruisco
+    una volta per processo e ogni deck riparte da questi byte.
+    """
     prs = Presentation()
     prs.slide_width  = W
     prs.slide_height = H
 
+    # sfondo scuro nel master: lo ereditano tutti i layout
+    fill = prs.slide_master.background.fill
+    fill.solid()
+    fill.fore_color.rgb = SFONDO
+
+    # il layout del titolo perde i suoi placeholder e riceve barra e separatore;
+    # le forme le disegno su una slide di appoggio e sposto l'XML nel layout
+    layout = prs.slide_layouts[LAYOUT_TITOLO]
+    for ph in list(layout.placeholders):
+        ph._element.getparent().remove(ph._element)
+    appoggio = prs.slides.add_slide(prs.slide_layouts[LAYOUT_VUOTO])
+    rettangolo(appoggio, Inches(0), Inches(0), W, ALTEZZA_BARRA, ACCENT)
+    sep_orizz(appoggio)
+    for shp in list(appoggio.shapes):
+        layout.shapes._spTree.append(shp._element)
+    # tolgo la slide di appoggio (senza relazione non finisce nel file)
+    sld_id = prs.slides._sldIdLst[-1]
+    prs.part.drop_rel(sld_id.rId)
+    prs.slides._sldIdLst.remove(sld_id)
+
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+def genera(csv_temporal=CSV_TEMPORAL, csv_profili=CSV_PROFILI, out=PPTX_OUT,
+           filtro=None, template=None, top=0, grafici=True, workers_grafici=None):
+    """Costruisce e salva il deck; ritorna (numero di slide, righe lette dopo il filtro).
+
+    top > 0 aggiunge prima delle conclusioni la classifica dei top utenti per rischio.
+    grafici=True aggiunge i grafici renderizzati (se numpy e matplotlib ci sono);
+    workers_grafici = processi per disegnarli (1 = nel processo corrente).
+    """
+    # una passata sui CSV per tutti i numeri delle slide (e per le medie dei grafici)
+    aggregati = grafici_deck.Aggregati() if grafici and grafici_deck.disponibile() else None
+    dati = {"temporal": leggi_temporal(csv_temporal, filtro, aggregati),
+            "profili": leggi_profili(csv_profili)}
+
+    immagini = {}
+    if aggregati is not None:
+        immagini = grafici_deck.renderizza(csv_temporal, filtro=filtro, workers=workers_grafici,
+                                           aggregati=aggregati)
+
+    prs = Presentation(io.BytesIO(template or crea_template()))
+
     slide_copertina(prs)           # 1
     slide_sep_intermedio(prs)      # 2
     slide_intermedio_overview(prs) # 3
     slide_intermedio_d3(prs)       # 4
     slide_intermedio_glifo(prs)    # 5
     slide_sep_finale(prs)          # 6
-    slide_dataset(prs)             # 7
-    slide_dati_csv(prs)            # 8  — struttura dei due CSV
+    slide_dataset(prs, dati)       # 7
+    slide_dati_csv(prs, dati)      # 8  — struttura dei due CSV
     slide_architettura(prs)        # 9  — architettura moduli JS
-    slide_architettura_dati(prs)   # 10 — colonna -> grafico
+    slide_architettura_dati(prs, dati)  # 10 — colonna -> grafico
     slide_graf_istogramma(prs)     # 11 — grafico 1
-    slide_graf_scatter(prs)        # 12 — grafico 2
-    slide_graf_bubble(prs)         # 13 — grafico 3
-    slide_graf_line(prs)           # 14 — grafico 4
+    slide_grafico(prs, immagini, "istogramma", "Grafico 1 — Istogramma dai dati",
+                  "Score medio per utente, 20 bin (np.histogram)")
+    slide_graf_scatter(prs, dati)  # 12 — grafico 2
+    slide_grafico(prs, immagini, "scatter", "Grafico 2 — Scatter rank vs score dai dati",
+                  "Un punto per utente: rank e score medi, insider in rosso")
+    slide_graf_bubble(prs, dati)   # 13 — grafico 3
+    slide_graf_line(prs, dati)     # 14 — grafico 4
+    slide_grafico(prs, immagini, "linea", "Grafico 4 — Line chart temporale dai dati",
+                  "Score medio per cluster e settimana")
     slide_graf_parallel(prs)       # 15 — grafico 5
     slide_graf_radar(prs)          # 16 — grafico 6
     slide_graf_heatmap(prs)        # 17 — grafico 7
+    slide_grafico(prs, immagini, "heatmap", "Grafico 7 — Heatmap dai dati",
+                  "Medie per cluster di ogni feature, normalizzate tra i cluster")
     slide_flusso_viz(prs)          # 18 — scale D3 riepilogo
-    slide_flusso_temporale(prs)    # 19 — animazione linee
+    slide_flusso_temporale(prs, dati)  # 19 — animazione linee
     slide_coordinated(prs)         # 20 — filtri coordinated
-    slide_cluster(prs)             # 21 — i 5 cluster
-    slide_conclusioni(prs)         # 22
-
-    out = "_docs/presentazione_infovis.pptx"
+    slide_cluster(prs, dati)       # 21 — i cluster
+    if top:
+        slide_top_utenti(prs, dati, top)  # opzionale, anche piu' slide
+    slide_conclusioni(prs, dati)   # 22
+
+    cartella = os.path.dirname(out)
+    if cartella:
+        os.makedirs(cartella, exist_ok=True)
     prs.save(out)
-    print(f"Salvato: {out}  ({len(prs.slides)} slide)")
+    return len(prs.slides), dati["temporal"]["righe"]
 
 
 if __name__ == "__main__":
-    genera()
+    argomenti = sys.argv[1:4]
+    top = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    n_slide, righe = genera(*argomenti, top=top)
+    out = argomenti[2] if len(argomenti) > 2 else PPTX_OUT
+    print(f"Salvato: {out}  ({n_slide} slide, {righe} righe lette)")
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Grafici della dashboard renderizzati in PNG per il deck (senza browser)
+
+Riproduce dal CSV temporale l'istogramma degli score, lo scatter rank vs score,
+la linea cluster x settimana e la heatmap cluster x feature. Il CSV si legge in
+streaming a blocchi di righe (Aggregati): per ogni blocco somme e conteggi per
+utente / cluster / settimana con bincount, quindi la memoria non cresce con le
+righe. genera_ppt.py riempie gli Aggregati nella sua stessa passata sul CSV.
+
+Le immagini vanno in una cache su disco con chiave (hash del CSV, grafico,
+parametri): rigenerare il deck dopo aver cambiato un testo non ridisegna niente.
+I grafici mancanti si disegnano in un pool di processi.
+
+Servono numpy e matplotlib (pip install numpy matplotlib): se mancano
+disponibile() ritorna False e genera_ppt.py fa il deck senza immagini.
+
+Uso:
+    python grafici_deck.py                                # CSV di default
+    python grafici_deck.py anomalies.csv --workers 4
+"""
+
+import argparse
+import hashlib
+import json
+import csv
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import csv_colonnare
+
+try:
+    import numpy as np
+    import matplotlib
+    matplotlib.use("Agg")  # niente display: disegno solo su file
+    import matplotlib.pyplot as plt
+except ImportError:  # opzionali: pip install numpy matplotlib
+    np = plt = None
+
+CSV_DEFAULT = csv_colonnare.CSV_DEFAULT
+CARTELLA_CACHE = "_docs/cache_grafici"
+VERSIONE = 1  # da incrementare quando cambia l'aspetto dei grafici (invalida la cache)
+
+# stessi colori di js/config.js (tab10 = d3.schemeCategory10)
+PRIMARY = "#3498db"
+INSIDER = "#e74c3c"
+NORMALE = "#2ecc71"
+COLORI_CLUSTER = "tab10"
+FEATURE_HEATMAP = [
+    "O", "C", "E", "A", "N",
+    "n_logon", "n_email", "n_http",
+    "n_afterhourallact", "final_anomaly_score",
+    "cluster_distance",
+]
+
+# tema scuro come le slide (SFONDO / GRIGIO di genera_ppt.py)
+STILE = {
+    "figure.facecolor": "#1A1A2E",
+    "axes.facecolor": "#1A1A2E",
+    "savefig.facecolor": "#1A1A2E",
+    "axes.edgecolor": "#B0C4DE",
+    "axes.labelcolor": "#B0C4DE",
+    "text.color": "#B0C4DE",
+    "xtick.color": "#B0C4DE",
+    "ytick.color": "#B0C4DE",
+    "axes.spines.top": False,
+    "axes.spines.right": False,
+    "font.size": 12,
+}
+DIMENSIONE = (10, 5.2)  # pollici, circa il riquadro immagine della slide
+DPI = 150
+
+
+def disponibile():
+    return np is not None
+
+# ─── Dati ────────────────────────────────────────────────────────────────────
+
+BLOCCO = 4096  # righe per blocco: in memoria c'e' solo un blocco alla volta
+
+# colonne per utente che servono a istogramma e scatter
+COLONNE_UTENTE = ("final_anomaly_score", "rank")
+
+def impronta_file(percorso):
+    """sha256 del contenuto (a blocchi, non serve tenere il file in memoria)."""
+    h = hashlib.sha256()
+    with open(percorso, "rb") as f:
+        for blocco in iter(lambda: f.read(1 << 20), b""):
+            h.update(blocco)
+    return h.hexdigest()
+
+def _cella(valore):
+    try:
+        return float(valore)
+    except ValueError:
+        return np.nan  # vuota o testo: non entra nelle medie
+
+def _numeri(celle):
+    """Celle di testo -> array float, NaN per vuote e non numeriche."""
+    try:
+        return np.array(celle, dtype=float)  # caso normale: tutte numeriche, parsing in C
+    except ValueError:
+        return np.array([_cella(v) for v in celle], dtype=float)
+
+def _estendi(vettore, n):
+    """Allunga con zeri fino a n elementi (arrivano utenti nuovi a ogni blocco)."""
+    return vettore if len(vettore) >= n else np.concatenate([vettore, np.zeros(n - len(vettore))])
+
+def _somma_in(dizionario, prima, seconda, valori):
+    """dizionario[(a, b)] += (somma, conteggio) dei valori del blocco per ogni coppia."""
+    a, i_a = np.unique(prima, return_inverse=True)
+    b, i_b = np.unique(seconda, return_inverse=True)
+    # un solo bincount sulla coppia linearizzata
+    chiave = i_a * len(b) + i_b
+    somme = np.bincount(chiave, weights=valori, minlength=len(a) * len(b))
+    conteggi = np.bincount(chiave, minlength=len(a) * len(b))
+    for k in np.flatnonzero(conteggi):
+        gruppo = (a[k // len(b)], b[k % len(b)])
+        vecchio = dizionario.get(gruppo, (0.0, 0))
+        dizionario[gruppo] = (vecchio[0] + somme[k], vecchio[1] + conteggi[k])
+
+class Aggregati:
+    """Somme e conteggi per i grafici, riempiti a blocchi di righe gia' filtrate.
+
+    Non tengo le righe: per utente (istogramma, scatter), per (cluster, settimana)
+    (linea) e per (cluster, feature) (heatmap). La memoria dipende da utenti, cluster
+    e settimane come in genera_ppt.leggi_temporal, che li riempie nella sua passata.
+    Valori non finiti (celle vuote, NaN, inf) non entrano in nessuna media.
+    """
+
+    def __init__(self, feature=FEATURE_HEATMAP):
+        self.feature_richieste = list(feature)
+        self.righe = 0
+        self.codici = {}  # user_id -> codice (posizione negli array per utente)
+        self.somme = {nome: np.zeros(0) for nome in COLONNE_UTENTE}
+        self.conteggi = {nome: np.zeros(0) for nome in COLONNE_UTENTE}
+        self.prima = {"insider": np.zeros(0), "cluster": np.zeros(0)}  # prima riga dell'utente
+        self.linea = {}    # (cluster, settimana) -> (somma score, righe)
+        self.profili = {}  # (cluster, j feature) -> (somma, righe)
+
+    def inizia(self, nomi):
+        self.indice = {nome: j for j, nome in enumerate(nomi)}
+        self.feature = [f for f in self.feature_richieste
+                        if f in self.indice and f not in csv_colonnare.COLONNE_STRINGA]
+
+    def _colonna(self, righe, nome):
+        j = self.indice.get(nome)
+        if j is None:
+            return np.full(len(righe), np.nan)
+        return _numeri([r[j] for r in righe])
+
+    def aggiungi(self, righe):
+        """Un blocco di righe (liste di celle, lunghe almeno quanto l'header)."""
+        if not righe:
+            return
+        self.righe += len(righe)
+        score = self._colonna(righe, "final_anomaly_score")
+        cluster = self._colonna(righe, "cluster")
+
+        j_user = self.indice.get("user_id")
+        if j_user is not None:
+            prima_n = len(self.codici)
+            codici = np.fromiter((self.codici.setdefault(r[j_user], len(self.codici)) for r in righe),
+                                 dtype=np.int64, count=len(righe))
+            n = len(self.codici)
+            valori = {"final_anomaly_score": score, "rank": self._colonna(righe, "rank")}
+            for nome in COLONNE_UTENTE:
+                validi = np.isfinite(valori[nome])
+                self.somme[nome] = _estendi(self.somme[nome], n) + np.bincount(
+                    codici[validi], weights=valori[nome][validi], minlength=n)
+                self.conteggi[nome] = _estendi(self.conteggi[nome], n) + np.bincount(
+                    codici[validi], minlength=n)
+            # utenti nuovi di questo blocco: tengo insider e cluster della loro prima riga
+            nuovi, prima = np.unique(codici, return_index=True)
+            prima = prima[nuovi >= prima_n]
+            colonne_prima = {"insider": self._colonna(righe, "insider"), "cluster": cluster}
+            for nome, valori_prima in colonne_prima.items():
+                self.prima[nome] = np.concatenate([self.prima[nome], valori_prima[prima]])
+
+        settimana = self._colonna(righe, "week")
+        validi = np.isfinite(cluster) & np.isfinite(settimana) & np.isfinite(score)
+        if validi.any():
+            _somma_in(self.linea, cluster[validi], settimana[validi], score[validi])
+
+        for j, nome in enumerate(self.feature):
+            valori = score if nome == "final_anomaly_score" else self._colonna(righe, nome)
+            validi = np.isfinite(cluster) & np.isfinite(valori)
+            if validi.any():
+                _somma_in(self.profili, cluster[validi], np.full(validi.sum(), j), valori[validi])
+
+    def per_utente(self):
+        """Media per utente di score e rank (NaN se l'utente non ha valori validi)
+        + insider e cluster della prima riga. Come DataLoader.aggregateUsers."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medie = {nome: self.somme[nome] / self.conteggi[nome] for nome in COLONNE_UTENTE}
+        medie.update(self.prima)
+        return medie
+
+    def cluster_settimane(self):
+        """(cluster, settimane, medie[cluster, settimana]) con NaN dove non ci sono righe."""
+        cluster = sorted({c for c, _ in self.linea})
+        settimane = sorted({w for _, w in self.linea})
+        medie = np.full((len(cluster), len(settimane)), np.nan)
+        riga, colonna = {c: i for i, c in enumerate(cluster)}, {w: i for i, w in enumerate(settimane)}
+        for (c, w), (somma, n) in self.linea.items():
+            medie[riga[c], colonna[w]] = somma / n
+        return cluster, np.array(settimane), medie
+
+    def profili_cluster(self, feature):
+        """(cluster, feature, medie[cluster, feature]) per le feature richieste che ci sono
+        nel CSV, con NaN dove non ci sono valori."""
+        cluster = sorted({c for c, _ in self.profili})
+        medie = np.full((len(cluster), len(self.feature)), np.nan)
+        riga = {c: i for i, c in enumerate(cluster)}
+        for (c, j), (somma, n) in self.profili.items():
+            medie[riga[c], int(j)] = somma / n
+        scelte = [j for j, f in enumerate(self.feature) if f in feature]
+        return cluster, [self.feature[j] for j in scelte], medie[:, scelte]
+
+    def __getstate__(self):
+        # ai processi del pool servono solo i risultati: il dizionario degli utenti resta qui
+        stato = dict(self.__dict__)
+        stato["codici"] = {}
+        return stato
+
+def aggrega(percorso, filtro=None, feature=FEATURE_HEATMAP):
+    """Passata in streaming sul CSV (stesso filtro di genera_ppt.leggi_temporal)."""
+    aggregati = Aggregati(feature)
+    with open(percorso, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        nomi = next(reader)
+        condizioni = csv_colonnare.condizioni_filtro(nomi, filtro, percorso)
+        aggregati.inizia(nomi)
+        blocco = []
+        for riga in reader:
+            if not riga:
+                continue
+            if len(riga) < len(nomi):
+                riga += [""] * (len(nomi) - len(riga))
+            if not csv_colonnare.rispetta(riga, condizioni):
+                continue
+            blocco.append(riga)
+            if len(blocco) >= BLOCCO:
+                aggregati.aggiungi(blocco)
+                blocco = []
+        aggregati.aggiungi(blocco)
+    return aggregati
+
+def _etichetta(c):
+    return f"Cluster {c:g}"
+
+# ─── Grafici ─────────────────────────────────────────────────────────────────
+# ognuno riceve gli Aggregati delle righe filtrate e ritorna una Figure matplotlib
+
+def istogramma(aggregati, bins=20):
+    score = aggregati.per_utente()["final_anomaly_score"]
+    score = score[np.isfinite(score)]  # utenti senza nessuno score valido
+    conteggi, bordi = np.histogram(score, bins=bins)
+    fig, ax = plt.subplots(figsize=DIMENSIONE)
+    ax.bar(bordi[:-1], conteggi, width=np.diff(bordi), align="edge",
+           color=PRIMARY, edgecolor=STILE["figure.facecolor"])
+    ax.set_xlabel("Anomaly score (media per utente)")
+    ax.set_ylabel("Utenti")
+    ax.set_title(f"Distribuzione degli score  ({len(score)} utenti, {bins} bin)")
+    return fig
+
+def scatter(aggregati):
+    utenti = aggregati.per_utente()
+    # solo gli utenti con rank e score validi
+    validi = np.isfinite(utenti["rank"]) & np.isfinite(utenti["final_anomaly_score"])
+    utenti = {nome: valori[validi] for nome, valori in utenti.items()}
+    insider = utenti["insider"] == 1
+    fig, ax = plt.subplots(figsize=DIMENSIONE)
+    # prima i normali, poi gli insider sopra
+    ax.scatter(utenti["rank"][~insider], utenti["final_anomaly_score"][~insider],
+               s=18, alpha=0.7, color=NORMALE, label="Normale")
+    ax.scatter(utenti["rank"][insider], utenti["final_anomaly_score"][insider],
+               s=40, alpha=0.9, color=INSIDER, label="Insider")
+    ax.set_xlabel("Rank medio")
+    ax.set_ylabel("Anomaly score medio")
+    ax.set_title("Rank vs score")
+    ax.legend(frameon=False)
+    return fig
+
+def linea(aggregati):
+    cluster, settimane, medie = aggregati.cluster_settimane()
+    colori = plt.get_cmap(COLORI_CLUSTER)
+    fig, ax = plt.subplots(figsize=DIMENSIONE)
+    for k, c in enumerate(cluster):
+        ax.plot(settimane, medie[k], marker="o", linewidth=2, color=colori(int(c) % 10),
+                label=_etichetta(c))
+    ax.set_xlabel("Settimana")
+    ax.set_ylabel("Anomaly score medio")
+    ax.set_title("Score medio per cluster e settimana")
+    ax.legend(frameon=False, ncol=max(1, min(len(cluster), 5)))
+    return fig
+
+def heatmap(aggregati, feature=FEATURE_HEATMAP):
+    cluster, feature, medie = aggregati.profili_cluster(feature)
+    # normalizzo ogni feature tra i cluster in [0, 1] (come profili.normalized in multivariate.js)
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # feature tutta NaN
+        minimi, massimi = np.nanmin(medie, axis=0), np.nanmax(medie, axis=0)
+    ampiezza = np.where(massimi > minimi, massimi - minimi, 1)
+    normalizzate = (medie - minimi) / ampiezza
+    fig, ax = plt.subplots(figsize=DIMENSIONE)
+    im = ax.imshow(normalizzate, cmap="RdYlGn", aspect="auto", vmin=0, vmax=1)
+    ax.set_xticks(range(len(feature)), feature, rotation=35, ha="right")
+    ax.set_yticks(range(len(cluster)), [_etichetta(c) for c in cluster])
+    ax.set_title("Profili medi per cluster (normalizzati tra i cluster)")
+    fig.colorbar(im, ax=ax, fraction=0.03)
+    fig.tight_layout()
+    return fig
+
+def nessun_dato(titolo):
+    """Segnaposto quando il filtro non lascia righe (la slide resta, con la scritta)."""
+    fig, ax = plt.subplots(figsize=DIMENSIONE)
+    ax.axis("off")
+    ax.text(0.5, 0.5, "Nessun dato per questo filtro", ha="center", va="center", fontsize=20)
+    ax.set_title(titolo)
+    return fig
+
+GRAFICI = {
+    "istogramma": (istogramma, {"bins": 20}),
+    "scatter":    (scatter, {}),
+    "linea":      (linea, {}),
+    "heatmap":    (heatmap, {"feature": FEATURE_HEATMAP}),
+}
+
+# ─── Cache e pool ────────────────────────────────────────────────────────────
+
+def chiave_cache(impronta, grafico, parametri):
+    testo = json.dumps([VERSIONE, impronta, grafico, parametri], sort_keys=True, default=str)
+    return hashlib.sha256(testo.encode("utf-8")).hexdigest()[:20]
+
+def _disegna(aggregati, grafico, parametri, destinazione):
+    """Disegna un grafico e lo salva (file temporaneo + rename, come csv_colonnare.scrivi)."""
+    parametri = dict(parametri)
+    filtro = parametri.pop("filtro")
+    funzione = GRAFICI[grafico][0]
+    with plt.rc_context(STILE):
+        if aggregati.righe:
+            fig = funzione(aggregati, **parametri)
+        else:
+            fig = nessun_dato(f"{grafico}  (filtro {json.dumps(filtro, default=str)})")
+        tmp = f"{destinazione}.{os.getpid()}.tmp"
+        fig.savefig(tmp, format="png", dpi=DPI, bbox_inches="tight")
+        plt.close(fig)
+    os.replace(tmp, destinazione)
+    return destinazione
+
+def renderizza(percorso=CSV_DEFAULT, filtro=None, grafici=None, workers=None,
+               cartella=CARTELLA_CACHE, aggregati=None):
+    """Ritorna {grafico: percorso PNG}; disegna solo quelli che non sono in cache.
+
+    workers=None -> un processo per grafico mancante (fino al numero di CPU);
+    workers=1 -> tutto nel processo corrente (es. dentro i worker di genera_batch.py).
+    aggregati = Aggregati gia' riempiti con lo stesso filtro (genera_ppt li riempie in
+    leggi_temporal); se mancano e c'e' qualcosa da disegnare faccio io la passata sul CSV.
+    """
+    impronta = impronta_file(percorso)
+    os.makedirs(cartella, exist_ok=True)
+    percorsi, mancanti = {}, []
+    for nome in grafici or GRAFICI:
+        parametri = {**GRAFICI[nome][1], "filtro": filtro or {}}
+        destinazione = os.path.join(cartella, f"{nome}_{chiave_cache(impronta, nome, parametri)}.png")
+        percorsi[nome] = destinazione
+        if not os.path.exists(destinazione):
+            mancanti.append((nome, parametri, destinazione))
+    if mancanti and aggregati is None:
+        aggregati = aggrega(percorso, filtro)
+    mancanti = [(aggregati, *job) for job in mancanti]
+
+    if workers is None:
+        workers = min(len(mancanti), os.cpu_count() or 1)
+    if workers <= 1 or len(mancanti) <= 1:
+        for job in mancanti:
+            _disegna(*job)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_disegna, *zip(*mancanti)))
+    return percorsi
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Renderizza i grafici del deck nella cache")
+    parser.add_argument("csv", nargs="?", default=CSV_DEFAULT)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cartella", default=CARTELLA_CACHE)
+    args = parser.parse_args(argv)
+    if not disponibile():
+        sys.exit("ERRORE: servono numpy e matplotlib (pip install numpy matplotlib)")
+    if not os.path.exists(args.csv):
+        sys.exit(f"ERRORE: {args.csv} non trovato")
+    t0 = time.perf_counter()
+    percorsi = renderizza(args.csv, workers=args.workers, cartella=args.cartella)
+    for nome, percorso in percorsi.items():
+        print(f"  {nome:<11} {percorso}")
+    print(f"Fatto in {time.perf_counter() - t0:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,135 +1,187 @@
 // bivariate.js - scatterplot per relazione tra 2 variabili
 // Riferimento: 080-simple-visualization-strategies (relazioni bivariate)
+// Lo scheletro lo creo una volta; ai cambi di filtro faccio il join dei punti
+// con chiave user_id, così tocco solo gli utenti entrati o usciti
 
 class BivariateCharts {
     
     // scatterplot che mostra rank vs score
-    static createScatterRankScore(data, containerId) {
-        // Aggrega per utente: media rank, media score, insider fisso, cluster più frequente
-        const byUser = d3.rollup(
-            data,
-            rows => ({
-                user_id: rows[0].user_id,
-                rank: d3.mean(rows, r => r.rank),
-                final_anomaly_score: d3.mean(rows, r => r.final_anomaly_score),
-                insider: rows[0].insider,
-                cluster: rows[0].cluster,
-            }),
-            d => d.user_id
-        );
-        const aggData = Array.from(byUser.values());
-        console.log('Creo scatterplot con', aggData.length, 'utenti unici (aggregati da', data.length, 'righe)');
+    // users = tabella per-utente di DataLoader.getUserAggregates (se manca la calcolo)
+    static createScatterRankScore(data, containerId, users = null) {
+        // un punto per utente: media rank, media score, insider e cluster della prima riga
+        const aggData = users || DataLoader.aggregateUsers(data);
+        debugLog('Creo scatterplot con', aggData.length, 'utenti unici (aggregati da', data.length, 'righe)');
 
-        // pulisco il container
-        d3.select(`#${containerId}`).selectAll('*').remove();
+        const container = d3.select(`#${containerId}`);
         
         const margin = CONFIG.charts.margin;
         const width = CONFIG.charts.scatter.width - margin.left - margin.right;
         const height = CONFIG.charts.scatter.height - margin.top - margin.bottom;
         
-        const svg = d3.select(`#${containerId}`)
-            .append('svg')
-            .attr('width', width + margin.left + margin.right)
-            .attr('height', height + margin.top + margin.bottom)
-            .append('g')
-            .attr('transform', `translate(${margin.left},${margin.top})`);
+        // con troppi utenti i punti vanno su canvas (vedi canvas-layer.js)
+        const usaCanvas = CanvasLayer.usaCanvas(aggData.length);
+        
+        // scheletro (SVG, assi, label, legenda) solo la prima volta
+        // o quando si passa da SVG a canvas e viceversa
+        let svg = container.select('svg > g');
+        const primaVolta = svg.empty() || usaCanvas !== (CanvasLayer.per(containerId) !== null);
+        if (primaVolta) {
+            container.selectAll('*').remove();
+            const parent = usaCanvas
+                ? CanvasLayer.crea(containerId, width + margin.left + margin.right,
+                                   height + margin.top + margin.bottom, margin).wrapper
+                : container;
+            svg = parent
+                .append('svg')
+                .attr('width', width + margin.left + margin.right)
+                .attr('height', height + margin.top + margin.bottom)
+                .append('g')
+                .attr('transform', `translate(${margin.left},${margin.top})`);
+            
+            // Assi
+            svg.append('g')
+                .attr('class', 'axis x-axis')
+                .attr('transform', `translate(0,${height})`);
+            
+            svg.append('g')
+                .attr('class', 'axis y-axis');
+            
+            // Label
+            svg.append('text')
+                .attr('class', 'axis-label')
+                .attr('x', width / 2)
+                .attr('y', height + 40)
+                .attr('text-anchor', 'middle')
+                .text('Rank (1 = più anomalo)');
+            
+            svg.append('text')
+                .attr('class', 'axis-label')
+                .attr('transform', 'rotate(-90)')
+                .attr('x', -height / 2)
+                .attr('y', -45)
+                .attr('text-anchor', 'middle')
+                .text('Anomaly Score');
+            
+            svg.append('g').attr('class', 'punti');
+            
+            // Legenda
+            const legend = svg.append('g')
+                .attr('class', 'legend')
+                .attr('transform', `translate(${width - 120}, 20)`);
+            
+            const legendData = [
+                { label: 'Insider', color: CONFIG.colors.insider },
+                { label: 'Normale', color: CONFIG.colors.normal }
+            ];
+            
+            legend.selectAll('g')
+                .data(legendData)
+                .join('g')
+                .attr('transform', (d, i) => `translate(0, ${i * 20})`)
+                .each(function(d) {
+                    const g = d3.select(this);
+                    g.append('circle')
+                        .attr('r', 5)
+                        .attr('fill', d.color);
+                    g.append('text')
+                        .attr('x', 10)
+                        .attr('y', 5)
+                        .text(d.label);
+                });
+        }
         
         // scale per x e y
         const x = d3.scaleLinear()
-            .domain([0, d3.max(aggData, d => d.rank)])
+            .domain([0, d3.max(aggData, d => d.rank) || 1])
             .range([0, width]);
         
         const y = d3.scaleLinear()
-            .domain([d3.min(aggData, d => d.final_anomaly_score), 
-                     d3.max(aggData, d => d.final_anomaly_score)])
+            .domain([d3.min(aggData, d => d.final_anomaly_score) || 0, 
+                     d3.max(aggData, d => d.final_anomaly_score) || 1])
             .nice()
             .range([height, 0]);
         
         const colorScale = d => d.insider === 1 ? CONFIG.colors.insider : CONFIG.colors.normal;
+        const t = svg.transition().duration(CONFIG.transition.duration);
         
-        // Assi
-        svg.append('g')
-            .attr('class', 'axis x-axis')
-            .attr('transform', `translate(0,${height})`)
-            .call(d3.axisBottom(x));
-        
-        svg.append('g')
-            .attr('class', 'axis y-axis')
-            .call(d3.axisLeft(y));
-        
-        // Label
-        svg.append('text')
-            .attr('class', 'axis-label')
-            .attr('x', width / 2)
-            .attr('y', height + 40)
-            .attr('text-anchor', 'middle')
-            .text('Rank (1 = più anomalo)');
-        
-        svg.append('text')
-            .attr('class', 'axis-label')
-            .attr('transform', 'rotate(-90)')
-            .attr('x', -height / 2)
-            .attr('y', -45)
-            .attr('text-anchor', 'middle')
-            .text('Anomaly Score');
+        svg.select('.x-axis').transition(t).call(d3.axisBottom(x));
+        svg.select('.y-axis').transition(t).call(d3.axisLeft(y));
         
         // Tooltip
-        const tooltip = d3.select('body').append('div').attr('class', 'tooltip');
-        
-        // Points
-        svg.selectAll('.dot')
-            .data(aggData)
-            .join('circle')
-            .attr('class', d => `dot ${d.insider === 1 ? 'insider' : 'normal'}`)
-            .attr('cx', d => x(d.rank))
-            .attr('cy', d => y(d.final_anomaly_score))
-            .attr('r', 0)
-            .attr('fill', colorScale)
-            .on('mouseover', function(event, d) {
-                d3.select(this).attr('r', 8);
-                tooltip.html(`
-                    <strong>User ${d.user_id}</strong><br>
-                    Rank medio: ${d.rank.toFixed(0)}<br>
-                    Score medio: ${d.final_anomaly_score.toFixed(2)}<br>
-                    Cluster: ${d.cluster}<br>
-                    Tipo: ${d.insider === 1 ? '⚠ Insider' : 'Normale'}
-                `)
-                .style('opacity', 1)
-                .style('left', (event.pageX + 10) + 'px')
-                .style('top', (event.pageY - 20) + 'px');
-            })
-            .on('mouseout', function() {
-                d3.select(this).attr('r', 4);
-                tooltip.style('opacity', 0);
-            })
-            .transition()
-            .duration(CONFIG.transition.duration)
-            .delay((d, i) => i * 5)
-            .attr('r', 4);
-        
-        // Legenda
-        const legend = svg.append('g')
-            .attr('class', 'legend')
-            .attr('transform', `translate(${width - 120}, 20)`);
+        const tooltip = getTooltip(containerId);
         
-        const legendData = [
-            { label: 'Insider', color: CONFIG.colors.insider },
-            { label: 'Normale', color: CONFIG.colors.normal }
-        ];
+        if (usaCanvas) {
+            // tutti gli utenti su canvas, tooltip col punto più vicino (quadtree)
+            CanvasLayer.per(containerId)
+                .cerchi(aggData, {
+                    x: d => x(d.rank),
+                    y: d => y(d.final_anomaly_score),
+                    r: () => 4,
+                    fill: colorScale
+                })
+                .evidenziaCon((ctx, d) => {
+                    ctx.beginPath();
+                    ctx.arc(x(d.rank), y(d.final_anomaly_score), 8, 0, 2 * Math.PI);
+                    ctx.fillStyle = colorScale(d);
+                    ctx.fill();
+                })
+                .onHover((event, d) => {
+                    if (!d) {
+                        tooltip.style('opacity', 0);
+                        return;
+                    }
+                    tooltip.html(`
+                        <strong>User ${d.user_id}</strong><br>
+                        Rank medio: ${d.rank.toFixed(0)}<br>
+                        Score medio: ${d.final_anomaly_score.toFixed(2)}<br>
+                        Cluster: ${d.cluster}<br>
+                        Tipo: ${d.insider === 1 ? '⚠ Insider' : 'Normale'}
+                    `)
+                    .style('opacity', 1)
+                    .style('left', (event.pageX + 10) + 'px')
+                    .style('top', (event.pageY - 20) + 'px');
+                });
+            return;
+        }
         
-        legend.selectAll('g')
-            .data(legendData)
-            .join('g')
-            .attr('transform', (d, i) => `translate(0, ${i * 20})`)
-            .each(function(d) {
-                const g = d3.select(this);
-                g.append('circle')
-                    .attr('r', 5)
-                    .attr('fill', d.color);
-                g.append('text')
-                    .attr('x', 10)
-                    .attr('y', 5)
-                    .text(d.label);
-            });
+        // Points: chiave = user_id
+        svg.select('.punti').selectAll('.dot')
+            .data(aggData, d => d.user_id)
+            .join(
+                enter => enter.append('circle')
+                    .attr('class', d => `dot ${d.insider === 1 ? 'insider' : 'normal'}`)
+                    .attr('cx', d => x(d.rank))
+                    .attr('cy', d => y(d.final_anomaly_score))
+                    .attr('r', 0)
+                    .attr('fill', colorScale)
+                    .on('mouseover', function(event, d) {
+                        d3.select(this).attr('r', 8);
+                        tooltip.html(`
+                            <strong>User ${d.user_id}</strong><br>
+                            Rank medio: ${d.rank.toFixed(0)}<br>
+                            Score medio: ${d.final_anomaly_score.toFixed(2)}<br>
+                            Cluster: ${d.cluster}<br>
+                            Tipo: ${d.insider === 1 ? '⚠ Insider' : 'Normale'}
+                        `)
+                        .style('opacity', 1)
+                        .style('left', (event.pageX + 10) + 'px')
+                        .style('top', (event.pageY - 20) + 'px');
+                    })
+                    .on('mouseout', function() {
+                        d3.select(this).attr('r', 4);
+                        tooltip.style('opacity', 0);
+                    })
+                    .call(e => e.transition(t)
+                        // effetto "a cascata" solo al primo disegno
+                        .delay((d, i) => primaVolta ? i * 5 : 0)
+                        .attr('r', 4)),
+                // gli utenti rimasti si spostano solo se le scale sono cambiate
+                update => update.call(u => u.transition(t)
+                    .attr('cx', d => x(d.rank))
+                    .attr('cy', d => y(d.final_anomaly_score))),
+                exit => exit.call(e => e.transition(t)
+                    .attr('r', 0)
+                    .remove())
+            );
     }
 }
@@ -0,0 +1,219 @@
+// canvas-layer.js - disegno dei segni su <canvas> quando sono troppi per l'SVG
+// L'SVG resta sopra per assi, etichette e legenda (con pointer-events: none),
+// sotto ci sono due canvas: uno con tutti i segni e uno sottile per l'hover.
+// Hit-testing: quadtree per i punti, buffer di "color picking" per le linee.
+
+class CanvasLayer {
+
+    // true se il grafico con n segni va disegnato su canvas
+    static usaCanvas(n, soglia = CONFIG.render.sogliaCanvas) {
+        const modo = CONFIG.render.mode;
+        return modo === 'canvas' || (modo === 'auto' && n > soglia);
+    }
+
+    // crea il livello dentro il container e ritorna il div in cui appendere l'SVG
+    // width/height = dimensioni totali dell'SVG, margin = area di disegno
+    static crea(containerId, width, height, margin) {
+        const wrapper = d3.select(`#${containerId}`)
+            .append('div')
+            .attr('class', 'livello-canvas')
+            .style('width', `${width}px`)
+            .style('height', `${height}px`);
+
+        const livello = new CanvasLayer(wrapper, width, height, margin);
+        CanvasLayer.livelli.set(containerId, livello);
+        return livello;
+    }
+
+    // livello già creato per quel container (o null se il grafico è in SVG)
+    static per(containerId) {
+        const livello = CanvasLayer.livelli.get(containerId);
+        if (!livello || !document.body.contains(livello.wrapper.node())) {
+            CanvasLayer.livelli.delete(containerId);
+            return null;
+        }
+        return livello;
+    }
+
+    constructor(wrapper, width, height, margin) {
+        this.wrapper = wrapper;
+        this.margin = margin;
+        this.w = width - margin.left - margin.right;
+        this.h = height - margin.top - margin.bottom;
+        this.dpr = window.devicePixelRatio || 1;
+
+        const nuovoCanvas = (classe) => wrapper.append('canvas')
+            .attr('class', classe)
+            .style('left', `${margin.left}px`)
+            .style('top', `${margin.top}px`);
+
+        this.canvas = nuovoCanvas('canvas-segni').node();
+        this.hover = nuovoCanvas('canvas-hover').node();
+        this.dimensiona();
+        this.ctx = this.canvas.getContext('2d');
+        this.ctxHover = this.hover.getContext('2d');
+
+        this.items = [];
+        this.quadtree = null;     // per i punti
+        this.picking = null;      // per le linee, costruito solo al primo hover
+        this.disegnaPicking = null;
+        this.evidenzia = null;    // funzione che disegna l'elemento sotto il mouse
+        this.corrente = null;
+
+        d3.select(this.hover)
+            .on('mousemove', (event) => this.mouseMove(event))
+            .on('mouseleave', (event) => this.imposta(null, event));
+    }
+
+    // adatta i due canvas all'area di disegno (w × h, con la densità dello schermo)
+    dimensiona() {
+        [this.canvas, this.hover].forEach(canvas => d3.select(canvas)
+            .attr('width', Math.round(this.w * this.dpr))
+            .attr('height', Math.round(this.h * this.dpr))
+            .style('width', `${this.w}px`)
+            .style('height', `${this.h}px`));
+    }
+
+    // nuove dimensioni totali (resize del container): i segni li ridisegna il grafico
+    ridimensiona(width, height) {
+        this.wrapper
+            .style('width', `${width}px`)
+            .style('height', `${height}px`);
+        this.w = width - this.margin.left - this.margin.right;
+        this.h = height - this.margin.top - this.margin.bottom;
+        this.dimensiona();
+        this.picking = null;
+        return this;
+    }
+
+    // cancello un canvas e lo preparo con la scala per schermi retina
+    pulisci(ctx) {
+        ctx.setTransform(1, 0, 0, 1, 0, 0);
+        ctx.clearRect(0, 0, ctx.canvas.width, ctx.canvas.height);
+        ctx.setTransform(this.dpr, 0, 0, this.dpr, 0, 0);
+        return ctx;
+    }
+
+    // callback(event, d) chiamata quando cambia l'elemento sotto il mouse (d = null se nessuno)
+    onHover(callback) {
+        this.callbackHover = callback;
+        return this;
+    }
+
+    // disegna un cerchio per elemento; stile = { x, y, r, fill, stroke, strokeWidth, opacity }
+    // i cerchi con lo stesso colore finiscono in un solo path (una fill per colore)
+    cerchi(items, stile) {
+        const ctx = this.pulisci(this.ctx);
+        this.items = items;
+        this.picking = null;
+        this.imposta(null);
+
+        ctx.globalAlpha = stile.opacity ?? 1;
+        for (const [colore, gruppo] of d3.group(items, stile.fill)) {
+            ctx.beginPath();
+            for (const d of gruppo) {
+                const cx = stile.x(d), cy = stile.y(d), r = stile.r(d);
+                ctx.moveTo(cx + r, cy);
+                ctx.arc(cx, cy, r, 0, 2 * Math.PI);
+            }
+            ctx.fillStyle = colore;
+            ctx.fill();
+            if (stile.stroke) {
+                ctx.strokeStyle = stile.stroke;
+                ctx.lineWidth = stile.strokeWidth ?? 1;
+                ctx.stroke();
+            }
+        }
+        ctx.globalAlpha = 1;
+
+        // quadtree per trovare il punto più vicino al mouse
+        this.quadtree = d3.quadtree(items, stile.x, stile.y);
+        this.raggioRicerca = (d3.max(items, stile.r) || 4) + 2;
+        this.trova = (mx, my) => this.quadtree.find(mx, my, this.raggioRicerca) || null;
+        return this;
+    }
+
+    // disegna una polilinea per elemento; stile = { punti, stroke, lineWidth, opacity }
+    // punti(d) ritorna [[x, y], ...] già in pixel (null = valore mancante)
+    linee(items, stile) {
+        const ctx = this.pulisci(this.ctx);
+        this.items = items;
+        this.quadtree = null;
+        this.picking = null;
+        this.imposta(null);
+
+        const traccia = (c, punti) => {
+            let dentro = false;
+            for (const p of punti) {
+                if (!p) { dentro = false; continue; }
+                if (dentro) c.lineTo(p[0], p[1]);
+                else c.moveTo(p[0], p[1]);
+                dentro = true;
+            }
+        };
+
+        ctx.globalAlpha = stile.opacity ?? 1;
+        ctx.lineWidth = stile.lineWidth ?? 1;
+        ctx.lineJoin = 'round';
+        for (const [colore, gruppo] of d3.group(items, stile.stroke)) {
+            ctx.beginPath();
+            for (const d of gruppo) traccia(ctx, stile.punti(d));
+            ctx.strokeStyle = colore;
+            ctx.stroke();
+        }
+        ctx.globalAlpha = 1;
+
+        // buffer di picking: ogni linea con un colore univoco = indice + 1
+        // lo disegno solo quando serve (primo mousemove dopo il ridisegno)
+        this.disegnaPicking = () => {
+            const buffer = document.createElement('canvas');
+            buffer.width = Math.max(1, Math.round(this.w));
+            buffer.height = Math.max(1, Math.round(this.h));
+            const pctx = buffer.getContext('2d', { willReadFrequently: true });
+            pctx.lineWidth = 4;
+            pctx.lineJoin = 'round';
+            items.forEach((d, i) => {
+                const id = i + 1;
+                pctx.beginPath();
+                traccia(pctx, stile.punti(d));
+                pctx.strokeStyle = `rgb(${id & 255},${(id >> 8) & 255},${(id >> 16) & 255})`;
+                pctx.stroke();
+            });
+            return pctx;
+        };
+        this.trova = (mx, my) => {
+            if (!this.picking) this.picking = this.disegnaPicking();
+            const px = this.picking.getImageData(Math.floor(mx), Math.floor(my), 1, 1).data;
+            // i bordi sfumati mescolano i colori: accetto solo pixel pieni
+            if (px[3] !== 255) return null;
+            const id = px[0] | (px[1] << 8) | (px[2] << 16);
+            return this.items[id - 1] || null;
+        };
+        return this;
+    }
+
+    // funzione (ctx, d) che disegna l'elemento evidenziato sul canvas di hover
+    evidenziaCon(funzione) {
+        this.evidenzia = funzione;
+        return this;
+    }
+
+    mouseMove(event) {
+        if (!this.trova) return;
+        const [mx, my] = d3.pointer(event, this.hover);
+        this.imposta(this.trova(mx, my), event);
+    }
+
+    imposta(d, event = null) {
+        if (d !== this.corrente) {
+            this.corrente = d;
+            const ctx = this.pulisci(this.ctxHover);
+            if (d && this.evidenzia) this.evidenzia(ctx, d);
+            this.hover.style.cursor = d ? 'pointer' : 'default';
+        }
+        if (event && this.callbackHover) this.callbackHover(event, d);
+    }
+}
+
+// containerId → livello canvas attivo
+CanvasLayer.livelli = new Map();
@@ -0,0 +1,100 @@
+// cluster-profiles.js - profili medi dei cluster per radar e heatmap
+// Due sorgenti:
+//   'live' → medie calcolate dal worker sulle righe filtrate (DataLoader.getClusterProfiles)
+//   'csv'  → cluster_profiles_v2.csv, fisso: lo scarico e lo parso una volta sola
+// Per ogni feature tengo già pronto l'extent tra i cluster, usato per normalizzare.
+
+const PROFILES_URL = 'data/results/cluster_profiles_v2.csv';
+
+class ClusterProfiles {
+
+    // profili da usare nei grafici secondo CONFIG.profiles.mode
+    // (finché i dati non sono caricati uso comunque il CSV)
+    static current() {
+        const loader = window.dataLoader;
+        if (CONFIG.profiles.mode === 'live' && loader && loader.data) {
+            return loader.getClusterProfiles();
+        }
+        return ClusterProfiles.load();
+    }
+
+    // carica il CSV una volta sola (anche se radar e heatmap lo chiedono insieme)
+    static load(url = PROFILES_URL) {
+        if (!ClusterProfiles.cache.has(url)) {
+            const promessa = d3.csv(url)
+                .then(rows => ClusterProfiles.fromCsv(rows))
+                .catch(error => {
+                    // se fallisce non tengo la promessa rotta: al prossimo giro riprovo
+                    ClusterProfiles.cache.delete(url);
+                    throw error;
+                });
+            ClusterProfiles.cache.set(url, promessa);
+        }
+        return ClusterProfiles.cache.get(url);
+    }
+
+    // righe del CSV: gestisce sia la colonna "cluster" che l'indice senza nome
+    // (guardo quale campo c'è: con || un cluster 0 vero passerebbe all'indice)
+    static fromCsv(rows) {
+        const features = rows.columns.filter(c => c !== '' && c !== 'cluster');
+        const clusters = rows.map(d => ({
+            cluster: +(d.cluster !== undefined ? d.cluster : d['']) || 0,
+            ...Object.fromEntries(features.map(f => [f, +d[f] || 0]))
+        }));
+        return new ClusterProfiles(clusters, features);
+    }
+
+    // risultato di DataEngine.aggregateByCluster (matrice cluster × feature)
+    // i cluster senza righe nel filtro corrente non compaiono
+    static fromAggregates({ features, clusters, rowCounts, means }) {
+        const F = features.length;
+        const righe = [];
+        for (let c = 0; c < clusters.length; c++) {
+            if (rowCounts[c] === 0) continue;
+            const riga = { cluster: clusters[c], n_rows: rowCounts[c] };
+            features.forEach((f, j) => {
+                riga[f] = means[c * F + j] || 0;
+            });
+            righe.push(riga);
+        }
+        return new ClusterProfiles(righe, features);
+    }
+
+    constructor(clusters, features) {
+        this.clusters = clusters;
+        this.features = features;
+
+        // extent di ogni feature calcolato sui valori dei cluster
+        this.extents = {};
+        features.forEach(f => {
+            this.extents[f] = d3.extent(this.clusters, d => d[f]);
+        });
+
+        this.normalizzati = new Map();  // "features|padding" → righe normalizzate
+    }
+
+    // valori dei cluster normalizzati in [padding, 1 - padding] per ogni feature
+    // (0.5 se tutti i cluster hanno lo stesso valore); il risultato è memorizzato
+    normalized(features, padding = 0) {
+        const key = `${features.join('|')}|${padding}`;
+        let righe = this.normalizzati.get(key);
+        if (!righe) {
+            righe = this.clusters.map(cluster => {
+                const norm = { cluster: cluster.cluster };
+                features.forEach(f => {
+                    const [min, max] = this.extents[f] || [0, 0];
+                    const span = max - min;
+                    norm[f] = span === 0 || isNaN(span)
+                        ? 0.5
+                        : padding + (cluster[f] - min) / span * (1 - 2 * padding);
+                });
+                return norm;
+            });
+            this.normalizzati.set(key, righe);
+        }
+        return righe;
+    }
+}
+
+// url → Promise<ClusterProfiles>
+ClusterProfiles.cache = new Map();
@@ -49,6 +49,31 @@ const CONFIG = {
         ]
     },
 
+    // scatter e coordinate parallele: sopra questa soglia di segni disegno su canvas
+    // (le linee delle coordinate parallele in SVG diventano illeggibili e lente molto
+    // prima dei punti: per loro la soglia è sogliaCanvasLinee)
+    // mode: 'auto' (dipende dalla soglia), 'svg' o 'canvas' (forzati)
+    render: {
+        mode: 'auto',
+        sogliaCanvas: 2000,
+        sogliaCanvasLinee: 200
+    },
+
+    // profili dei cluster per radar e heatmap:
+    // 'live' = medie sulle righe filtrate (calcolate nel worker), 'csv' = cluster_profiles_v2.csv
+    profiles: {
+        mode: 'live'
+    },
+
+    // strumenti di debug: log = console.log dettagliati (alcuni scorrono tutte le righe),
+    // overlay = riquadro con i tempi delle fasi (si attiva anche con ?perf nell'URL),
+    // campioni = quante misure tengo per fase per mediana/p95/max
+    debug: {
+        log: false,
+        overlay: false,
+        campioni: 200
+    },
+
     transition: {
         duration: 750,
         delay: 50
@@ -98,3 +123,16 @@ const CLUSTER_LABELS = {
 function getClusterLabel(cluster) {
     return CLUSTER_LABELS[cluster] ?? `Cluster ${cluster}`;
 }
+
+// un solo tooltip per grafico, creato la prima volta e poi riusato
+// (prima ogni ridisegno aggiungeva un nuovo div.tooltip al body)
+function getTooltip(containerId) {
+    let tooltip = d3.select(`#tooltip-${containerId}`);
+    if (tooltip.empty()) {
+        tooltip = d3.select('body')
+            .append('div')
+            .attr('id', `tooltip-${containerId}`)
+            .attr('class', 'tooltip');
+    }
+    return tooltip;
+}
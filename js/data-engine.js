@@ -0,0 +1,693 @@
+// data-engine.js - filtri e aggregazioni sui dati in forma colonnare
+// Lo stesso codice gira nel Web Worker (data-worker.js) e, se i worker non sono
+// disponibili, direttamente nel thread principale come ripiego.
+// Non usa D3: dentro il worker D3 non c'è.
+//
+// Formato delle colonne (lo stesso di DataLoader.columns):
+//   numeriche  → Float32Array / Float64Array / Int32Array, una cella per riga
+//   testuali   → { codes: Int32Array, dictionary: [stringhe] }
+//
+// Per filtrare uso indici costruiti una volta al caricamento:
+//   - un bitset (1 bit per riga) per ogni cluster e per ogni valore di insider
+//   - gli indici delle righe ordinati per score, per il range con due ricerche binarie
+// Un filtro diventa OR dei cluster scelti, AND con l'insider, AND con il range di score.
+
+// dopo quanti aggiornamenti incrementali ricalcolo da zero i profili per cluster
+const PROFILE_REBUILD_EVERY = 32;
+
+// fasce di score (quantili) del cubo temporale: con un range di score attivo
+// leggo le fasce intere dal cubo e scorro solo le righe delle due fasce ai bordi
+const CUBE_SCORE_BINS = 64;
+
+// numero di bit a 1 in un intero a 32 bit
+function popcount32(x) {
+    x -= (x >>> 1) & 0x55555555;
+    x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+    return Math.imul((x + (x >>> 4)) & 0x0f0f0f0f, 0x01010101) >>> 24;
+}
+
+class DataEngine {
+    constructor() {
+        this.rows = 0;
+        this.columns = {};
+        this.numericNames = [];  // colonne numeriche, nell'ordine del CSV
+        
+        // indici per il filtro (vedi buildIndexes)
+        this.words = 0;  // parole da 32 bit per bitset
+        this.allBits = null;
+        this.clusterBits = null;  // valore cluster → bitset
+        this.insiderBits = null;  // valore insider → bitset
+        this.scoreOrder = null;  // righe ordinate per score (NaN in fondo)
+        this.sortedScores = null;  // score nello stesso ordine
+        this.nanStart = 0;  // da qui in poi in scoreOrder ci sono le righe con score NaN
+        this.clusterAcc = null;  // somme per cluster tenute tra un filtro e l'altro
+        this.cube = null;  // cubo temporale (vedi buildTemporalCube)
+    }
+
+    // riceve le colonne (dal messaggio 'load' del worker o direttamente da DataLoader)
+    load({ rows, columns }) {
+        this.rows = rows;
+        this.columns = columns;
+        this.numericNames = Object.keys(columns).filter(name => !columns[name].codes);
+        this.clusterAcc = null;
+        this.buildIndexes();
+    }
+
+    // bitset per cluster e insider + ordinamento per score, una volta sola
+    buildIndexes() {
+        const n = this.rows;
+        this.words = (n + 31) >>> 5;
+        
+        this.allBits = new Uint32Array(this.words).fill(0xffffffff);
+        if (n & 31) this.allBits[this.words - 1] = (1 << (n & 31)) - 1;  // bit oltre l'ultima riga a 0
+        this.clusterBits = this.bitsetsBy(this.columns.cluster);
+        this.insiderBits = this.bitsetsBy(this.columns.insider);
+        
+        const score = this.columns.final_anomaly_score;
+        const order = new Uint32Array(n);
+        for (let i = 0; i < n; i++) order[i] = i;
+        order.sort((a, b) => {
+            const sa = score[a], sb = score[b];
+            if (sa !== sa) return sb !== sb ? a - b : 1;  // NaN in fondo
+            if (sb !== sb) return -1;
+            return sa - sb || a - b;
+        });
+        this.scoreOrder = order;
+        this.sortedScores = Float64Array.from(order, i => score[i]);
+        let nanStart = n;
+        while (nanStart > 0 && this.sortedScores[nanStart - 1] !== this.sortedScores[nanStart - 1]) nanStart--;
+        this.nanStart = nanStart;
+        
+        this.buildTemporalCube();
+    }
+    
+    // chiave temporale delle righe ai vari livelli di dettaglio (dal più fine al più grosso)
+    // con `timestamp` (date) → giorno / settimana / mese, in giorni dal 1970-01-01
+    // con solo `week` (numero) → settimana / blocchi di 4 settimane
+    // per ogni livello: bucket(v) = inizio del periodo, mid(inizio) = centro (posizione sull'asse x)
+    timeLevels() {
+        const { timestamp, week } = this.columns;
+        if (timestamp && timestamp.codes) {
+            const days = timestamp.dictionary.map(str => {
+                const t = Date.parse(str);
+                return isNaN(t) ? NaN : Math.floor(t / 864e5);
+            });
+            // inizio del mese (in giorni) e sua lunghezza
+            const inizioMese = d => {
+                const data = new Date(d * 864e5);
+                return Date.UTC(data.getUTCFullYear(), data.getUTCMonth(), 1) / 864e5;
+            };
+            const fineMese = s => {
+                const data = new Date(s * 864e5);
+                return Date.UTC(data.getUTCFullYear(), data.getUTCMonth() + 1, 1) / 864e5;
+            };
+            return {
+                unit: 'day',
+                base: Float64Array.from(timestamp.codes, c => days[c]),
+                levels: [
+                    { name: 'giorno', bucket: d => d, mid: s => s },
+                    // il giorno 0 (1970-01-01) è un giovedì: (d + 3) % 7 = giorni dal lunedì
+                    { name: 'settimana', bucket: d => d - ((d + 3) % 7), mid: s => s + 3 },
+                    { name: 'mese', bucket: inizioMese, mid: s => (s + fineMese(s) - 1) / 2 }
+                ]
+            };
+        }
+        if (week && !week.codes) {
+            let min = Infinity;
+            for (let i = 0; i < this.rows; i++) {
+                if (week[i] < min) min = week[i];
+            }
+            return {
+                unit: 'week',
+                base: week,
+                levels: [
+                    { name: 'settimana', bucket: w => w, mid: s => s },
+                    { name: 'mese', bucket: w => w - ((w - min) % 4), mid: s => s + 1.5 }
+                ]
+            };
+        }
+        return null;
+    }
+    
+    // cubo somma/conteggio dello score per (cluster, periodo, insider), costruito una volta
+    // per ogni livello di dettaglio di timeLevels (riassunti a più risoluzioni).
+    // Le celle sono ripetute per fascia di score come somme cumulative lungo scoreOrder:
+    // le righe in un range di score sono un tratto contiguo di scoreOrder, quindi le fasce
+    // intere si leggono con una differenza e solo i bordi vanno scorsi riga per riga.
+    // Le righe con score NaN (o senza data) non contano (come d3.mean).
+    buildTemporalCube() {
+        const tempo = this.timeLevels();
+        if (!tempo) {
+            this.cube = null;
+            return;
+        }
+        const { cluster, insider, final_anomaly_score: score } = this.columns;
+        const sortedKeys = map => [...map.keys()].sort((a, b) => a - b);
+        const slotOf = values => new Map(values.map((v, k) => [v, k]));
+        const clusters = sortedKeys(this.clusterBits);
+        const insiders = sortedKeys(this.insiderBits);
+        const clusterSlot = slotOf(clusters);
+        const insiderSlot = slotOf(insiders);
+        
+        // valori temporali distinti: ogni riga punta al suo (-1 se manca)
+        const baseValues = new Set();
+        for (let i = 0; i < this.rows; i++) {
+            if (tempo.base[i] === tempo.base[i]) baseValues.add(tempo.base[i]);
+        }
+        const base = [...baseValues].sort((a, b) => a - b);
+        const baseSlot = slotOf(base);
+        const rowBase = new Int32Array(this.rows);
+        const rowGroup = new Int32Array(this.rows);  // cluster e insider insieme: c * I + s
+        const I = insiders.length;
+        for (let i = 0; i < this.rows; i++) {
+            const b = baseSlot.get(tempo.base[i]);
+            rowBase[i] = b === undefined ? -1 : b;
+            rowGroup[i] = clusterSlot.get(cluster[i]) * I + insiderSlot.get(insider[i]);
+        }
+        
+        // confini delle fasce in posizioni di scoreOrder (solo righe con score valido)
+        const m = this.nanStart;
+        const B = Math.max(1, Math.min(CUBE_SCORE_BINS, m));
+        const binStart = new Uint32Array(B + 1);
+        for (let b = 0; b <= B; b++) binStart[b] = Math.floor(b * m / B);
+        
+        const levels = tempo.levels.map(level => {
+            // periodi del livello e periodo di ogni valore base
+            const starts = [...new Set(base.map(level.bucket))].sort((a, b) => a - b);
+            const periodSlot = slotOf(starts);
+            const P = starts.length;
+            return {
+                name: level.name,
+                mid: Float64Array.from(starts, level.mid),
+                periodOfBase: Int32Array.from(base, v => periodSlot.get(level.bucket(v))),
+                cells: clusters.length * I * P,
+                // riga b del prefisso = somme delle fasce 0 .. b-1; cella = (gruppo * P + periodo)
+                sums: new Float64Array((B + 1) * clusters.length * I * P),
+                counts: new Uint32Array((B + 1) * clusters.length * I * P)
+            };
+        });
+        
+        for (let b = 0; b < B; b++) {
+            for (const level of levels) {
+                const from = b * level.cells;
+                const to = from + level.cells;
+                level.sums.copyWithin(to, from, to);
+                level.counts.copyWithin(to, from, to);
+            }
+            for (let k = binStart[b]; k < binStart[b + 1]; k++) {
+                const i = this.scoreOrder[k];
+                if (rowBase[i] < 0) continue;
+                for (const level of levels) {
+                    const cell = (b + 1) * level.cells
+                        + rowGroup[i] * level.mid.length + level.periodOfBase[rowBase[i]];
+                    level.sums[cell] += score[i];
+                    level.counts[cell]++;
+                }
+            }
+        }
+        
+        this.cube = { unit: tempo.unit, clusters, insiders, bins: B, binStart, rowBase, rowGroup, levels };
+    }
+    
+    // un bitset per ogni valore distinto della colonna
+    bitsetsBy(column) {
+        const sets = new Map();
+        for (let i = 0; i < this.rows; i++) {
+            let bits = sets.get(column[i]);
+            if (!bits) {
+                bits = new Uint32Array(this.words);
+                sets.set(column[i], bits);
+            }
+            bits[i >>> 5] |= 1 << (i & 31);
+        }
+        return sets;
+    }
+    
+    // prima posizione in sortedScores con score >= v (strict = false) o > v (strict = true)
+    searchScore(v, strict) {
+        let lo = 0;
+        let hi = this.nanStart;
+        while (lo < hi) {
+            const mid = (lo + hi) >>> 1;
+            const s = this.sortedScores[mid];
+            if (strict ? s <= v : s < v) lo = mid + 1;
+            else hi = mid;
+        }
+        return lo;
+    }
+
+    // tratto [lo, hi) di scoreOrder con lo score dentro il range dei filtri
+    scoreRange(filters) {
+        const lo = filters.scoreMin !== undefined ? this.searchScore(filters.scoreMin, false) : 0;
+        const hi = filters.scoreMax !== undefined ? this.searchScore(filters.scoreMax, true) : this.nanStart;
+        return [lo, Math.max(lo, hi)];
+    }
+
+    // indici (crescenti) delle righe che passano i filtri — stessa logica di DataLoader.filterData
+    filter(filters) {
+        const words = this.words;
+        const mask = new Uint32Array(words);
+        
+        // cluster: OR dei bitset scelti
+        if (filters.clusters && filters.clusters.length > 0 && !filters.clusters.includes('all')) {
+            new Set(filters.clusters.map(Number)).forEach(c => {
+                const bits = this.clusterBits.get(c);
+                if (!bits) return;
+                for (let w = 0; w < words; w++) mask[w] |= bits[w];
+            });
+        } else {
+            mask.set(this.allBits);
+        }
+        
+        // insider: AND
+        if (filters.insider !== 'all') {
+            const bits = this.insiderBits.get(+filters.insider);
+            if (!bits) mask.fill(0);
+            else for (let w = 0; w < words; w++) mask[w] &= bits[w];
+        }
+        
+        // score: due ricerche binarie danno il tratto [lo, hi) di scoreOrder nel range
+        // (le righe con score NaN passano sempre, come nel confronto con < e >)
+        const [lo, hi] = this.scoreRange(filters);
+        const order = this.scoreOrder;
+        if (lo === 0 && hi === this.nanStart) {
+            // nessun vincolo effettivo sullo score
+        } else if (this.countBits(mask) <= hi - lo) {
+            // dopo cluster/insider restano poche righe: controllo lo score direttamente su quelle
+            const score = this.columns.final_anomaly_score;
+            const min = filters.scoreMin !== undefined ? filters.scoreMin : -Infinity;
+            const max = filters.scoreMax !== undefined ? filters.scoreMax : Infinity;
+            const candidates = this.bitsToIndices(mask);
+            let n = 0;
+            for (let k = 0; k < candidates.length; k++) {
+                const v = score[candidates[k]];
+                if (!(v < min || v > max)) candidates[n++] = candidates[k];
+            }
+            return candidates.slice(0, n);
+        } else if (hi - lo < (this.rows >>> 1)) {
+            // range stretto (o vuoto): costruisco il bitset delle righe dentro
+            const range = new Uint32Array(words);
+            for (let k = lo; k < hi; k++) range[order[k] >>> 5] |= 1 << (order[k] & 31);
+            for (let k = this.nanStart; k < this.rows; k++) range[order[k] >>> 5] |= 1 << (order[k] & 31);
+            for (let w = 0; w < words; w++) mask[w] &= range[w];
+        } else {
+            // range largo: tolgo le poche righe fuori
+            for (let k = 0; k < lo; k++) mask[order[k] >>> 5] &= ~(1 << (order[k] & 31));
+            for (let k = hi; k < this.nanStart; k++) mask[order[k] >>> 5] &= ~(1 << (order[k] & 31));
+        }
+        
+        return this.bitsToIndices(mask);
+    }
+    
+    // righe selezionate nel bitset
+    countBits(mask) {
+        let count = 0;
+        for (let w = 0; w < mask.length; w++) count += popcount32(mask[w]);
+        return count;
+    }
+    
+    // da bitset a indici di riga crescenti
+    bitsToIndices(mask) {
+        const out = new Uint32Array(this.countBits(mask));
+        let k = 0;
+        for (let w = 0; w < mask.length; w++) {
+            let bits = mask[w] | 0;
+            while (bits !== 0) {
+                const lowest = bits & -bits;
+                out[k++] = (w << 5) + (31 - Math.clz32(lowest));
+                bits ^= lowest;
+            }
+        }
+        return out;
+    }
+
+    // media di ogni colonna numerica per utente, in un solo passaggio sulle righe filtrate
+    // means è una matrice utenti × feature appiattita (riga s = utente userCodes[s])
+    aggregateByUser(indices) {
+        const userCodes = this.columns.user_id.codes;
+        const slot = new Int32Array(this.columns.user_id.dictionary.length).fill(-1);
+        const order = [];
+        for (let k = 0; k < indices.length; k++) {
+            const code = userCodes[indices[k]];
+            if (slot[code] < 0) {
+                slot[code] = order.length;
+                order.push(code);
+            }
+        }
+
+        const features = this.numericNames;
+        const F = features.length;
+        const U = order.length;
+        const cols = features.map(name => this.columns[name]);
+        const sums = new Float64Array(U * F);
+        const counts = new Uint32Array(U * F);  // come d3.mean salto i NaN
+        const rowCounts = new Uint32Array(U);
+        const cluster = new Int32Array(U);
+        const insider = new Int32Array(U);
+
+        for (let k = 0; k < indices.length; k++) {
+            const i = indices[k];
+            const s = slot[userCodes[i]];
+            // cluster e insider li prendo dalla prima riga dell'utente (come rows[0] nei grafici)
+            if (rowCounts[s]++ === 0) {
+                cluster[s] = this.columns.cluster[i];
+                insider[s] = this.columns.insider[i];
+            }
+            const base = s * F;
+            for (let f = 0; f < F; f++) {
+                const v = cols[f][i];
+                if (v === v) {  // v non è NaN
+                    sums[base + f] += v;
+                    counts[base + f]++;
+                }
+            }
+        }
+        for (let j = 0; j < sums.length; j++) {
+            sums[j] = counts[j] > 0 ? sums[j] / counts[j] : NaN;
+        }
+
+        return {
+            features,
+            userCodes: Int32Array.from(order),
+            rowCounts,
+            means: sums,
+            cluster,
+            insider
+        };
+    }
+
+    // media di ogni colonna numerica per cluster: i profili "live" di radar e heatmap
+    // somme e conteggi restano tra una chiamata e l'altra, così se il filtro cambia poco
+    // aggiungo/tolgo solo le righe entrate/uscite; altrimenti un solo passaggio raggruppato
+    // means è una matrice cluster × feature appiattita (riga c = cluster clusters[c])
+    aggregateByCluster(indices) {
+        const features = this.numericNames;
+        const F = features.length;
+        let acc = this.clusterAcc;
+        if (!acc) {
+            const values = [...this.clusterBits.keys()].sort((a, b) => a - b);
+            acc = this.clusterAcc = {
+                values,
+                slot: new Map(values.map((c, k) => [c, k])),
+                cols: features.map(name => this.columns[name]),
+                sums: new Float64Array(values.length * F),
+                counts: new Int32Array(values.length * F),  // come d3.mean salto i NaN
+                rowCounts: new Int32Array(values.length),
+                rows: null,  // righe attualmente sommate
+                updates: 0
+            };
+        }
+        
+        // segno +1 aggiunge le righe, -1 le toglie
+        const apply = (rows, sign) => {
+            const cluster = this.columns.cluster;
+            for (let k = 0; k < rows.length; k++) {
+                const i = rows[k];
+                const c = acc.slot.get(cluster[i]);
+                acc.rowCounts[c] += sign;
+                const base = c * F;
+                for (let f = 0; f < F; f++) {
+                    const v = acc.cols[f][i];
+                    if (v === v) {
+                        acc.sums[base + f] += sign * v;
+                        acc.counts[base + f] += sign;
+                    }
+                }
+            }
+        };
+        
+        let rebuild = acc.rows === null || acc.updates >= PROFILE_REBUILD_EVERY;
+        if (!rebuild) {
+            const { added, removed } = diffSortedIndices(acc.rows, indices);
+            // se cambia più di quanto resta conviene ripartire da zero
+            if (added.length + removed.length < indices.length) {
+                apply(removed, -1);
+                apply(added, 1);
+                acc.updates++;
+            } else {
+                rebuild = true;
+            }
+        }
+        if (rebuild) {
+            // ogni tanto riparto da zero per non accumulare errori di arrotondamento
+            acc.sums.fill(0);
+            acc.counts.fill(0);
+            acc.rowCounts.fill(0);
+            apply(indices, 1);
+            acc.updates = 0;
+        }
+        // copia: nel worker gli indici vengono trasferiti al thread principale
+        acc.rows = indices.slice();
+        
+        const means = new Float64Array(acc.sums.length);
+        for (let j = 0; j < means.length; j++) {
+            means[j] = acc.counts[j] > 0 ? acc.sums[j] / acc.counts[j] : NaN;
+        }
+        return {
+            features,
+            clusters: Int32Array.from(acc.values),
+            rowCounts: Uint32Array.from(acc.rowCounts),
+            means
+        };
+    }
+
+    // score medio per (cluster, periodo) con i filtri attivi, a ogni livello di dettaglio,
+    // letto dal cubo temporale: costa O(livelli × cluster × periodi) più le righe delle due
+    // fasce di score ai bordi, indipendentemente da quante righe ci sono.
+    // Per livello: mid = centro di ogni periodo, sums/counts = matrici cluster × periodo.
+    temporalSeries(filters) {
+        const cube = this.cube;
+        if (!cube) return null;
+        const C = cube.clusters.length;
+        const I = cube.insiders.length;
+        
+        // gruppi (cluster, insider) che passano i filtri
+        const clusterOk = new Uint8Array(C);
+        if (filters.clusters && filters.clusters.length > 0 && !filters.clusters.includes('all')) {
+            filters.clusters.forEach(c => {
+                const slot = cube.clusters.indexOf(+c);
+                if (slot >= 0) clusterOk[slot] = 1;
+            });
+        } else {
+            clusterOk.fill(1);
+        }
+        const groupOk = new Uint8Array(C * I);
+        cube.insiders.forEach((value, s) => {
+            if (filters.insider !== 'all' && value !== +filters.insider) return;
+            for (let c = 0; c < C; c++) groupOk[c * I + s] = clusterOk[c];
+        });
+        
+        // fasce intere [bLo, bHi) dentro il tratto [lo, hi)
+        const [lo, hi] = this.scoreRange(filters);
+        const binStart = cube.binStart;
+        let bLo = 0;
+        while (bLo < cube.bins && binStart[bLo] < lo) bLo++;
+        let bHi = cube.bins;
+        while (bHi > 0 && binStart[bHi] > hi) bHi--;
+        const edges = bLo < bHi ? [[lo, binStart[bLo]], [binStart[bHi], hi]] : [[lo, hi]];
+        
+        const score = this.columns.final_anomaly_score;
+        const levels = cube.levels.map(level => {
+            const P = level.mid.length;
+            const sums = new Float64Array(C * P);
+            const counts = new Uint32Array(C * P);
+            if (bLo < bHi) {
+                const top = bHi * level.cells;
+                const bottom = bLo * level.cells;
+                for (let g = 0; g < C * I; g++) {
+                    if (!groupOk[g]) continue;
+                    const out = Math.floor(g / I) * P;
+                    for (let p = 0; p < P; p++) {
+                        const cell = g * P + p;
+                        sums[out + p] += level.sums[top + cell] - level.sums[bottom + cell];
+                        counts[out + p] += level.counts[top + cell] - level.counts[bottom + cell];
+                    }
+                }
+            }
+            // righe ai bordi, una per una
+            for (const [from, to] of edges) {
+                for (let k = from; k < to; k++) {
+                    const i = this.scoreOrder[k];
+                    const g = cube.rowGroup[i];
+                    if (cube.rowBase[i] < 0 || !groupOk[g]) continue;
+                    const out = Math.floor(g / I) * P + level.periodOfBase[cube.rowBase[i]];
+                    sums[out] += score[i];
+                    counts[out]++;
+                }
+            }
+            return { name: level.name, mid: level.mid.slice(), sums, counts };
+        });
+        
+        return { unit: cube.unit, clusters: Int32Array.from(cube.clusters), levels };
+    }
+
+    // numeri delle schede KPI: utenti unici, insider unici, media e massimo dello score
+    // (le righe con score NaN passano il filtro ma non entrano in media e massimo, come d3.mean)
+    stats(indices, users) {
+        const score = this.columns.final_anomaly_score;
+        let sum = 0;
+        let n = 0;
+        let max = -Infinity;
+        for (let k = 0; k < indices.length; k++) {
+            const v = score[indices[k]];
+            if (v === v) {
+                sum += v;
+                n++;
+                if (v > max) max = v;
+            }
+        }
+        let insiderCount = 0;
+        for (let s = 0; s < users.insider.length; s++) {
+            if (users.insider[s] === 1) insiderCount++;
+        }
+        return {
+            rows: indices.length,
+            users: users.userCodes.length,
+            insiderCount,
+            avgScore: n > 0 ? sum / n : null,
+            maxScore: n > 0 ? max : null
+        };
+    }
+
+    // filtro + aggregazioni: è la risposta a un messaggio 'filter'
+    // timings = ms di ogni fase (il worker non vede Perf: li registra il thread principale)
+    run(filters) {
+        const timings = {};
+        let t0 = performance.now();
+        const tempo = (fase) => {
+            const t1 = performance.now();
+            timings[fase] = t1 - t0;
+            t0 = t1;
+        };
+        const indices = this.filter(filters);
+        tempo('filter');
+        const users = this.aggregateByUser(indices);
+        tempo('aggregate-users');
+        const clusters = this.aggregateByCluster(indices);
+        tempo('aggregate-clusters');
+        const temporal = this.temporalSeries(filters);
+        tempo('temporal');
+        return { indices, users, clusters, temporal, stats: this.stats(indices, users), timings };
+    }
+
+    // buffer da trasferire (non copiare) nel postMessage del risultato
+    static transferables(result) {
+        const u = result.users;
+        const c = result.clusters;
+        const buffers = [result.indices.buffer, u.userCodes.buffer, u.rowCounts.buffer,
+                         u.means.buffer, u.cluster.buffer, u.insider.buffer,
+                         c.clusters.buffer, c.rowCounts.buffer, c.means.buffer];
+        const t = result.temporal;
+        if (t) {
+            buffers.push(t.clusters.buffer);
+            t.levels.forEach(l => buffers.push(l.mid.buffer, l.sums.buffer, l.counts.buffer));
+        }
+        return buffers;
+    }
+}
+
+// Matrice di correlazione di Pearson tra più colonne, aggiornabile riga per riga.
+// Tengo medie e co-momenti (somme dei prodotti degli scarti) con l'aggiornamento di
+// Welford: aggiungere o togliere una riga costa O(F²/2) e non serve ripassare i dati.
+// Il co-momento è simmetrico: calcolo solo il triangolo superiore.
+// Le righe con un valore NaN in una delle colonne vengono ignorate.
+class CorrelationMatrix {
+    constructor(columns) {
+        this.columns = columns;  // array di typed array, una per feature
+        this.F = columns.length;
+        this.n = 0;
+        this.mean = new Float64Array(this.F);
+        this.comoment = new Float64Array(this.F * this.F);
+        this.delta = new Float64Array(this.F);
+        this.x = new Float64Array(this.F);
+        this.result = new Float64Array(this.F * this.F);  // riusata ad ogni matrix()
+    }
+
+    reset() {
+        this.n = 0;
+        this.mean.fill(0);
+        this.comoment.fill(0);
+    }
+
+    // copia la riga i in this.x, false se contiene NaN
+    readRow(i) {
+        for (let a = 0; a < this.F; a++) {
+            const v = this.columns[a][i];
+            if (v !== v) return false;
+            this.x[a] = v;
+        }
+        return true;
+    }
+
+    add(i) {
+        if (!this.readRow(i)) return;
+        const F = this.F, x = this.x, mean = this.mean, d = this.delta, C = this.comoment;
+        const n = ++this.n;
+        for (let a = 0; a < F; a++) {
+            d[a] = x[a] - mean[a];
+            mean[a] += d[a] / n;
+        }
+        for (let a = 0; a < F; a++) {
+            const da = d[a];
+            const base = a * F;
+            for (let b = a; b < F; b++) C[base + b] += da * (x[b] - mean[b]);
+        }
+    }
+
+    // operazione inversa di add (la riga deve essere stata aggiunta prima)
+    remove(i) {
+        if (!this.readRow(i)) return;
+        if (this.n <= 1) {
+            this.reset();
+            return;
+        }
+        const F = this.F, x = this.x, mean = this.mean, d = this.delta, C = this.comoment;
+        const n = --this.n;
+        for (let a = 0; a < F; a++) {
+            d[a] = x[a] - mean[a];
+            mean[a] -= d[a] / n;
+        }
+        for (let a = 0; a < F; a++) {
+            const da = d[a];
+            const base = a * F;
+            for (let b = a; b < F; b++) C[base + b] -= da * (x[b] - mean[b]);
+        }
+    }
+
+    addRows(indices) {
+        for (let k = 0; k < indices.length; k++) this.add(indices[k]);
+    }
+
+    removeRows(indices) {
+        for (let k = 0; k < indices.length; k++) this.remove(indices[k]);
+    }
+
+    // correlazioni F × F (riga i, colonna j → result[i * F + j]); 0 se una varianza è nulla
+    matrix() {
+        const F = this.F, C = this.comoment, out = this.result;
+        for (let a = 0; a < F; a++) {
+            for (let b = a; b < F; b++) {
+                const den = Math.sqrt(C[a * F + a] * C[b * F + b]);
+                const r = den > 0 ? Math.max(-1, Math.min(1, C[a * F + b] / den)) : 0;
+                out[a * F + b] = r;
+                out[b * F + a] = r;
+            }
+        }
+        return out;
+    }
+}
+
+// differenza tra due liste crescenti di indici di riga: cosa entra e cosa esce
+function diffSortedIndices(prev, next) {
+    const added = [];
+    const removed = [];
+    let i = 0, j = 0;
+    while (i < prev.length && j < next.length) {
+        if (prev[i] === next[j]) { i++; j++; }
+        else if (prev[i] < next[j]) removed.push(prev[i++]);
+        else added.push(next[j++]);
+    }
+    while (i < prev.length) removed.push(prev[i++]);
+    while (j < next.length) added.push(next[j++]);
+    return { added, removed };
+}
@@ -1,55 +1,134 @@
 // data-loader.js - qui carico i dati dal CSV
 // Riferimento: 030-data-model (tipi di dati, dataset tabellare)
-// Uso d3.csv() come visto in 130-hands-on-d3-js
+// Il CSV lo leggo a pezzi mentre arriva (ReadableStream) e parso ogni blocco con
+// d3.csvParseRows: ad ogni blocco emetto un evento 'progress' così main.js può
+// disegnare i primi grafici senza aspettare la fine del download
 
-class DataLoader {
+// quanti byte leggo prima di emettere un evento 'progress' (i chunk di rete sono piccoli)
+const STREAM_BATCH_BYTES = 64 * 1024;
+
+// quante righe ricostruisco dal binario colonnare prima di lasciare disegnare il browser
+const COLUMNAR_CHUNK_ROWS = 20000;
+
+// quanti stati di filtro diversi tengo in cache per la tabella per-utente
+const USER_CACHE_SIZE = 16;
+
+// dopo quanti aggiornamenti incrementali ricalcolo la correlazione da zero
+const CORRELATION_REBUILD_EVERY = 32;
+
+// seme del campionamento: stesso seme = stesso campione a ogni ridisegno
+const SAMPLE_SEED = 0x5eed;
+
+// hash a 32 bit di una chiave (FNV-1a + mescolamento finale di murmur3)
+// è la "priorità" casuale ma deterministica di ogni elemento nel campione
+function hashKey(key, seed) {
+    const str = String(key);
+    let h = (0x811c9dc5 ^ seed) >>> 0;
+    for (let i = 0; i < str.length; i++) {
+        h ^= str.charCodeAt(i);
+        h = Math.imul(h, 0x01000193);
+    }
+    h ^= h >>> 16;
+    h = Math.imul(h, 0x85ebca6b);
+    h ^= h >>> 13;
+    h = Math.imul(h, 0xc2b2ae35);
+    h ^= h >>> 16;
+    return h >>> 0;
+}
+
+// k-esimo valore più piccolo (k da 0) con quickselect, O(n) in media; modifica `values`
+function kthSmallest(values, k) {
+    let lo = 0, hi = values.length - 1;
+    while (lo < hi) {
+        const pivot = values[(lo + hi) >>> 1];
+        let i = lo, j = hi;
+        while (i <= j) {
+            while (values[i] < pivot) i++;
+            while (values[j] > pivot) j--;
+            if (i <= j) {
+                const tmp = values[i]; values[i] = values[j]; values[j] = tmp;
+                i++; j--;
+            }
+        }
+        if (k <= j) hi = j;
+        else if (k >= i) lo = i;
+        else break;
+    }
+    return values[k];
+}
+
+class DataLoader extends EventTarget {
     constructor() {
+        super();
         this.data = null;  // tutti i dati
         this.filteredData = null;  // dati filtrati
+        this.columns = null;  // colonne tipizzate (dal .bin oppure costruite con buildColumns)
+        this.filteredStats = null;  // numeri KPI calcolati dal worker per filteredData
+        this.userAggregates = null;  // medie per utente calcolate dal worker per filteredData
+        this.clusterAggregates = null;  // medie per cluster calcolate dal worker per filteredData
+        this.temporalAggregates = null;  // score per (cluster, settimana) dal cubo temporale
+        this.clusterProfiles = null;  // { key, promise } profili live per lo stato dei filtri corrente
+        this.temporalSeries = null;  // { key, promise } serie del cubo temporale per lo stato corrente
+        this.engineResult = null;  // { key, promise } risultato del motore chiesto al primo disegno
+        this.currentFilters = null;  // ultimi filtri applicati (null = nessun filtro)
+        
+        // tabella per-utente condivisa da tutti i grafici, una per stato dei filtri
+        this.currentFilterKey = 'nessun-filtro';
+        this.userCache = new Map();  // chiave filtri → array di utenti
+        
+        // righe filtrate come indici crescenti (null = tutte) e correlazione incrementale
+        this.filteredIndices = null;
+        this.allIndices = null;
+        this.correlation = null;
+        
+        // motore dati: Web Worker se possibile, altrimenti DataEngine nel thread principale
+        this.worker = null;
+        this.localEngine = null;
+        this.engineRequestId = 0;
+        this.latestFilterId = 0;  // ultima richiesta di filterDataAsync (le altre sono vecchie)
+        this.pendingRequests = new Map();  // id → { resolve, reject }
     }
     
-    // funzione per caricare i dati dal CSV
+    // funzione per caricare i dati: prima provo il binario colonnare, poi il CSV
     async loadData() {
+        return Perf.misura('load', () => this.loadAll());
+    }
+    
+    async loadAll() {
         try {
-            console.log('Sto caricando i dati...');
-            
-            // carico il file CSV con D3 (uso v2 per forzare reload)
-            const data = await d3.csv('data/results/anomalies_temporal_v2.csv');
+            debugLog('Sto caricando i dati...');
             
-            // devo convertire i numeri perché D3 legge tutto come stringhe
-            this.data = data.map(d => {
-                const row = {};
-                
-                // converto i campi numerici
-                for (let key in d) {
-                    // questi li lascio come stringhe
-                    if (key === 'user_id' || key === 'role' || key === 'b_unit' || 
-                        key === 'f_unit' || key === 'dept' || key === 'team' || 
-                        key === 'ITAdmin' || key === 'timestamp') {
-                        row[key] = d[key];
-                    } 
-                    // questi li converto a numero intero
-                    else if (key === 'insider' || key === 'cluster' || key === 'week') {
-                        row[key] = +d[key];
-                    } 
-                    // per il resto provo a convertire
-                    else {
-                        const num = +d[key];
-                        row[key] = isNaN(num) ? d[key] : num;  // se non è un numero lo lascio stringa
-                    }
-                }
-                
-                return row;
-            });
+            // start_server.py espone il CSV già convertito in colonne tipizzate
+            // (vedi csv_colonnare.py): niente parsing né conversione cella per cella
+            const colonnare = await this.loadColumnar('data/anomalies.bin');
+            if (colonnare) {
+                // le colonne tipizzate vanno al motore così come sono; le righe servono solo ai grafici
+                this.columns = colonnare.columns;
+                this.data = await this.rowsFromColumns(colonnare);
+            } else {
+                this.data = await this.loadCsv('data/results/anomalies_temporal_v2.csv');
+            }
             
             // all'inizio i dati filtrati sono uguali a tutti i dati
             this.filteredData = [...this.data];
+            this.filteredIndices = null;
+            this.currentFilterKey = 'nessun-filtro';
+            this.currentFilters = null;
+            this.clusterAggregates = null;
+            this.clusterProfiles = null;
+            this.temporalAggregates = null;
+            this.temporalSeries = null;
+            this.engineResult = null;
+            this.userCache.clear();
             
-            console.log('Dati caricati! Totale righe:', this.data.length);
-            console.log('Utenti unici:', new Set(this.data.map(d => d.user_id)).size);
-            console.log('Cluster trovati:', [...new Set(this.data.map(d => d.cluster))].sort());
-            console.log('Week trovate:', [...new Set(this.data.map(d => d.week))].sort());
-            console.log('Sample primo record:', this.data[0]);  // stampo il primo per vedere se va
+            // questi log scorrono tutte le righe: solo con CONFIG.debug.log
+            if (CONFIG.debug.log) {
+                debugLog('Dati caricati! Totale righe:', this.data.length, colonnare ? '(binario)' : '(CSV)');
+                debugLog('Utenti unici:', new Set(this.data.map(d => d.user_id)).size);
+                debugLog('Cluster trovati:', [...new Set(this.data.map(d => d.cluster))].sort());
+                debugLog('Week trovate:', [...new Set(this.data.map(d => d.week))].sort());
+                debugLog('Sample primo record:', this.data[0]);  // stampo il primo per vedere se va
+            }
             
             return this.data;
             
@@ -59,6 +138,229 @@ class DataLoader {
         }
     }
     
+    // carica l'export binario colonnare, null se il server non lo fornisce
+    // (es. con python -m http.server il file non esiste e ricado sul CSV)
+    async loadColumnar(url) {
+        let response;
+        try {
+            response = await fetch(url);
+        } catch (error) {
+            return null;
+        }
+        if (!response.ok) return null;
+        
+        const { buffer, bytes } = await this.readBody(response);
+        // layout: [uint32 lunghezza header][header JSON][colonne allineate a 4 byte]
+        const headerLength = new DataView(buffer).getUint32(0, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+        
+        // i typed array sono viste sul buffer, nessuna copia
+        // (il file è little-endian come tutte le piattaforme dove gira il browser)
+        const columns = {};
+        header.columns.forEach(col => {
+            if (col.type === 'float32') {
+                columns[col.name] = new Float32Array(buffer, col.offset, header.rows);
+            } else if (col.type === 'int32') {
+                columns[col.name] = new Int32Array(buffer, col.offset, header.rows);
+            } else {
+                columns[col.name] = {
+                    codes: new Int32Array(buffer, col.offset, header.rows),
+                    dictionary: col.dictionary
+                };
+            }
+        });
+        
+        return { rows: header.rows, columns, bytes };
+    }
+    
+    // scarica tutto il body in un ArrayBuffer emettendo 'progress' con i byte arrivati
+    // (le colonne sono una dopo l'altra: prima dell'ultimo byte non ho nessuna riga completa)
+    async readBody(response) {
+        const total = response.headers.get('Content-Encoding')
+            ? 0
+            : +response.headers.get('Content-Length') || 0;
+        if (!response.body || !response.body.getReader) {
+            const buffer = await response.arrayBuffer();
+            return { buffer, bytes: buffer.byteLength };
+        }
+        
+        const reader = response.body.getReader();
+        const chunks = [];
+        let bytes = 0;
+        let bytesSinceEvent = 0;
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            chunks.push(value);
+            bytes += value.byteLength;
+            bytesSinceEvent += value.byteLength;
+            if (bytesSinceEvent >= STREAM_BATCH_BYTES) {
+                bytesSinceEvent = 0;
+                this.dispatchProgress(0, bytes, total, false);
+            }
+        }
+        // un unico buffer che parte da 0: gli offset delle colonne restano allineati a 4 byte
+        const all = new Uint8Array(bytes);
+        let offset = 0;
+        chunks.forEach(chunk => {
+            all.set(chunk, offset);
+            offset += chunk.byteLength;
+        });
+        return { buffer: all.buffer, bytes };
+    }
+    
+    // ricostruisce le righe {colonna: valore} che usano i grafici, a blocchi di
+    // COLUMNAR_CHUNK_ROWS: tra un blocco e l'altro emetto 'progress' e lascio
+    // disegnare il browser (KPI e istogramma compaiono prima della fine, come col CSV)
+    async rowsFromColumns({ rows, columns, bytes }) {
+        const names = Object.keys(columns);
+        const cols = names.map(name => columns[name]);
+        const data = [];
+        this.data = data;  // chi ascolta 'progress' vede le righe man mano
+        let parseTime = 0;
+        
+        for (let start = 0; start < rows; start += COLUMNAR_CHUNK_ROWS) {
+            const t0 = performance.now();
+            const end = Math.min(rows, start + COLUMNAR_CHUNK_ROWS);
+            for (let i = start; i < end; i++) {
+                const row = {};
+                for (let c = 0; c < cols.length; c++) {
+                    const col = cols[c];
+                    row[names[c]] = col.codes ? col.dictionary[col.codes[i]] : col[i];
+                }
+                data.push(row);
+            }
+            parseTime += performance.now() - t0;
+            if (end < rows) {
+                this.dispatchProgress(data.length, bytes, bytes, false);
+                await new Promise(resolve => setTimeout(resolve, 0));
+            }
+        }
+        
+        Perf.registra('parse', parseTime);
+        this.dispatchProgress(data.length, bytes, bytes, true);
+        return data;
+    }
+    
+    // carica il CSV in streaming: this.data cresce blocco per blocco
+    async loadCsv(url) {
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`${response.status} ${response.statusText}: ${url}`);
+        }
+        
+        // se la risposta è compressa Content-Length conta i byte compressi, non lo uso
+        const total = response.headers.get('Content-Encoding')
+            ? 0
+            : +response.headers.get('Content-Length') || 0;
+        const rows = [];
+        this.data = rows;  // chi ascolta 'progress' vede le righe man mano che arrivano
+        
+        let header = null;
+        let parseTime = 0;  // tempo di parsing sommato su tutti i blocchi (senza la rete)
+        const parseText = (text) => {
+            const t0 = performance.now();
+            const parsed = d3.csvParseRows(text);
+            let start = 0;
+            if (!header) {
+                header = parsed[0];
+                start = 1;
+            }
+            for (let i = start; i < parsed.length; i++) {
+                const values = parsed[i];
+                if (values.length === 1 && values[0] === '') continue;  // riga vuota
+                const d = {};
+                for (let j = 0; j < header.length; j++) {
+                    d[header[j]] = values[j] ?? '';
+                }
+                rows.push(this.convertRow(d));
+            }
+            parseTime += performance.now() - t0;
+        };
+        
+        // browser senza stream sul body: parso tutto in un colpo
+        if (!response.body || !response.body.getReader) {
+            parseText(await response.text());
+            Perf.registra('parse', parseTime);
+            this.dispatchProgress(rows.length, total, total, true);
+            return rows;
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let bytes = 0;
+        let bytesSinceEvent = 0;
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            bytes += value.byteLength;
+            bytesSinceEvent += value.byteLength;
+            buffer += decoder.decode(value, { stream: true });
+            if (bytesSinceEvent < STREAM_BATCH_BYTES) continue;
+            
+            // parso solo fino all'ultima riga completa, il resto aspetta il prossimo blocco
+            const cut = this.lastLineBreak(buffer);
+            if (cut < 0) continue;
+            parseText(buffer.slice(0, cut + 1));
+            buffer = buffer.slice(cut + 1);
+            bytesSinceEvent = 0;
+            this.dispatchProgress(rows.length, bytes, total, false);
+        }
+        
+        buffer += decoder.decode();
+        if (buffer.length > 0) parseText(buffer);
+        Perf.registra('parse', parseTime);
+        this.dispatchProgress(rows.length, bytes, total, true);
+        return rows;
+    }
+    
+    // posizione dell'ultimo a capo che non sta dentro un campo tra virgolette
+    lastLineBreak(text) {
+        let inQuotes = false;
+        let last = -1;
+        for (let i = 0; i < text.length; i++) {
+            const c = text.charCodeAt(i);
+            if (c === 34) inQuotes = !inQuotes;  // "
+            else if (c === 10 && !inQuotes) last = i;  // \n
+        }
+        return last;
+    }
+    
+    // evento 'progress': detail = { rows, bytes, total, done }
+    dispatchProgress(rows, bytes, total, done) {
+        this.dispatchEvent(new CustomEvent('progress', {
+            detail: { rows, bytes, total, done }
+        }));
+    }
+    
+    // devo convertire i numeri perché il CSV contiene solo stringhe
+    convertRow(d) {
+        const row = {};
+        
+        // converto i campi numerici
+        for (let key in d) {
+            // questi li lascio come stringhe
+            if (key === 'user_id' || key === 'role' || key === 'b_unit' || 
+                key === 'f_unit' || key === 'dept' || key === 'team' || 
+                key === 'ITAdmin' || key === 'timestamp') {
+                row[key] = d[key];
+            } 
+            // questi li converto a numero intero
+            else if (key === 'insider' || key === 'cluster' || key === 'week') {
+                row[key] = +d[key];
+            } 
+            // per il resto provo a convertire
+            else {
+                const num = +d[key];
+                row[key] = isNaN(num) ? d[key] : num;  // se non è un numero lo lascio stringa
+            }
+        }
+        
+        return row;
+    }
+    
     // calcola le statistiche sui dati filtrati (solo quelle basilari)
     getStats() {
         if (!this.filteredData) return null;
@@ -75,37 +377,385 @@ class DataLoader {
     }
     
     // questa funzione filtra i dati in base ai filtri selezionati
+    // (versione sincrona: usa gli indici bitset di DataEngine nel thread principale)
     filterData(filters) {
-        this.filteredData = this.data.filter(d => {
-            // filtro per cluster
-            if (filters.clusters && filters.clusters.length > 0 && 
-                !filters.clusters.includes('all')) {
-                if (!filters.clusters.includes(d.cluster.toString())) {
-                    return false;  // escludi questo elemento
+        this.currentFilterKey = this.filterKey(filters);
+        this.currentFilters = filters;
+        const indices = this.getLocalEngine().filter(filters);
+        this.filteredIndices = indices;
+        this.filteredData = Array.from(indices, i => this.data[i]);
+        
+        this.filteredStats = null;
+        this.userAggregates = null;
+        this.clusterAggregates = null;
+        this.temporalAggregates = null;
+        this.temporalSeries = null;
+        
+        debugLog('Filtrati:', this.filteredData.length, 'su', this.data.length, 'utenti');
+        return this.filteredData;
+    }
+    
+    // colonne tipizzate a partire dalle righe (quando i dati arrivano dal CSV)
+    // stesso formato dell'export binario: numeri in Float64Array, testo codificato a dizionario
+    buildColumns() {
+        if (this.columns) return this.columns;
+        const rows = this.data.length;
+        const columns = {};
+        const first = this.data[0] || {};
+        Object.keys(first).forEach(name => {
+            if (typeof first[name] === 'number') {
+                const values = new Float64Array(rows);
+                for (let i = 0; i < rows; i++) {
+                    const v = this.data[i][name];
+                    values[i] = typeof v === 'number' ? v : NaN;
+                }
+                columns[name] = values;
+            } else {
+                const codes = new Int32Array(rows);
+                const lookup = new Map();
+                const dictionary = [];
+                for (let i = 0; i < rows; i++) {
+                    const v = this.data[i][name];
+                    let code = lookup.get(v);
+                    if (code === undefined) {
+                        code = dictionary.length;
+                        lookup.set(v, code);
+                        dictionary.push(v);
+                    }
+                    codes[i] = code;
                 }
+                columns[name] = { codes, dictionary };
             }
-            
-            // filtro insider/normale
-            if (filters.insider !== 'all') {
-                if (d.insider !== +filters.insider) {
-                    return false;
+        });
+        this.columns = columns;
+        return columns;
+    }
+    
+    // DataEngine nel thread principale, sulle stesse colonne (nessuna copia)
+    getLocalEngine() {
+        if (!this.localEngine) {
+            this.localEngine = new DataEngine();
+            Perf.misura('engine:load', () =>
+                this.localEngine.load({ rows: this.data.length, columns: this.buildColumns() }));
+        }
+        return this.localEngine;
+    }
+    
+    // avvia il Web Worker e gli passa una copia delle colonne
+    // se il worker non parte (browser vecchio, file://) uso DataEngine qui
+    startEngine(workerUrl = 'js/data-worker.js') {
+        const columns = this.buildColumns();
+        const rows = this.data.length;
+        
+        const useLocal = () => {
+            this.worker = null;
+            this.getLocalEngine();
+        };
+        
+        if (typeof Worker === 'undefined') {
+            useLocal();
+            return;
+        }
+        
+        try {
+            this.worker = new Worker(workerUrl);
+        } catch (error) {
+            console.warn('Web Worker non disponibile, calcolo nel thread principale:', error);
+            useLocal();
+            return;
+        }
+        
+        this.worker.onmessage = (event) => {
+            const msg = event.data;
+            if (msg.type === 'loaded') Perf.registra('engine:load', msg.time);
+            const pending = this.pendingRequests.get(msg.id);
+            if (!pending) return;
+            this.pendingRequests.delete(msg.id);
+            if (msg.type === 'error') pending.reject(new Error(msg.message));
+            else pending.resolve(msg);
+        };
+        this.worker.onerror = (event) => {
+            // il worker è morto: ripiego sul motore locale e rifaccio le richieste in sospeso
+            console.warn('Errore nel Web Worker, calcolo nel thread principale:', event.message);
+            event.preventDefault();
+            useLocal();
+            this.pendingRequests.forEach(({ resolve, filters }, id) => {
+                resolve({ id, ...this.localEngine.run(filters) });
+            });
+            this.pendingRequests.clear();
+        };
+        
+        // copio le colonne così le mie restano utilizzabili dopo il trasferimento
+        const copy = {};
+        const transfer = [];
+        Object.entries(columns).forEach(([name, col]) => {
+            if (col.codes) {
+                copy[name] = { codes: col.codes.slice(), dictionary: col.dictionary };
+                transfer.push(copy[name].codes.buffer);
+            } else {
+                copy[name] = col.slice();
+                transfer.push(copy[name].buffer);
+            }
+        });
+        this.worker.postMessage({ type: 'load', rows, columns: copy }, transfer);
+    }
+    
+    // chiede filtro + aggregazioni al motore; risolve con il risultato grezzo
+    requestEngine(filters) {
+        const id = ++this.engineRequestId;
+        if (!this.worker) {
+            return Promise.resolve({ id, ...this.getLocalEngine().run(filters) });
+        }
+        return new Promise((resolve, reject) => {
+            this.pendingRequests.set(id, { resolve, reject, filters });
+            this.worker.postMessage({ type: 'filter', id, filters });
+        });
+    }
+    
+    // versione asincrona di filterData: il lavoro lo fa il worker
+    // ritorna null se nel frattempo è partito un filtro più recente (risultato vecchio)
+    async filterDataAsync(filters) {
+        return Perf.misura('filter', () => this.applyEngineFilter(filters));
+    }
+    
+    async applyEngineFilter(filters) {
+        const request = this.requestEngine(filters);
+        this.latestFilterId = this.engineRequestId;
+        const result = await request;
+        if (result.id !== this.latestFilterId) return null;
+        
+        // tempi delle singole fasi misurati dal motore (nel worker)
+        Object.entries(result.timings || {}).forEach(([fase, ms]) => Perf.registra(`engine:${fase}`, ms));
+        
+        this.filteredIndices = result.indices;
+        this.filteredData = Array.from(result.indices, i => this.data[i]);
+        this.filteredStats = result.stats;
+        this.userAggregates = result.users;
+        this.clusterAggregates = result.clusters;
+        this.temporalAggregates = result.temporal;
+        this.currentFilterKey = this.filterKey(filters);
+        this.currentFilters = filters;
+        
+        debugLog('Filtrati:', this.filteredData.length, 'su', this.data.length, 'righe (worker)');
+        return this.filteredData;
+    }
+    
+    // chiave che identifica uno stato dei filtri (l'ordine dei cluster non conta)
+    filterKey(filters) {
+        const clusters = (filters.clusters || []).map(String).sort();
+        return JSON.stringify([clusters, String(filters.insider), filters.scoreMin, filters.scoreMax]);
+    }
+    
+    // una riga per utente con la media di ogni feature numerica + cluster/insider
+    // la calcolo una volta per stato dei filtri e la passo a tutti i grafici
+    getUserAggregates() {
+        const key = this.currentFilterKey;
+        let users = this.userCache.get(key);
+        if (users) {
+            // la rimetto in fondo: la Map fa da cache LRU
+            this.userCache.delete(key);
+        } else {
+            users = this.userAggregates
+                ? this.usersFromEngine(this.userAggregates)
+                : DataLoader.aggregateUsers(this.filteredData);
+            if (this.userCache.size >= USER_CACHE_SIZE) {
+                this.userCache.delete(this.userCache.keys().next().value);
+            }
+        }
+        this.userCache.set(key, users);
+        return users;
+    }
+    
+    // risultato completo del motore per lo stato dei filtri corrente, chiesto una volta sola:
+    // al primo disegno profili e serie temporali non ci sono ancora e usano la stessa richiesta
+    currentEngineResult() {
+        const key = this.currentFilterKey;
+        if (!this.engineResult || this.engineResult.key !== key) {
+            const promise = this.requestEngine(this.currentFilters || { clusters: [], insider: 'all' });
+            promise.catch(() => {
+                if (this.engineResult && this.engineResult.promise === promise) this.engineResult = null;
+            });
+            this.engineResult = { key, promise };
+        }
+        return this.engineResult.promise;
+    }
+    
+    // profili dei cluster (media di ogni colonna numerica) sulle righe filtrate
+    // di solito li ha già calcolati il worker insieme al filtro; al primo disegno
+    // non ci sono ancora e li chiedo al motore per lo stato dei filtri corrente
+    getClusterProfiles() {
+        const key = this.currentFilterKey;
+        if (this.clusterProfiles && this.clusterProfiles.key === key) {
+            return this.clusterProfiles.promise;
+        }
+        const aggregates = this.clusterAggregates
+            ? Promise.resolve(this.clusterAggregates)
+            : this.currentEngineResult().then(result => result.clusters);
+        const promise = aggregates
+            .then(a => ClusterProfiles.fromAggregates(a))
+            .catch(error => {
+                if (this.clusterProfiles && this.clusterProfiles.promise === promise) {
+                    this.clusterProfiles = null;
                 }
+                throw error;
+            });
+        this.clusterProfiles = { key, promise };
+        return promise;
+    }
+    
+    // promessa delle serie (cluster, periodo) a più livelli lette dal cubo temporale del motore
+    // (sommo le celle che passano i filtri, non scorro le righe)
+    // di solito arrivano col filtro; al primo caricamento le chiedo al motore come i profili
+    getTemporalSeries() {
+        const key = this.currentFilterKey;
+        if (this.temporalSeries && this.temporalSeries.key === key) {
+            return this.temporalSeries.promise;
+        }
+        let promise;
+        if (this.temporalAggregates) {
+            promise = Promise.resolve(this.temporalAggregates);
+        } else if (!this.worker) {
+            // niente worker: il cubo ce l'ha il motore locale
+            promise = Promise.resolve(this.getLocalEngine().temporalSeries(
+                this.currentFilters || { clusters: [], insider: 'all' }));
+        } else {
+            promise = this.currentEngineResult().then(result => result.temporal);
+        }
+        promise.catch(() => {
+            if (this.temporalSeries && this.temporalSeries.promise === promise) this.temporalSeries = null;
+        });
+        this.temporalSeries = { key, promise };
+        return promise;
+    }
+    
+    // converte la matrice utenti × feature del worker in oggetti
+    usersFromEngine(aggregates) {
+        const { features, userCodes, rowCounts, means, cluster, insider } = aggregates;
+        const dictionary = this.columns.user_id.dictionary;
+        const F = features.length;
+        const users = new Array(userCodes.length);
+        for (let s = 0; s < userCodes.length; s++) {
+            const user = { user_id: dictionary[userCodes[s]] };
+            for (let f = 0; f < F; f++) {
+                user[features[f]] = means[s * F + f];
             }
-            
-            // filtro range score (minimo)
-            if (filters.scoreMin !== undefined && d.final_anomaly_score < filters.scoreMin) {
-                return false;
+            user.cluster = cluster[s];
+            user.insider = insider[s];
+            user.n_rows = rowCounts[s];
+            users[s] = user;
+        }
+        return users;
+    }
+    
+    // stessa tabella calcolata direttamente dalle righe, in un solo passaggio
+    // (la usano i grafici quando non hanno la tabella già pronta)
+    static aggregateUsers(data) {
+        if (!data || data.length === 0) return [];
+        const numeric = Object.keys(data[0]).filter(k => typeof data[0][k] === 'number');
+        const byUser = new Map();
+        for (const row of data) {
+            let acc = byUser.get(row.user_id);
+            if (!acc) {
+                // cluster e insider dalla prima riga dell'utente
+                acc = { user: { user_id: row.user_id }, sums: {}, counts: {},
+                        cluster: row.cluster, insider: row.insider, n: 0 };
+                numeric.forEach(k => { acc.sums[k] = 0; acc.counts[k] = 0; });
+                byUser.set(row.user_id, acc);
             }
-            // filtro range score (massimo)
-            if (filters.scoreMax !== undefined && d.final_anomaly_score > filters.scoreMax) {
-                return false;
+            acc.n++;
+            for (const k of numeric) {
+                const v = row[k];
+                if (v != null && !isNaN(v)) {  // come d3.mean
+                    acc.sums[k] += v;
+                    acc.counts[k]++;
+                }
             }
-            
-            return true;  // questo elemento passa tutti i filtri
+        }
+        return Array.from(byUser.values(), acc => {
+            numeric.forEach(k => {
+                acc.user[k] = acc.counts[k] > 0 ? acc.sums[k] / acc.counts[k] : undefined;
+            });
+            acc.user.cluster = acc.cluster;
+            acc.user.insider = acc.insider;
+            acc.user.n_rows = acc.n;
+            return acc.user;
         });
+    }
+    
+    // campione deterministico e stratificato di al massimo `limit` elementi, in O(n)
+    // - gli elementi con keep(d) (di default gli insider) ci sono sempre, anche oltre il limite
+    // - il resto dei posti è diviso tra gli strati (cluster × insider) in proporzione alla
+    //   loro dimensione; in ogni strato tengo gli elementi con l'hash più basso
+    // L'hash dipende solo da key(d) e dal seme: a parità di filtro il campione è identico a
+    // ogni ridisegno, e quando il filtro cambia gli utenti rimasti tendono a restare.
+    // L'ordine del risultato è quello di `items`.
+    static sample(items, limit, {
+        seed = SAMPLE_SEED,
+        key = d => d.user_id,
+        stratum = d => `${d.cluster}|${d.insider}`,
+        keep = d => d.insider === 1
+    } = {}) {
+        if (!items || items.length <= limit) return items || [];
         
-        console.log('Filtrati:', this.filteredData.length, 'su', this.data.length, 'utenti');
-        return this.filteredData;
+        // 1° passaggio: strati e priorità
+        const strati = new Map();  // chiave strato → { size, priorities }
+        const quale = new Array(items.length);
+        const priorita = new Uint32Array(items.length);
+        let forzati = 0;
+        for (let i = 0; i < items.length; i++) {
+            const d = items[i];
+            if (keep(d)) {
+                quale[i] = null;
+                forzati++;
+                continue;
+            }
+            const s = stratum(d);
+            let strato = strati.get(s);
+            if (!strato) {
+                strato = { size: 0, priorities: [] };
+                strati.set(s, strato);
+            }
+            strato.size++;
+            priorita[i] = hashKey(key(d), seed);
+            strato.priorities.push(priorita[i]);
+            quale[i] = strato;
+        }
+        
+        // posti per strato: quota proporzionale, i resti ai resti più grandi
+        const posti = Math.max(0, limit - forzati);
+        const liberi = items.length - forzati;
+        const lista = [...strati.values()];
+        let assegnati = 0;
+        lista.forEach(strato => {
+            const quota = posti * strato.size / liberi;
+            strato.quota = Math.floor(quota);
+            strato.resto = quota - strato.quota;
+            assegnati += strato.quota;
+        });
+        lista.slice().sort((a, b) => b.resto - a.resto)
+            .slice(0, posti - assegnati)
+            .forEach(strato => strato.quota++);
+        
+        // soglia di ogni strato = quota-esima priorità più bassa
+        lista.forEach(strato => {
+            strato.soglia = strato.quota > 0
+                ? kthSmallest(Uint32Array.from(strato.priorities), strato.quota - 1)
+                : -1;
+            strato.presi = 0;
+        });
+        
+        // 2° passaggio: tengo forzati e chi sta sotto la soglia del suo strato
+        const campione = [];
+        for (let i = 0; i < items.length; i++) {
+            const strato = quale[i];
+            if (strato === null) {
+                campione.push(items[i]);
+            } else if (priorita[i] <= strato.soglia && strato.presi < strato.quota) {
+                strato.presi++;
+                campione.push(items[i]);
+            }
+        }
+        return campione;
     }
     
     // prende la lista dei cluster unici (per popolare il filtro)
@@ -115,43 +765,61 @@ class DataLoader {
         return [...new Set(this.data.map(d => d.cluster))].sort((a, b) => a - b);
     }
     
-    // calcola la matrice di correlazione semplice
+    // matrice di correlazione tra le feature sulle righe filtrate
+    // ritorna un Float64Array F × F (riga i, colonna j → matrix[i * F + j]) che viene
+    // riusato: al cambio filtro aggiorno solo le righe entrate/uscite, non ripasso tutto
     calculateCorrelation(features) {
-        if (!this.filteredData || this.filteredData.length === 0) return [];
-        
-        const matrix = [];
-        
-        for (let i = 0; i < features.length; i++) {
-            for (let j = 0; j < features.length; j++) {
-                const values1 = this.filteredData.map(d => d[features[i]]);
-                const values2 = this.filteredData.map(d => d[features[j]]);
-                
-                // uso funzione D3 per calcolare correlazione
-                // formula: cov(x,y) / (stddev(x) * stddev(y))
-                const mean1 = d3.mean(values1);
-                const mean2 = d3.mean(values2);
-                const dev1 = d3.deviation(values1);
-                const dev2 = d3.deviation(values2);
-                
-                let corr = 0;
-                if (dev1 && dev2) {
-                    let cov = 0;
-                    for (let k = 0; k < values1.length; k++) {
-                        cov += (values1[k] - mean1) * (values2[k] - mean2);
-                    }
-                    cov /= values1.length;
-                    corr = cov / (dev1 * dev2);
-                }
-                
-                matrix.push({
-                    x: features[i],
-                    y: features[j],
-                    value: corr
-                });
-            }
+        const key = features.join('|');
+        if (!this.correlation || this.correlation.key !== key) {
+            const columns = this.buildColumns();
+            const cols = features.map(f => {
+                const col = columns[f];
+                if (!col || col.codes) throw new Error(`Feature non numerica: ${f}`);
+                return col;
+            });
+            this.correlation = new CorrelationMatrix(cols);
+            this.correlation.key = key;
+            this.correlation.rows = null;  // righe attualmente dentro la matrice
+            this.correlation.updates = 0;
         }
+        this.updateCorrelation(this.getFilteredIndices());
+        return this.correlation.matrix();
+    }
+    
+    // porta la matrice di correlazione sulle righe `next` (crescenti)
+    updateCorrelation(next) {
+        const corr = this.correlation;
+        if (corr.rows === next) return;
         
-        return matrix;
+        let rebuild = corr.rows === null || corr.updates >= CORRELATION_REBUILD_EVERY;
+        if (!rebuild) {
+            const { added, removed } = diffSortedIndices(corr.rows, next);
+            // se cambia più di quanto resta conviene ripartire da zero
+            if (added.length + removed.length < next.length) {
+                corr.removeRows(removed);
+                corr.addRows(added);
+                corr.updates++;
+            } else {
+                rebuild = true;
+            }
+        }
+        if (rebuild) {
+            // ogni tanto riparto da zero per non accumulare errori di arrotondamento
+            corr.reset();
+            corr.addRows(next);
+            corr.updates = 0;
+        }
+        corr.rows = next;
+    }
+    
+    // indici crescenti delle righe filtrate (tutte se non ho ancora filtrato)
+    getFilteredIndices() {
+        if (this.filteredIndices) return this.filteredIndices;
+        if (!this.allIndices || this.allIndices.length !== this.data.length) {
+            this.allIndices = new Uint32Array(this.data.length);
+            for (let i = 0; i < this.data.length; i++) this.allIndices[i] = i;
+        }
+        return this.allIndices;
     }
     
     // calcola le medie per ogni cluster (serve per il radar chart)
@@ -0,0 +1,27 @@
+// data-worker.js - Web Worker che tiene i dati e calcola filtri e aggregazioni
+// così il thread principale resta libero di disegnare
+// Messaggi in ingresso:
+//   { type: 'load', rows, columns }   → risponde { type: 'loaded', time }
+//   { type: 'filter', id, filters }   → risponde { type: 'result', id, indices, users, clusters, temporal, stats, timings }
+// I typed array del risultato vengono trasferiti, non copiati.
+
+importScripts('data-engine.js');
+
+const engine = new DataEngine();
+
+self.onmessage = (event) => {
+    const msg = event.data;
+    try {
+        if (msg.type === 'load') {
+            const t0 = performance.now();
+            engine.load(msg);
+            self.postMessage({ type: 'loaded', time: performance.now() - t0 });
+        } else if (msg.type === 'filter') {
+            const result = engine.run(msg.filters);
+            self.postMessage({ type: 'result', id: msg.id, ...result },
+                             DataEngine.transferables(result));
+        }
+    } catch (error) {
+        self.postMessage({ type: 'error', id: msg.id, message: error.message });
+    }
+};
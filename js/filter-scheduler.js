@@ -0,0 +1,63 @@
+// filter-scheduler.js - raggruppa i cambi di filtro in al massimo un ricalcolo per frame
+// Mentre si trascina uno slider arrivano decine di eventi 'input' al secondo:
+// tengo solo l'ultimo stato dei filtri e lo calcolo al prossimo animation frame.
+// Al motore c'è al massimo una richiesta alla volta (le altre non finiscono in coda
+// nel worker); se durante il disegno arriva un filtro nuovo, i grafici che mancano
+// vengono saltati e li disegna il giro successivo.
+// I filtri superati si scartano qui: quelli arrivati mentre una richiesta è in corso
+// si sovrascrivono in `prossimi` e al worker arriva solo l'ultimo. Il calcolo già
+// partito nel worker invece non si interrompe (è sincrono) e viene disegnato.
+
+// promessa risolta al prossimo frame (per lasciare al browser il tempo di disegnare)
+function prossimoFrame() {
+    return new Promise(resolve => requestAnimationFrame(() => resolve()));
+}
+
+class FilterScheduler {
+
+    // calcola(filters) → Promise<dati filtrati | null>
+    // disegna(dati, annullato) → Promise; annullato() = true se è arrivato un filtro più recente
+    constructor(calcola, disegna) {
+        this.calcola = calcola;
+        this.disegna = disegna;
+        this.prossimi = null;     // ultimo stato dei filtri non ancora calcolato
+        this.generazione = 0;     // cresce a ogni richiesta
+        this.frame = null;
+        this.inCorso = false;
+    }
+
+    // nuovo stato dei filtri (copiato: l'oggetto originale continua a cambiare)
+    richiedi(filters) {
+        this.prossimi = { ...filters, clusters: [...filters.clusters] };
+        this.generazione++;
+        this.pianifica();
+    }
+
+    pianifica() {
+        if (this.frame === null && !this.inCorso && this.prossimi) {
+            this.frame = requestAnimationFrame(() => this.esegui());
+        }
+    }
+
+    async esegui() {
+        this.frame = null;
+        const filters = this.prossimi;
+        const generazione = this.generazione;
+        this.prossimi = null;
+        this.inCorso = true;
+        try {
+            const data = await this.calcola(filters);
+            // anche se nel frattempo i filtri sono cambiati lo disegno: è lo stato
+            // più recente già calcolato (e così lo slider dà un riscontro mentre si muove);
+            // i grafici meno importanti li salta il controllo annullato()
+            if (data) {
+                await this.disegna(data, () => generazione !== this.generazione);
+            }
+        } catch (error) {
+            console.error('Errore durante il filtro:', error);
+        } finally {
+            this.inCorso = false;
+            this.pianifica();
+        }
+    }
+}
@@ -9,6 +9,12 @@ class InteractionManager {
             scoreMin: 0,
             scoreMax: 100
         };
+        
+        // i cambi di filtro vengono raggruppati: al massimo un ricalcolo per frame
+        this.scheduler = new FilterScheduler(
+            filters => window.dataLoader.filterDataAsync(filters),
+            (data, annullato) => this.updateAllCharts(data, annullato)
+        );
     }
     
     init() {
@@ -35,7 +41,7 @@ class InteractionManager {
         select.addEventListener('change', (e) => {
             const selected = Array.from(e.target.selectedOptions).map(opt => opt.value);
             this.filters.clusters = selected;
-            console.log('Cluster selezionati:', selected);
+            debugLog('Cluster selezionati:', selected);
             this.applyFilters();
         });
     }
@@ -45,7 +51,7 @@ class InteractionManager {
         const select = document.getElementById('insider-filter');
         select.addEventListener('change', (e) => {
             this.filters.insider = e.target.value;
-            console.log('Filtro insider:', e.target.value);
+            debugLog('Filtro insider:', e.target.value);
             this.applyFilters();
         });
     }
@@ -79,11 +85,13 @@ class InteractionManager {
             this.filters.scoreMax = max;
         };
         
+        // filtro mentre trascino: lo scheduler tiene solo l'ultimo valore per frame
         minSlider.addEventListener('input', () => {
             if (parseFloat(minSlider.value) > parseFloat(maxSlider.value)) {
                 minSlider.value = maxSlider.value;
             }
             updateDisplay();
+            this.applyFilters();
         });
         
         maxSlider.addEventListener('input', () => {
@@ -91,11 +99,9 @@ class InteractionManager {
                 maxSlider.value = minSlider.value;
             }
             updateDisplay();
+            this.applyFilters();
         });
         
-        minSlider.addEventListener('change', () => this.applyFilters());
-        maxSlider.addEventListener('change', () => this.applyFilters());
-        
         updateDisplay();
     }
     
@@ -107,11 +113,10 @@ class InteractionManager {
         });
     }
     
-    // Applica filtri
+    // Applica filtri (il filtro lo calcola il Web Worker, la UI non si blocca)
+    // non calcola subito: passa dallo scheduler, che unisce i cambi dello stesso frame
     applyFilters() {
-        console.log('Applicazione filtri:', this.filters);
-        const filteredData = window.dataLoader.filterData(this.filters);
-        this.updateAllCharts(filteredData);
+        this.scheduler.richiedi(this.filters);
     }
     
     // Reset filtri
@@ -136,33 +141,39 @@ class InteractionManager {
         this.applyFilters();
     }
     
-    // Aggiorna tutti i grafici
-    async updateAllCharts(data) {
-        console.log('Aggiorno grafici con', data.length, 'utenti');
-        
-        // KPI cards
-        renderKpiCards(data);
-        
-        // Univariate
-        UnivariateCharts.createHistogram(data, 'istogramma');
-        
-        // Bivariate
-        BivariateCharts.createScatterRankScore(data, 'scatter-rank-score');
-        
-        // Trivariate
-        TrivariateCharts.createColoredScatter(data, 'scatter-multivariato');
-        
-        // Temporal
-        const temporalCharts = new TemporalCharts();
-        temporalCharts.createLineChart(data, 'grafico-temporale');
-        
-        // Parallel Coordinates
-        const parallelCoords = new ParallelCoordinates();
-        parallelCoords.createParallelCoordinates(data, 'coordinate-parallele');
-        
-        // Multivariate (ora async)
-        await MultivariateCharts.createRadarChart(data, 'radar-cluster');
-        await MultivariateCharts.createHeatmap(data, 'heatmap-cluster');
+    // Aggiorna tutti i grafici, in ordine di priorità: KPI subito, poi i grafici
+    // visibili uno per frame; quelli fuori schermo li disegna RenderManager quando
+    // ci si arriva. Se annullato() diventa true (filtro più recente) mi fermo
+    // e i grafici rimasti li aggiorna il giro successivo
+    async updateAllCharts(data, annullato = () => false) {
+        debugLog('Aggiorno grafici con', data.length, 'utenti');
+        
+        // numeri e aggregati del worker, se si riferiscono proprio a questi dati
+        const correnti = data === window.dataLoader.filteredData;
+        const stats = correnti ? window.dataLoader.filteredStats : null;
+        // tabella per-utente condivisa (calcolata una volta per stato dei filtri)
+        const users = correnti ? window.dataLoader.getUserAggregates() : null;
+        // serie (cluster, periodo) dal cubo temporale (promessa: al primo giro la calcola il motore)
+        const serie = window.dataLoader.getTemporalSeries();
+        
+        // KPI cards: costano poco e stanno in cima, sempre subito
+        Perf.misura('render:kpi', () => renderKpiCards(data, stats));
+        
+        await window.renderManager.aggiorna([
+            // Univariate
+            { id: 'istogramma', disegna: () => UnivariateCharts.createHistogram(data, 'istogramma', users) },
+            // Bivariate
+            { id: 'scatter-rank-score', disegna: () => BivariateCharts.createScatterRankScore(data, 'scatter-rank-score', users) },
+            // Trivariate
+            { id: 'scatter-multivariato', disegna: () => TrivariateCharts.createColoredScatter(data, 'scatter-multivariato', users), adattivo: true },
+            // Temporal
+            { id: 'grafico-temporale', disegna: async () => new TemporalCharts().createLineChart(data, 'grafico-temporale', await serie), adattivo: true },
+            // Parallel Coordinates
+            { id: 'coordinate-parallele', disegna: () => new ParallelCoordinates().createParallelCoordinates(data, 'coordinate-parallele', users), adattivo: true },
+            // Multivariate: radar e heatmap usano la stessa promessa dei profili (calcolata una volta)
+            { id: 'radar-cluster', disegna: () => MultivariateCharts.createRadarChart(data, 'radar-cluster') },
+            { id: 'heatmap-cluster', disegna: () => MultivariateCharts.createHeatmap(data, 'heatmap-cluster') }
+        ], annullato);
     }
 }
 
@@ -4,35 +4,52 @@
 // istanze globali (accessibili tramite window)
 window.dataLoader = new DataLoader();
 window.interactionManager = new InteractionManager();
+window.renderManager = new RenderManager();
+
+// ogni quanto (ms) ridisegno KPI e istogramma mentre il CSV sta ancora arrivando
+const PROGRESSIVE_INTERVAL = 300;
 
 // questa è la funzione che parte all'inizio
 async function init() {
     try {
-        console.log('Inizio a caricare la dashboard...');
+        debugLog('Inizio a caricare la dashboard...');
+        
+        // riquadro con i tempi delle fasi (CONFIG.debug.overlay oppure ?perf nell'URL)
+        if (CONFIG.debug.overlay || new URLSearchParams(location.search).has('perf')) {
+            Perf.overlay(true);
+        }
         
         // mostro il loading
         showLoading();
         
-        // carico i dati dal CSV
-        console.log('Caricamento dati in corso...');
-        await window.dataLoader.loadData();
+        // carico i dati dal CSV (KPI e istogramma compaiono già al primo blocco)
+        debugLog('Caricamento dati in corso...');
+        const stopProgressive = startProgressiveRender();
+        try {
+            await window.dataLoader.loadData();
+        } finally {
+            stopProgressive();
+        }
+        
+        debugLog('Dati caricati OK!');
         
-        console.log('Dati caricati OK!');
+        // da qui in poi filtri e aggregazioni li calcola il Web Worker
+        window.dataLoader.startEngine();
         
         // inizializzo i filtri e i controlli
-        console.log('Inizializzo i filtri...');
+        debugLog('Inizializzo i filtri...');
         window.interactionManager.init();
         
         // disegno tutti i grafici
-        console.log('Disegno i grafici...');
-        console.log('Dati disponibili:', window.dataLoader.filteredData?.length);
-        console.log('Sample primo dato:', window.dataLoader.filteredData?.[0]);
+        debugLog('Disegno i grafici...');
+        debugLog('Dati disponibili:', window.dataLoader.filteredData?.length);
+        debugLog('Sample primo dato:', window.dataLoader.filteredData?.[0]);
         await renderInitialCharts();
         
         // nascondo il loading
         hideLoading();
         
-        console.log('Dashboard pronta!');
+        debugLog('Dashboard pronta!');
         
     } catch (error) {
         console.error('ERRORE durante inizializzazione:', error);
@@ -41,36 +58,55 @@ async function init() {
 }
 
 // funzione che disegna tutti i grafici la prima volta
+// stessa strada dei filtri: i grafici sotto la piega aspettano di essere visti
 async function renderInitialCharts() {
-    const data = window.dataLoader.filteredData;
-    
-    console.log('Creo schede KPI...');
-    renderKpiCards(data);
-    
-    console.log('Creo istogramma...');
-    UnivariateCharts.createHistogram(data, 'istogramma');
-    
-    console.log('Creo scatter...');
-    BivariateCharts.createScatterRankScore(data, 'scatter-rank-score');
-    
-    console.log('Creo scatter colorato...');
-    TrivariateCharts.createColoredScatter(data, 'scatter-multivariato');
-    
-    console.log('Creo line chart temporale...');
-    const temporalCharts = new TemporalCharts();
-    temporalCharts.createLineChart(data, 'grafico-temporale');
-    
-    console.log('Creo parallel coordinates...');
-    const parallelCoords = new ParallelCoordinates();
-    parallelCoords.createParallelCoordinates(data, 'coordinate-parallele');
+    await window.interactionManager.updateAllCharts(window.dataLoader.filteredData);
+    debugLog('Grafici visibili pronti!');
+}
+
+// durante lo streaming del CSV disegna KPI e istogramma sulle righe già arrivate
+// e li raffina ad ogni blocco (al massimo una volta ogni PROGRESSIVE_INTERVAL ms)
+// ritorna la funzione che smette di ascoltare
+function startProgressiveRender() {
+    let lastPaint = 0;
+    let timer = null;
+    let stopped = false;
     
-    console.log('Creo radar chart...');
-    await MultivariateCharts.createRadarChart(data, 'radar-cluster');
+    const paint = () => {
+        timer = null;
+        if (stopped) return;
+        const data = window.dataLoader.data;
+        if (!data || data.length === 0) return;
+        lastPaint = performance.now();
+        hideLoading();
+        renderKpiCards(data);
+        UnivariateCharts.createHistogram(data, 'istogramma');
+    };
     
-    console.log('Creo heatmap...');
-    await MultivariateCharts.createHeatmap(data, 'heatmap-cluster');
+    const onProgress = (event) => {
+        updateLoading(event.detail);
+        // l'ultimo blocco lo disegna renderInitialCharts con tutti i grafici
+        if (event.detail.done || timer !== null) return;
+        const wait = lastPaint === 0
+            ? 0
+            : Math.max(0, PROGRESSIVE_INTERVAL - (performance.now() - lastPaint));
+        timer = setTimeout(() => requestAnimationFrame(paint), wait);
+    };
     
-    console.log('Grafici pronti!');
+    window.dataLoader.addEventListener('progress', onProgress);
+    return () => {
+        stopped = true;
+        clearTimeout(timer);
+        window.dataLoader.removeEventListener('progress', onProgress);
+    };
+}
+
+// aggiorna il testo del loading con le righe lette finora
+function updateLoading({ rows, bytes, total }) {
+    const loadingDiv = document.getElementById('loading-overlay');
+    if (!loadingDiv) return;
+    const percent = total > 0 ? ` (${Math.round(bytes / total * 100)}%)` : '';
+    loadingDiv.innerHTML = `<div>Caricamento dati... ${rows} righe${percent}</div>`;
 }
 
 // mostra il simbolo di loading
@@ -137,23 +173,29 @@ Poi apri: http://localhost:8000
 
 // quando la pagina è caricata parte l'init
 document.addEventListener('DOMContentLoaded', () => {
-    console.log('DOM caricato, parto con init...');
+    debugLog('DOM caricato, parto con init...');
     init();
 });
 
 // ---- KPI Cards ----
 // mostra 4 card con statistiche chiave in cima alla dashboard
-function renderKpiCards(data) {
+// se ho già le statistiche calcolate dal worker (stats) non riscorro le righe
+function renderKpiCards(data, stats = null) {
     const container = document.getElementById('schede-kpi');
     if (!container) return;
     container.innerHTML = '';  // pulisco
 
-    // calcolo metriche (uso Set per contare utenti unici, non righe temporali)
-    const uniqueUsers   = new Set(data.map(d => d.user_id)).size;
-    const insiderCount  = new Set(data.filter(d => d.insider === 1).map(d => d.user_id)).size;
-    const scores        = data.map(d => d.final_anomaly_score);
-    const avgScore      = d3.mean(scores);
-    const maxScore      = d3.max(scores);
+    let uniqueUsers, insiderCount, avgScore, maxScore;
+    if (stats) {
+        ({ users: uniqueUsers, insiderCount, avgScore, maxScore } = stats);
+    } else {
+        // calcolo metriche (uso Set per contare utenti unici, non righe temporali)
+        uniqueUsers   = new Set(data.map(d => d.user_id)).size;
+        insiderCount  = new Set(data.filter(d => d.insider === 1).map(d => d.user_id)).size;
+        const scores  = data.map(d => d.final_anomaly_score);
+        avgScore      = d3.mean(scores);
+        maxScore      = d3.max(scores);
+    }
 
     const kpis = [
         { label: 'Utenti totali',    value: uniqueUsers,                                   color: '#3498db' },
@@ -174,25 +216,23 @@ function renderKpiCards(data) {
     });
 }
 
-// (uso un timeout per non chiamarlo troppo spesso)
-let resizeTimeout;
-window.addEventListener('resize', () => {
-    clearTimeout(resizeTimeout);
-    resizeTimeout = setTimeout(() => {
-        console.log('Finestra ridimensionata, aggiorno grafici...');
-        if (window.dataLoader.filteredData) {
-            window.interactionManager.updateAllCharts(window.dataLoader.filteredData);
-        }
-    }, 500);  // aspetto mezzo secondo
-});
+// il resize non passa di qui: ogni grafico che segue la larghezza del container
+// ha il suo ResizeObserver (vedi RenderManager) e aggiorna solo il layout
 
 // funzione di debug che posso chiamare dalla console del browser
 // basta scrivere: debugInfo()
-window.debugInfo = () => {
+// stampa anche i tempi di ogni fase (caricamento, parsing, filtro, aggregazioni, disegno
+// di ogni grafico) e li ritorna; debugInfo({ overlay: true }) apre il riquadro a schermo
+window.debugInfo = ({ overlay } = {}) => {
     console.log('=== INFO DEBUG ===');
     console.log('Dati caricati:', window.dataLoader.data?.length || 0);
     console.log('Dati filtrati:', window.dataLoader.filteredData?.length || 0);
     console.log('Filtri attivi:', window.interactionManager.filters);
     console.log('Cluster disponibili:', window.dataLoader.getUniqueClusters());
     console.log('Statistiche:', window.dataLoader.getStats());
+    const tempi = Perf.statistiche();
+    console.log('Tempi per fase (ms):');
+    console.table(tempi);
+    if (overlay !== undefined) Perf.overlay(overlay);
+    return tempi;
 };
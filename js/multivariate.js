@@ -7,13 +7,9 @@ class MultivariateCharts {
     static async createRadarChart(data, containerId) {
         const container = d3.select(`#${containerId}`);
         
-        // Rimuovi solo gli elementi vecchi, non l'SVG (per transizioni smooth)
+        // Tengo l'SVG e i suoi elementi: aree, punti e legenda fanno join per cluster
         const existingSvg = container.select('svg');
-        if (!existingSvg.empty()) {
-            existingSvg.selectAll('.radar-area').remove();
-            existingSvg.selectAll('[class^="radar-point-"]').remove();
-            existingSvg.selectAll('.legend').remove();
-        } else {
+        if (existingSvg.empty()) {
             container.selectAll('*').remove();
         }
         
@@ -93,38 +89,14 @@ class MultivariateCharts {
             .domain([0, 1])
             .range([0, radius]);
         
-        // Carica profili cluster dal CSV (uso v2 per forzare reload)
-        const clusterProfiles = await d3.csv('data/results/cluster_profiles_v2.csv');
-        const clusterMeans = clusterProfiles.map(d => ({
-            cluster: +d.cluster || +d[''] || 0,  // gestisce sia "cluster" che indice
-            ...Object.fromEntries(features.map(f => [f, +d[f] || 0]))
-        }));
+        // Profili cluster: medie sulle righe filtrate o CSV fisso (vedi ClusterProfiles)
+        // normalizzati tra i cluster, con un padding del 10% per non toccare centro o bordo
+        const profili = await ClusterProfiles.current();
+        const normalized = profili.normalized(features, 0.10);
         
-        // Normalizza [0, 1] usando il range dei cluster stessi per ogni feature,
-        // così le differenze tra cluster occupano tutto il range visivo del radar.
-        // Un padding del 10% evita che i valori tocchino centro o bordo.
-        const PADDING = 0.10;
-        const normalized = clusterMeans.map(cluster => {
-            const norm = { cluster: cluster.cluster };
-            features.forEach(feature => {
-                // extent calcolato sui valori dei cluster (non del dataset grezzo)
-                const extent = d3.extent(clusterMeans, d => d[feature]);
-                const span = extent[1] - extent[0];
-                // se tutti i cluster hanno lo stesso valore evita divisione per 0
-                if (span === 0) {
-                    norm[feature] = 0.5;
-                } else {
-                    const raw = (cluster[feature] - extent[0]) / span;
-                    // rimappa in [PADDING, 1-PADDING] per visibilità
-                    norm[feature] = PADDING + raw * (1 - 2 * PADDING);
-                }
-            });
-            return norm;
-        });
-        
-        // Color scale
+        // Color scale (dominio fisso: i colori non cambiano se un cluster è filtrato via)
         const colorScale = d3.scaleOrdinal()
-            .domain(normalized.map(d => d.cluster))
+            .domain([0, 1, 2, 3, 4])
             .range(CONFIG.colors.clusters);
         
         // Funzione per generare path
@@ -154,36 +126,34 @@ class MultivariateCharts {
             .style('stroke-width', 2);
         
         // UPDATE + ENTER: anima i path verso le nuove posizioni
+        // (non rifaccio il bind con datum: il dato deve restare il cluster per la chiave)
         radarPaths.merge(radarEnter)
-            .datum(d => features.map(f => ({ value: d[f] })))
             .transition()
             .duration(CONFIG.transition.duration)
-            .attr('d', radarLine)
+            .attr('d', d => radarLine(features.map(f => ({ value: d[f] }))))
             .style('fill-opacity', 0.2);
         
-        // Punti per ogni cluster
-        normalized.forEach(cluster => {
+        // Punti per ogni cluster: un gruppo per cluster (chiave = cluster), un punto per asse
+        const gruppiPunti = svg.selectAll('.radar-points')
+            .data(normalized, d => d.cluster)
+            .join(
+                enter => enter.append('g').attr('class', 'radar-points'),
+                update => update,
+                exit => exit.transition()
+                    .duration(CONFIG.transition.duration)
+                    .style('opacity', 0)
+                    .remove()
+            );
+        
+        gruppiPunti.each(function(cluster) {
             const values = features.map(f => ({ value: cluster[f] }));
             
-            const points = svg.selectAll(`.radar-point-${cluster.cluster}`)
-                .data(values);
-            
-            // EXIT
-            points.exit()
-                .transition()
-                .duration(CONFIG.transition.duration)
-                .attr('r', 0)
-                .remove();
-            
-            // ENTER
-            const pointsEnter = points.enter()
-                .append('circle')
-                .attr('class', `radar-point-${cluster.cluster}`)
-                .attr('r', 0)
-                .style('fill', colorScale(cluster.cluster));
-            
-            // UPDATE + ENTER
-            points.merge(pointsEnter)
+            d3.select(this).selectAll('circle')
+                .data(values)
+                .join(enter => enter.append('circle')
+                    .attr('class', `radar-point-${cluster.cluster}`)
+                    .attr('r', 0)
+                    .style('fill', colorScale(cluster.cluster)))
                 .transition()
                 .duration(CONFIG.transition.duration)
                 .attr('cx', (d, i) => rScale(d.value) * Math.cos(angleSlice * i - Math.PI / 2))
@@ -191,36 +161,42 @@ class MultivariateCharts {
                 .attr('r', 3);
         });
         
-        // Legenda con etichette descrittive
-        const legend = svg.append('g')
-            .attr('class', 'legend')
-            .attr('transform', `translate(${radius + 20}, -${radius})`);
+        // Legenda con etichette descrittive (creata una volta, righe per cluster)
+        let legend = svg.select('.legend');
+        if (legend.empty()) {
+            legend = svg.append('g')
+                .attr('class', 'legend')
+                .attr('transform', `translate(${radius + 20}, -${radius})`);
+        }
         
         legend.selectAll('g')
-            .data(normalized)
-            .join('g')
+            .data(normalized, d => d.cluster)
+            .join(enter => enter.append('g')
+                .each(function(d) {
+                    const g = d3.select(this);
+                    g.append('rect')
+                        .attr('width', 14)
+                        .attr('height', 14)
+                        .attr('rx', 3)
+                        .attr('opacity', 0.85);
+                    g.append('text')
+                        .attr('x', 20)
+                        .attr('y', 11)
+                        .text(getClusterLabel(d.cluster))
+                        .style('font-size', '11px')
+                        .style('font-weight', d.cluster === 4 ? '700' : '400')
+                        .style('fill', d.cluster === 4 ? '#e74c3c' : '#333');
+                }))
             .attr('transform', (d, i) => `translate(0, ${i * 22})`)
-            .each(function(d) {
-                const g = d3.select(this);
-                g.append('rect')
-                    .attr('width', 14)
-                    .attr('height', 14)
-                    .attr('rx', 3)
-                    .attr('fill', colorScale(d.cluster))
-                    .attr('opacity', 0.85);
-                g.append('text')
-                    .attr('x', 20)
-                    .attr('y', 11)
-                    .text(getClusterLabel(d.cluster))
-                    .style('font-size', '11px')
-                    .style('font-weight', d.cluster === 4 ? '700' : '400')
-                    .style('fill', d.cluster === 4 ? '#e74c3c' : '#333');
-            });
+            .select('rect')
+            .attr('fill', d => colorScale(d.cluster));
     }
     
     // Heatmap profili cluster (cluster × feature)
+    // la struttura (etichette, titolo, legenda) la creo solo la prima volta,
+    // poi aggiorno le celle con join su cluster+feature
     static async createHeatmap(data, containerId) {
-        d3.select(`#${containerId}`).selectAll('*').remove();
+        const container = d3.select(`#${containerId}`);
         
         const margin = { top: 80, right: 30, bottom: 120, left: 180 };
         const cellSize = 60;
@@ -235,31 +211,19 @@ class MultivariateCharts {
             'n_logon'
         ];
         
-        // Carica profili cluster dal CSV
-        const clusterProfiles = await d3.csv('data/results/cluster_profiles_v2.csv');
-        const clusterData = clusterProfiles.map(d => ({
-            cluster: +d.cluster || +d[''] || 0,
-            ...Object.fromEntries(features.map(f => [f, +d[f] || 0]))
-        }));
+        // Profili cluster (righe filtrate o CSV fisso) normalizzati [0, 1] per colore
+        const profili = await ClusterProfiles.current();
+        const clusterData = profili.clusters;
+        const normalizzati = profili.normalized(features);
         
-        // Calcola min/max per ogni feature per normalizzazione
-        const featureExtents = {};
-        features.forEach(f => {
-            const values = clusterData.map(c => c[f]);
-            featureExtents[f] = d3.extent(values);
-        });
-        
-        // Normalizza valori [0, 1] per colore
         const normalizedData = [];
-        clusterData.forEach(cluster => {
+        clusterData.forEach((cluster, i) => {
             features.forEach(feature => {
-                const [min, max] = featureExtents[feature];
-                const normalized = max !== min ? (cluster[feature] - min) / (max - min) : 0.5;
                 normalizedData.push({
                     cluster: cluster.cluster,
                     feature: feature,
-                    value: cluster[feature],
-                    normalized: normalized
+                    value: cluster[feature] ?? 0,
+                    normalized: normalizzati[i][feature]
                 });
             });
         });
@@ -267,13 +231,6 @@ class MultivariateCharts {
         const width = cellSize * features.length;
         const height = cellSize * clusterData.length;
         
-        const svg = d3.select(`#${containerId}`)
-            .append('svg')
-            .attr('width', width + margin.left + margin.right)
-            .attr('height', height + margin.top + margin.bottom)
-            .append('g')
-            .attr('transform', `translate(${margin.left},${margin.top})`);
-        
         // Scale
         const x = d3.scaleBand()
             .domain(features)
@@ -289,104 +246,121 @@ class MultivariateCharts {
         const colorScale = d3.scaleSequential(d3.interpolateRdYlGn)
             .domain([0, 1]);
         
-        // Tooltip
-        const tooltip = d3.select('body').append('div').attr('class', 'tooltip');
+        // se il numero di cluster è cambiato cambia l'altezza: rifaccio la struttura
+        let svg = container.select('svg > g');
+        if (svg.empty() || +container.select('svg').attr('height') !== height + margin.top + margin.bottom) {
+            container.selectAll('*').remove();
+            svg = container
+                .append('svg')
+                .attr('width', width + margin.left + margin.right)
+                .attr('height', height + margin.top + margin.bottom)
+                .append('g')
+                .attr('transform', `translate(${margin.left},${margin.top})`);
+            
+            svg.append('g').attr('class', 'celle');
+            
+            // Label X (feature)
+            svg.selectAll('.label-x')
+                .data(features)
+                .join('text')
+                .attr('class', 'label-x')
+                .attr('x', d => x(d) + x.bandwidth() / 2)
+                .attr('y', height + 15)
+                .attr('text-anchor', 'end')
+                .attr('transform', d => `rotate(-45, ${x(d) + x.bandwidth() / 2}, ${height + 15})`)
+                .text(d => getLabel(d))
+                .style('font-size', '12px')
+                .style('font-weight', 'bold');
+            
+            // Titolo
+            svg.append('text')
+                .attr('x', width / 2)
+                .attr('y', -50)
+                .attr('text-anchor', 'middle')
+                .text('Profili Cluster per Feature (normalizzati)')
+                .style('font-size', '14px')
+                .style('font-weight', 'bold');
+            
+            // Legenda colore
+            const legendWidth = 200;
+            const legendHeight = 15;
+            const legend = svg.append('g')
+                .attr('transform', `translate(${width - legendWidth - 20}, -40)`);
+            
+            const legendScale = d3.scaleLinear()
+                .domain([0, legendWidth])
+                .range([0, 1]);
+            
+            legend.selectAll('rect')
+                .data(d3.range(legendWidth))
+                .join('rect')
+                .attr('x', d => d)
+                .attr('y', 0)
+                .attr('width', 1)
+                .attr('height', legendHeight)
+                .attr('fill', d => colorScale(legendScale(d)));
+            
+            legend.append('text')
+                .attr('x', 0)
+                .attr('y', -5)
+                .text('Basso')
+                .style('font-size', '10px');
+            
+            legend.append('text')
+                .attr('x', legendWidth)
+                .attr('y', -5)
+                .attr('text-anchor', 'end')
+                .text('Alto')
+                .style('font-size', '10px');
+        }
+        
+        // Label Y (cluster): con i profili live i cluster seguono il filtro
+        svg.selectAll('.label-y')
+            .data(clusterData, d => d.cluster)
+            .join(enter => enter.append('text')
+                .attr('class', 'label-y')
+                .attr('x', -10)
+                .attr('text-anchor', 'end')
+                .attr('dominant-baseline', 'middle')
+                .text(d => getClusterLabel(d.cluster))
+                .style('font-size', '11px')
+                .style('font-weight', d => d.cluster === 4 ? '700' : '500')
+                .style('fill', d => d.cluster === 4 ? '#e74c3c' : '#333'))
+            .attr('y', d => y(getClusterLabel(d.cluster)) + y.bandwidth() / 2);
         
-        // Celle
-        svg.selectAll('rect')
-            .data(normalizedData)
-            .join('rect')
+        // Tooltip
+        const tooltip = getTooltip(containerId);
+        
+        // Celle (chiave = cluster + feature): di solito cambia solo il colore
+        svg.select('.celle').selectAll('rect')
+            .data(normalizedData, d => `${d.cluster}-${d.feature}`)
+            .join(enter => enter.append('rect')
+                .attr('fill', d => colorScale(d.normalized))
+                .attr('stroke', d => d.cluster === 4 ? '#e74c3c' : '#fff')
+                .attr('stroke-width', d => d.cluster === 4 ? 2 : 1.5)
+                .on('mouseover', function(event, d) {
+                    d3.select(this).attr('stroke', '#000').attr('stroke-width', 3);
+                    tooltip.html(`
+                        <strong>${getClusterLabel(d.cluster)}</strong><br>
+                        ${getLabel(d.feature)}: <strong>${d.value.toFixed(3)}</strong><br>
+                        Posizione relativa: ${(d.normalized * 100).toFixed(0)}°%
+                    `)
+                    .style('opacity', 1)
+                    .style('left', (event.pageX + 10) + 'px')
+                    .style('top', (event.pageY - 20) + 'px');
+                })
+                .on('mouseout', function(event, d) {
+                    d3.select(this)
+                        .attr('stroke', d.cluster === 4 ? '#e74c3c' : '#fff')
+                        .attr('stroke-width', d.cluster === 4 ? 2 : 1.5);
+                    tooltip.style('opacity', 0);
+                }))
             .attr('x', d => x(d.feature))
             .attr('y', d => y(getClusterLabel(d.cluster)))
             .attr('width', x.bandwidth())
             .attr('height', y.bandwidth())
-            .attr('fill', d => colorScale(d.normalized))
-            .attr('stroke', d => d.cluster === 4 ? '#e74c3c' : '#fff')
-            .attr('stroke-width', d => d.cluster === 4 ? 2 : 1.5)
-            .on('mouseover', function(event, d) {
-                d3.select(this).attr('stroke', '#000').attr('stroke-width', 3);
-                tooltip.html(`
-                    <strong>${getClusterLabel(d.cluster)}</strong><br>
-                    ${getLabel(d.feature)}: <strong>${d.value.toFixed(3)}</strong><br>
-                    Posizione relativa: ${(d.normalized * 100).toFixed(0)}°%
-                `)
-                .style('opacity', 1)
-                .style('left', (event.pageX + 10) + 'px')
-                .style('top', (event.pageY - 20) + 'px');
-            })
-            .on('mouseout', function(event, d) {
-                d3.select(this)
-                    .attr('stroke', d.cluster === 4 ? '#e74c3c' : '#fff')
-                    .attr('stroke-width', d.cluster === 4 ? 2 : 1.5);
-                tooltip.style('opacity', 0);
-            });
-        
-        // Label X (feature)
-        svg.selectAll('.label-x')
-            .data(features)
-            .join('text')
-            .attr('class', 'label-x')
-            .attr('x', d => x(d) + x.bandwidth() / 2)
-            .attr('y', height + 15)
-            .attr('text-anchor', 'end')
-            .attr('transform', d => `rotate(-45, ${x(d) + x.bandwidth() / 2}, ${height + 15})`)
-            .text(d => getLabel(d))
-            .style('font-size', '12px')
-            .style('font-weight', 'bold');
-        
-        // Label Y (cluster)
-        svg.selectAll('.label-y')
-            .data(clusterData)
-            .join('text')
-            .attr('class', 'label-y')
-            .attr('x', -10)
-            .attr('y', d => y(getClusterLabel(d.cluster)) + y.bandwidth() / 2)
-            .attr('text-anchor', 'end')
-            .attr('dominant-baseline', 'middle')
-            .text(d => getClusterLabel(d.cluster))
-            .style('font-size', '11px')
-            .style('font-weight', d => d.cluster === 4 ? '700' : '500')
-            .style('fill', d => d.cluster === 4 ? '#e74c3c' : '#333');
-        
-        // Titolo
-        svg.append('text')
-            .attr('x', width / 2)
-            .attr('y', -50)
-            .attr('text-anchor', 'middle')
-            .text('Profili Cluster per Feature (normalizzati)')
-            .style('font-size', '14px')
-            .style('font-weight', 'bold');
-        
-        // Legenda colore
-        const legendWidth = 200;
-        const legendHeight = 15;
-        const legend = svg.append('g')
-            .attr('transform', `translate(${width - legendWidth - 20}, -40)`);
-        
-        const legendScale = d3.scaleLinear()
-            .domain([0, legendWidth])
-            .range([0, 1]);
-        
-        legend.selectAll('rect')
-            .data(d3.range(legendWidth))
-            .join('rect')
-            .attr('x', d => d)
-            .attr('y', 0)
-            .attr('width', 1)
-            .attr('height', legendHeight)
-            .attr('fill', d => colorScale(legendScale(d)));
-        
-        legend.append('text')
-            .attr('x', 0)
-            .attr('y', -5)
-            .text('Basso')
-            .style('font-size', '10px');
-        
-        legend.append('text')
-            .attr('x', legendWidth)
-            .attr('y', -5)
-            .attr('text-anchor', 'end')
-            .text('Alto')
-            .style('font-size', '10px');
+            .transition()
+            .duration(CONFIG.transition.duration)
+            .attr('fill', d => colorScale(d.normalized));
     }
 }
@@ -15,51 +15,91 @@ class ParallelCoordinates {
             { key: 'rank',                label: 'Rank' }
         ];
     }
-    // crea il grafico a coordinate parallele
-    createParallelCoordinates(data, containerId) {
+    // crea (o aggiorna) il grafico a coordinate parallele
+    // la struttura la creo una volta; ai cambi di filtro le linee fanno join
+    // per user_id, quindi entrano/escono solo gli utenti cambiati
+    // users = tabella per-utente di DataLoader.getUserAggregates (se manca la calcolo)
+    createParallelCoordinates(data, containerId, users = null) {
         const container = d3.select(`#${containerId}`);
-        container.selectAll('*').remove();
 
         const width = container.node().getBoundingClientRect().width || 800;
         const height = 480;
         const w = width - this.margin.left - this.margin.right;
         const h = height - this.margin.top - this.margin.bottom;
 
-        const svg = container.append('svg')
-            .attr('width', width)
-            .attr('height', height);
-
-        const g = svg.append('g')
-            .attr('transform', `translate(${this.margin.left},${this.margin.top})`);
-
-        // aggrego per user_id (media su tutte le settimane), 1 riga = 1 utente
-        const byUser = d3.rollup(
-            data,
-            rows => ({
-                user_id:              rows[0].user_id,
-                cluster:              rows[0].cluster,
-                insider:              rows[0].insider,
-                final_anomaly_score:  d3.mean(rows, r => r.final_anomaly_score),
-                n_allact:             d3.mean(rows, r => r.n_allact),
-                n_afterhourallact:    d3.mean(rows, r => r.n_afterhourallact),
-                n_email:              d3.mean(rows, r => r.n_email),
-                n_file:               d3.mean(rows, r => r.n_file),
-                rank:                 d3.mean(rows, r => r.rank),
-            }),
-            d => d.user_id
-        );
-        const utenti = Array.from(byUser.values());
-
-        // campiono a max 200 utenti per leggibilità — con 300 linee è già denso
-        const datiVisualizzati = utenti.length > 200
-            ? utenti.sort(() => 0.5 - Math.random()).slice(0, 200)
-            : utenti;
-
         // colori per cluster — stessa palette del resto della dashboard
         const colorScale = d3.scaleOrdinal()
             .domain([0, 1, 2, 3, 4])
             .range(CONFIG.colors.clusters);
 
+        // 1 riga = 1 utente (media su tutte le settimane)
+        const utenti = users || DataLoader.aggregateUsers(data);
+
+        // oltre sogliaCanvasLinee utenti disegno tutte le linee su canvas, senza campionare
+        const usaCanvas = CanvasLayer.usaCanvas(utenti.length, CONFIG.render.sogliaCanvasLinee);
+
+        let svg = container.select('svg');
+        if (svg.empty() || usaCanvas !== (CanvasLayer.per(containerId) !== null)) {
+            container.selectAll('*').remove();
+            const parent = usaCanvas
+                ? CanvasLayer.crea(containerId, width, height, this.margin).wrapper
+                : container;
+            svg = parent.append('svg')
+                .attr('width', width)
+                .attr('height', height);
+
+            const g = svg.append('g')
+                .attr('class', 'area-grafico')
+                .attr('transform', `translate(${this.margin.left},${this.margin.top})`);
+
+            // linee di sfondo grigie (context) e colorate (focus), poi gli assi sopra
+            g.append('g').attr('class', 'sfondo');
+            g.append('g').attr('class', 'primo-piano');
+            g.append('g').attr('class', 'assi');
+
+            // nota informativa in basso
+            svg.append('text')
+                .attr('class', 'nota-campione')
+                .attr('x', this.margin.left)
+                .attr('y', height - 5)
+                .style('font-size', '10px')
+                .style('fill', '#888');
+
+            // legenda cluster
+            const legenda = svg.append('g')
+                .attr('class', 'legenda-cluster');
+
+            [0, 1, 2, 3, 4].forEach((cluster, i) => {
+                const riga = legenda.append('g')
+                    .attr('transform', `translate(0, ${i * 20})`);
+
+                riga.append('line')
+                    .attr('x1', 0).attr('x2', 22)
+                    .attr('y1', 8).attr('y2', 8)
+                    .attr('stroke', colorScale(cluster))
+                    .attr('stroke-width', 2.5);
+
+                riga.append('text')
+                    .attr('x', 27).attr('y', 12)
+                    .text(`C${cluster}`)
+                    .style('font-size', '11px')
+                    .style('font-weight', cluster === 4 ? '700' : '400')
+                    .style('fill', cluster === 4 ? '#e74c3c' : '#333');
+            });
+        }
+        // larghezza (cambia col resize del container): aggiorno solo le dimensioni,
+        // linee e assi li riposizionano i join qui sotto
+        if (+svg.attr('width') !== width) {
+            svg.attr('width', width);
+            if (usaCanvas) CanvasLayer.per(containerId).ridimensiona(width, height);
+        }
+        svg.select('.legenda-cluster')
+            .attr('transform', `translate(${width - this.margin.right - 80}, ${this.margin.top})`);
+        const g = svg.select('.area-grafico');
+
+        // sempre tutte le linee: sopra la soglia ci pensa il canvas
+        const datiVisualizzati = utenti;
+
         // scala x: posizione di ogni asse (una per dimensione)
         const x = d3.scalePoint()
             .domain(this.dimensioni.map(d => d.key))
@@ -80,104 +120,131 @@ class ParallelCoordinates {
             .defined(d => !isNaN(d[1]))
             .x(d => x(d[0]))
             .y(d => scaleY[d[0]](d[1]));
-
-        // linee di sfondo grigie (context) — mostrano il pattern generale
-        g.append('g')
-            .attr('class', 'sfondo')
-            .selectAll('path')
-            .data(datiVisualizzati)
-            .join('path')
-            .attr('d', d => lineGen(this.dimensioni.map(dim => [dim.key, d[dim.key]])))
-            .attr('fill', 'none')
-            .attr('stroke', '#ddd')
-            .attr('stroke-width', 1)
-            .attr('opacity', 0.3);
-
-        // linee colorate per cluster (focus)
-        // uso attr('stroke', ...) inline invece di classe CSS per evitare
-        // che il foglio di stile sovrascriva i colori del cluster
-        g.append('g')
-            .attr('class', 'primo-piano')
-            .selectAll('path')
-            .data(datiVisualizzati)
-            .join('path')
-            .attr('class', 'linea-parallela')
-            .attr('d', d => lineGen(this.dimensioni.map(dim => [dim.key, d[dim.key]])))
-            .attr('fill', 'none')
-            .attr('stroke', d => colorScale(d.cluster))
-            .attr('stroke-width', 1.5)
-            .attr('opacity', 0.6)
-            .on('mouseover', function(event, d) {
-                d3.select(this)
-                    .attr('stroke-width', 3)
-                    .attr('opacity', 1)
-                    .raise();  // porta in primo piano
-
-                d3.select('body').append('div')
-                    .attr('class', 'tooltip')
-                    .style('opacity', 0)
-                    .html(`
+        const percorso = d => lineGen(this.dimensioni.map(dim => [dim.key, d[dim.key]]));
+
+        const t = svg.transition().duration(CONFIG.transition.duration);
+        const tooltip = getTooltip(containerId);
+
+        if (usaCanvas) {
+            // su canvas niente linee di sfondo: il contesto sono già tutte le linee
+            // l'opacità scende con il numero di linee, altrimenti diventa una macchia
+            const opacita = Math.max(0.05, Math.min(0.6, 60 / Math.sqrt(utenti.length)));
+            const punti = d => this.dimensioni.map(dim => {
+                const v = d[dim.key];
+                return isNaN(v) ? null : [x(dim.key), scaleY[dim.key](v)];
+            });
+            CanvasLayer.per(containerId)
+                .linee(utenti, {
+                    punti,
+                    stroke: d => colorScale(d.cluster),
+                    lineWidth: 1,
+                    opacity: opacita
+                })
+                .evidenziaCon((ctx, d) => {
+                    ctx.beginPath();
+                    let dentro = false;
+                    for (const p of punti(d)) {
+                        if (p && dentro) ctx.lineTo(p[0], p[1]);
+                        else if (p) ctx.moveTo(p[0], p[1]);
+                        dentro = p !== null;
+                    }
+                    ctx.strokeStyle = colorScale(d.cluster);
+                    ctx.lineWidth = 3;
+                    ctx.stroke();
+                })
+                .onHover((event, d) => {
+                    if (!d) {
+                        tooltip.style('opacity', 0);
+                        return;
+                    }
+                    tooltip.html(`
                         <strong>User ${d.user_id}</strong><br>
                         ${getClusterLabel(d.cluster)}<br>
                         Insider: ${d.insider === 1 ? 'Sì' : 'No'}<br>
                         Score: ${d.final_anomaly_score.toFixed(3)}<br>
                         Rank: ${d.rank}
                     `)
+                    .style('opacity', 0.95)
                     .style('left', (event.pageX + 10) + 'px')
-                    .style('top', (event.pageY - 28) + 'px')
-                    .transition().duration(200).style('opacity', 0.95);
-            })
-            .on('mouseout', function() {
-                d3.select(this).attr('stroke-width', 1.5).attr('opacity', 0.6);
-                d3.selectAll('.tooltip').remove();
-            });
+                    .style('top', (event.pageY - 28) + 'px');
+                });
+        } else {
+            // linee di sfondo grigie (context) — mostrano il pattern generale
+            g.select('.sfondo')
+                .selectAll('path')
+                .data(datiVisualizzati, d => d.user_id)
+                .join(enter => enter.append('path')
+                    .attr('d', percorso)
+                    .attr('fill', 'none')
+                    .attr('stroke', '#ddd')
+                    .attr('stroke-width', 1)
+                    .attr('opacity', 0.3))
+                .transition(t)
+                .attr('d', percorso);
+
+            // linee colorate per cluster (focus)
+            // uso attr('stroke', ...) inline invece di classe CSS per evitare
+            // che il foglio di stile sovrascriva i colori del cluster
+            g.select('.primo-piano')
+                .selectAll('path')
+                .data(datiVisualizzati, d => d.user_id)
+                .join(enter => enter.append('path')
+                    .attr('class', 'linea-parallela')
+                    .attr('d', percorso)
+                    .attr('fill', 'none')
+                    .attr('stroke', d => colorScale(d.cluster))
+                    .attr('stroke-width', 1.5)
+                    .attr('opacity', 0.6)
+                    .on('mouseover', function(event, d) {
+                        d3.select(this)
+                            .attr('stroke-width', 3)
+                            .attr('opacity', 1)
+                            .raise();  // porta in primo piano
+
+                        tooltip.html(`
+                                <strong>User ${d.user_id}</strong><br>
+                                ${getClusterLabel(d.cluster)}<br>
+                                Insider: ${d.insider === 1 ? 'Sì' : 'No'}<br>
+                                Score: ${d.final_anomaly_score.toFixed(3)}<br>
+                                Rank: ${d.rank}
+                            `)
+                            .style('left', (event.pageX + 10) + 'px')
+                            .style('top', (event.pageY - 28) + 'px')
+                            .transition().duration(200).style('opacity', 0.95);
+                    })
+                    .on('mouseout', function() {
+                        d3.select(this).attr('stroke-width', 1.5).attr('opacity', 0.6);
+                        tooltip.interrupt().style('opacity', 0);
+                    }))
+                .transition(t)
+                .attr('d', percorso);
+        }
 
         // assi verticali per ogni dimensione
-        const assi = g.selectAll('.asse-dimensione')
-            .data(this.dimensioni)
-            .join('g')
-            .attr('class', 'asse-dimensione')
-            .attr('transform', d => `translate(${x(d.key)},0)`);
-
-        assi.append('g')
-            .each(function(d) {
-                d3.select(this).call(d3.axisLeft(scaleY[d.key]).ticks(6));
+        g.select('.assi').selectAll('.asse-dimensione')
+            .data(this.dimensioni, d => d.key)
+            .join(enter => {
+                const asse = enter.append('g')
+                    .attr('class', 'asse-dimensione')
+                    .attr('transform', d => `translate(${x(d.key)},0)`);
+                asse.append('g')
+                    .attr('class', 'asse-scala')
+                    .append('text')
+                    .attr('fill', '#000')
+                    .attr('text-anchor', 'middle')
+                    .attr('y', -12)
+                    .attr('font-weight', 'bold')
+                    .text(d => d.label);
+                return asse;
             })
-            .append('text')
-            .attr('fill', '#000')
-            .attr('text-anchor', 'middle')
-            .attr('y', -12)
-            .attr('font-weight', 'bold')
-            .text(d => d.label);
+            .call(assi => assi.transition(t).attr('transform', d => `translate(${x(d.key)},0)`))
+            .select('.asse-scala')
+            .each(function(d) {
+                d3.select(this).transition(t).call(d3.axisLeft(scaleY[d.key]).ticks(6));
+            });
 
         // nota informativa in basso
-        svg.append('text')
-            .attr('x', this.margin.left)
-            .attr('y', height - 5)
-            .style('font-size', '10px')
-            .style('fill', '#888')
-            .text(`${datiVisualizzati.length} utenti visualizzati${data.length > 200 ? ' (campionati)' : ''} su 6 dimensioni`);
-
-        // legenda cluster
-        const legenda = svg.append('g')
-            .attr('transform', `translate(${width - this.margin.right - 80}, ${this.margin.top})`);
-
-        [0, 1, 2, 3, 4].forEach((cluster, i) => {
-            const riga = legenda.append('g')
-                .attr('transform', `translate(0, ${i * 20})`);
-
-            riga.append('line')
-                .attr('x1', 0).attr('x2', 22)
-                .attr('y1', 8).attr('y2', 8)
-                .attr('stroke', colorScale(cluster))
-                .attr('stroke-width', 2.5);
-
-            riga.append('text')
-                .attr('x', 27).attr('y', 12)
-                .text(`C${cluster}`)
-                .style('font-size', '11px')
-                .style('font-weight', cluster === 4 ? '700' : '400')
-                .style('fill', cluster === 4 ? '#e74c3c' : '#333');
-        });
+        svg.select('.nota-campione')
+            .text(`${datiVisualizzati.length} utenti visualizzati su 6 dimensioni`);
     }
 }
@@ -0,0 +1,113 @@
+// perf.js - tempi delle fasi della dashboard (caricamento, parsing, filtro, aggregazioni, disegno)
+// Ogni misura è una coppia performance.mark/measure (visibile nel pannello Performance
+// del browser) e finisce anche nelle statistiche: conteggio, mediana, p95 e massimo
+// sugli ultimi CONFIG.debug.campioni valori di ogni fase.
+// Le statistiche si leggono con debugInfo() oppure nell'overlay (?perf nell'URL).
+
+class Perf {
+
+    // esegue fn e ne misura la durata come fase `nome`
+    // se fn ritorna una promessa la misura finisce quando la promessa si risolve
+    static misura(nome, fn) {
+        const segno = `${nome}#${++Perf.contatore}`;
+        const t0 = performance.now();
+        performance.mark(segno);
+        const chiudi = () => {
+            performance.measure(nome, segno);
+            // tolgo le voci dal buffer del browser (altrimenti crescono a ogni filtro);
+            // nel pannello Performance restano comunque se si stava registrando
+            performance.clearMarks(segno);
+            performance.clearMeasures(nome);
+            Perf.registra(nome, performance.now() - t0);
+        };
+        let risultato;
+        try {
+            risultato = fn();
+        } catch (error) {
+            chiudi();
+            throw error;
+        }
+        if (risultato && typeof risultato.then === 'function') {
+            return risultato.finally(chiudi);
+        }
+        chiudi();
+        return risultato;
+    }
+
+    // aggiunge una durata già misurata (ad es. i tempi che manda il worker)
+    static registra(nome, durata) {
+        let fase = Perf.fasi.get(nome);
+        if (!fase) {
+            fase = { conteggio: 0, valori: [], prossimo: 0 };
+            Perf.fasi.set(nome, fase);
+        }
+        // buffer circolare: tengo solo gli ultimi N valori
+        const n = CONFIG.debug.campioni;
+        if (fase.valori.length < n) fase.valori.push(durata);
+        else fase.valori[fase.prossimo] = durata;
+        fase.prossimo = (fase.prossimo + 1) % n;
+        fase.conteggio++;
+        fase.ultimo = durata;
+    }
+
+    // { fase: { conteggio, ultimo, p50, p95, max } } in millisecondi
+    static statistiche() {
+        const risultato = {};
+        Perf.fasi.forEach((fase, nome) => {
+            const ordinati = Float64Array.from(fase.valori).sort();
+            const percentile = p => ordinati[Math.min(ordinati.length - 1, Math.ceil(p * ordinati.length) - 1)];
+            risultato[nome] = {
+                conteggio: fase.conteggio,
+                ultimo: +fase.ultimo.toFixed(2),
+                p50: +percentile(0.5).toFixed(2),
+                p95: +percentile(0.95).toFixed(2),
+                max: +ordinati[ordinati.length - 1].toFixed(2)
+            };
+        });
+        return risultato;
+    }
+
+    // riquadro fisso in basso a destra con le statistiche, aggiornato ogni secondo
+    static overlay(attivo = true) {
+        clearInterval(Perf.timerOverlay);
+        d3.select('#overlay-perf').remove();
+        if (!attivo) return;
+
+        const box = d3.select('body')
+            .append('div')
+            .attr('id', 'overlay-perf')
+            .style('position', 'fixed')
+            .style('right', '10px')
+            .style('bottom', '10px')
+            .style('z-index', 10000)
+            .style('background', 'rgba(44, 62, 80, 0.9)')
+            .style('color', '#ecf0f1')
+            .style('font', '11px monospace')
+            .style('padding', '8px 10px')
+            .style('border-radius', '4px')
+            .style('pointer-events', 'none');
+
+        const aggiorna = () => {
+            const righe = Object.entries(Perf.statistiche()).map(([nome, s]) =>
+                `<tr><td>${nome}</td><td>${s.conteggio}</td><td>${s.p50}</td><td>${s.p95}</td><td>${s.max}</td></tr>`);
+            box.html(`
+                <table style="border-spacing: 8px 0; text-align: right;">
+                    <tr><th style="text-align:left">fase (ms)</th><th>n</th><th>p50</th><th>p95</th><th>max</th></tr>
+                    ${righe.join('')}
+                </table>
+            `);
+            box.selectAll('td:first-child').style('text-align', 'left');
+        };
+        aggiorna();
+        Perf.timerOverlay = setInterval(aggiorna, 1000);
+    }
+}
+
+Perf.contatore = 0;
+Perf.fasi = new Map();  // nome fase → { conteggio, valori, prossimo, ultimo }
+Perf.timerOverlay = null;
+
+// console.log solo se CONFIG.debug.log è attivo (alcuni log scorrono tutte le righe)
+function debugLog(...args) {
+    if (CONFIG.debug.log) console.log(...args);
+}
@@ -0,0 +1,141 @@
+// render-manager.js - disegna subito solo i grafici che si vedono
+// Con un IntersectionObserver tengo traccia di quali contenitori sono nel viewport
+// (più un margine, così il grafico è pronto appena ci si arriva scorrendo).
+// I grafici fuori schermo non vengono ridisegnati a ogni filtro: mi segno
+// l'ultima funzione di disegno e la eseguo quando il contenitore entra in vista.
+// Per i grafici che seguono la larghezza del contenitore c'è anche un ResizeObserver:
+// al resize rieseguo l'ultimo disegno, che ha già gli aggregati calcolati
+// (niente filtro, niente richieste al worker o al server) e aggiorna solo il layout.
+
+// margine attorno al viewport entro cui un grafico conta già come visibile
+const MARGINE_VISIBILITA = '200px';
+
+class RenderManager {
+    constructor() {
+        this.visibili = new Map();  // id contenitore → true/false (assente = non ancora noto)
+        this.sporchi = new Map();   // id contenitore → ultimo disegno rimandato
+        this.prime = new Map();     // id contenitore → promessa della prima notifica
+        this.attese = new Map();    // id contenitore → resolve di quella promessa
+        this.ultimi = new Map();    // id contenitore → ultimo disegno (rieseguito al resize)
+        this.larghezze = new Map(); // id contenitore → ultima larghezza vista
+        this.ridimensionati = new Set();
+        this.frameResize = null;
+        this.osservatore = typeof IntersectionObserver === 'undefined'
+            ? null
+            : new IntersectionObserver(entries => this.cambiati(entries),
+                                       { rootMargin: MARGINE_VISIBILITA });
+        this.osservatoreResize = typeof ResizeObserver === 'undefined'
+            ? null
+            : new ResizeObserver(entries => this.cambiataLarghezza(entries));
+    }
+
+    // true se il grafico va disegnato subito (senza observer disegno sempre tutto)
+    visibile(id) {
+        return !this.osservatore || this.visibili.get(id) !== false;
+    }
+
+    // inizia a osservare il contenitore; la promessa si risolve alla prima notifica
+    // dell'observer (così al primo disegno so già cosa è sotto la piega)
+    osserva(id) {
+        if (!this.osservatore) return Promise.resolve();
+        if (!this.prime.has(id)) {
+            const el = document.getElementById(id);
+            if (!el) return Promise.resolve();
+            this.prime.set(id, new Promise(resolve => this.attese.set(id, resolve)));
+            this.osservatore.observe(el);
+        }
+        return this.prime.get(id);
+    }
+
+    cambiati(entries) {
+        entries.forEach(entry => {
+            const id = entry.target.id;
+            this.visibili.set(id, entry.isIntersecting);
+            const attesa = this.attese.get(id);
+            if (attesa) {
+                this.attese.delete(id);
+                attesa();
+            }
+            const disegna = entry.isIntersecting && this.sporchi.get(id);
+            if (disegna) {
+                this.sporchi.delete(id);
+                debugLog('Grafico entrato in vista, lo aggiorno:', id);
+                this.disegnaDopo(id, disegna);
+            }
+        });
+    }
+
+    // disegno fuori dal giro dei filtri (entrata in vista, resize): gli errori li loggo e basta
+    disegnaDopo(id, disegna) {
+        Promise.resolve()
+            .then(() => Perf.misura(`render:${id}`, disegna))
+            .catch(error => console.error(`Errore nel disegno di ${id}:`, error));
+    }
+
+    // segue la larghezza del contenitore (una volta sola per id)
+    osservaLarghezza(id) {
+        if (!this.osservatoreResize || this.larghezze.has(id)) return;
+        const el = document.getElementById(id);
+        if (!el) return;
+        this.larghezze.set(id, el.getBoundingClientRect().width);
+        this.osservatoreResize.observe(el);
+    }
+
+    // conta solo la larghezza: l'altezza cambia anche quando il grafico si ridisegna
+    cambiataLarghezza(entries) {
+        entries.forEach(entry => {
+            const id = entry.target.id;
+            const larghezza = entry.target.getBoundingClientRect().width;
+            if (larghezza === this.larghezze.get(id)) return;
+            this.larghezze.set(id, larghezza);
+            this.ridimensionati.add(id);
+        });
+        // durante il trascinamento della finestra arrivano tante notifiche: un ridisegno per frame
+        if (this.ridimensionati.size > 0 && this.frameResize === null) {
+            this.frameResize = requestAnimationFrame(() => this.rifaiLayout());
+        }
+    }
+
+    rifaiLayout() {
+        this.frameResize = null;
+        const ids = [...this.ridimensionati];
+        this.ridimensionati.clear();
+        ids.forEach(id => {
+            const disegna = this.ultimi.get(id);
+            if (!disegna) return;
+            if (!this.visibile(id)) {
+                this.sporchi.set(id, disegna);
+                return;
+            }
+            debugLog('Container ridimensionato, aggiorno il layout:', id);
+            this.disegnaDopo(id, disegna);
+        });
+    }
+
+    // passi = [{ id, disegna, adattivo }] in ordine di priorità
+    // adattivo = la larghezza del grafico segue il contenitore (ridisegno al resize)
+    // i visibili li disegno uno per frame, gli altri restano in attesa;
+    // se annullato() diventa true mi fermo (ci pensa il giro successivo)
+    async aggiorna(passi, annullato = () => false) {
+        await Promise.all(passi.map(({ id }) => this.osserva(id)));
+        passi.filter(p => p.adattivo).forEach(({ id, disegna }) => {
+            this.ultimi.set(id, disegna);
+            this.osservaLarghezza(id);
+        });
+        let primo = true;
+        for (const { id, disegna } of passi) {
+            if (!this.visibile(id)) {
+                this.sporchi.set(id, disegna);
+                continue;
+            }
+            this.sporchi.delete(id);
+            // il primo grafico visibile lo faccio subito: dà il riscontro mentre si trascina
+            if (!primo) {
+                await prossimoFrame();
+                if (annullato()) return;
+            }
+            primo = false;
+            await Perf.misura(`render:${id}`, disegna);
+        }
+    }
+}
@@ -1,6 +1,23 @@
 // temporal.js - line chart per evoluzione temporale dello score per cluster
-// mostra come cambia l'anomaly score medio settimana per settimana
+// mostra come cambia l'anomaly score medio nel tempo (giorni, settimane o mesi)
 // Riferimento: 080-simple-visualization-strategies (time series)
+// Il dominio dell'asse x viene dai dati; rotella/trascinamento fanno zoom e pan,
+// doppio click torna alla vista intera. Il livello di dettaglio (giorno/settimana/mese)
+// lo scelgo in base al tratto visibile, così i punti disegnati dipendono dai pixel
+// disponibili e non da quanto è lungo il periodo caricato.
+
+// distanza minima in pixel tra due punti di una linea: se il livello più fine
+// ne metterebbe di più passo al livello successivo
+const PX_PER_PUNTO = 6;
+
+// sotto questa distanza non disegno i cerchi sui punti (solo le linee)
+const PX_PER_CERCHIO = 14;
+
+// etichetta dell'asse x per ogni livello (unit 'day' = dati giornalieri con timestamp)
+const ETICHETTE_LIVELLO = {
+    day: { giorno: 'Giorno', settimana: 'Settimana', mese: 'Mese' },
+    week: { settimana: 'Settimana', mese: 'Blocchi di 4 settimane' }
+};
 
 class TemporalCharts {
     constructor() {
@@ -8,10 +25,13 @@ class TemporalCharts {
         this.margin = { top: 40, right: 120, bottom: 70, left: 60 };
     }
 
-    // crea il line chart con una linea per ogni cluster
-    createLineChart(data, containerId) {
+    // crea (o aggiorna) il line chart con una linea per ogni cluster
+    // la struttura la creo solo al primo giro; poi aggiorno assi e linee
+    // con join per cluster e per periodo
+    // serie = somme/conteggi per (cluster, periodo) a più livelli, da DataLoader.getTemporalSeries:
+    // le righe non le scorro mai, anche al primo caricamento la serie arriva dal motore
+    createLineChart(data, containerId, serie) {
         const container = d3.select(`#${containerId}`);
-        container.selectAll('*').remove();
 
         // prendo la larghezza del contenitore per essere responsivo
         const width = container.node().getBoundingClientRect().width || 800;
@@ -19,43 +39,109 @@ class TemporalCharts {
         const w = width - this.margin.left - this.margin.right;
         const h = height - this.margin.top - this.margin.bottom;
 
-        const svg = container.append('svg')
-            .attr('width', width)
-            .attr('height', height);
-
-        const g = svg.append('g')
-            .attr('transform', `translate(${this.margin.left},${this.margin.top})`);
-
-        // aggrego i dati per (cluster, week) → media dello score
-        // d3.rollup restituisce una Map annidata: cluster → week → mean(score)
-        const aggregato = d3.rollup(
-            data,
-            v => d3.mean(v, d => d.final_anomaly_score),
-            d => +d.cluster,
-            d => +d.week
-        );
-
-        console.log('Temporal chart - cluster aggregati:', aggregato.size);
-
-        // converto la Map in array di oggetti {cluster, punti:[{week,score}]}
-        const linee = [];
-        aggregato.forEach((settimane, cluster) => {
-            const punti = [];
-            settimane.forEach((score, week) => {
-                punti.push({ week, score });
-            });
-            punti.sort((a, b) => a.week - b.week);
-            linee.push({ cluster, punti });
-        });
+        let svg = container.select('svg');
+        const primaVolta = svg.empty();
+        if (primaVolta) {
+            container.selectAll('*').remove();
+            svg = container.append('svg')
+                .attr('height', height);
+
+            // le linee fuori dal tratto visibile (zoom) vengono tagliate
+            svg.append('defs')
+                .append('clipPath')
+                .attr('id', `clip-${containerId}`)
+                .append('rect')
+                .attr('class', 'clip-area')
+                .attr('y', -10)
+                .attr('height', h + 20);
+
+            const g = svg.append('g')
+                .attr('class', 'area-grafico')
+                .attr('transform', `translate(${this.margin.left},${this.margin.top})`);
+
+            // sfondo trasparente: riceve rotella e trascinamento per lo zoom
+            g.append('rect')
+                .attr('class', 'area-zoom')
+                .attr('height', h)
+                .attr('fill', 'none')
+                .style('pointer-events', 'all')
+                .style('cursor', 'grab');
+
+            g.append('g')
+                .attr('class', 'axis x-axis')
+                .attr('transform', `translate(0,${h})`);
+
+            g.append('g')
+                .attr('class', 'axis y-axis');
+
+            // etichetta asse x (cambia col livello di dettaglio)
+            svg.append('text')
+                .attr('class', 'axis-label etichetta-x')
+                .attr('y', height - 5)
+                .attr('text-anchor', 'middle')
+                .text('Settimana');
 
-        // scala x: settimane 1-8
-        const x = d3.scaleLinear()
-            .domain([1, 8])
+            // etichetta asse y
+            g.append('text')
+                .attr('class', 'axis-label')
+                .attr('transform', 'rotate(-90)')
+                .attr('x', -h / 2)
+                .attr('y', -45)
+                .attr('text-anchor', 'middle')
+                .text('Score Anomalia Medio');
+
+            g.append('g').attr('class', 'linee').attr('clip-path', `url(#clip-${containerId})`);
+            g.append('g').attr('class', 'punti').attr('clip-path', `url(#clip-${containerId})`);
+
+            svg.append('g')
+                .attr('class', 'legenda');
+
+            // zoom solo sull'asse x: ogni evento ridisegna con i dati dell'ultimo aggiornamento
+            const zoom = d3.zoom()
+                .on('zoom', () => this.ridisegna(svg, null));
+            g.call(zoom).on('dblclick.zoom', null);
+            g.on('dblclick', () => g.transition().duration(500).call(zoom.transform, d3.zoomIdentity));
+            svg.property('zoomTemporale', zoom);
+        }
+
+        // dimensioni che dipendono dalla larghezza del container (cambiano al resize:
+        // aggiorno solo queste, linee e punti li riposiziona ridisegna con la nuova scala)
+        const larghezzaPrima = +svg.attr('width');
+        svg.attr('width', width);
+        svg.select('.clip-area').attr('width', w);
+        svg.select('.area-zoom').attr('width', w);
+        svg.select('.etichetta-x').attr('x', this.margin.left + w / 2);
+        svg.select('.legenda').attr('transform', `translate(${width - this.margin.right + 5}, ${this.margin.top})`);
+
+        // livelli di dettaglio, dal più fine al più grosso
+        // (se i dati sono gli stessi del disegno precedente, ad es. al resize, li riuso)
+        const precedente = svg.property('statoTemporale');
+        const livelli = precedente && precedente.sorgente === serie
+            ? precedente.livelli
+            : this.livelliDaSerie(serie);
+        const unit = serie.unit;
+        debugLog('Temporal chart - livelli:', livelli.map(l => `${l.name} (${l.mid.length})`).join(', '));
+
+        // scala x di base (senza zoom): dominio dai periodi del livello più fine
+        const fine = livelli[0].mid;
+        let dominio = fine.length > 0 ? [fine[0], fine[fine.length - 1]] : [1, 8];
+        if (dominio[0] === dominio[1]) {
+            dominio = [dominio[0] - 1, dominio[1] + 1];
+        }
+        const x0 = d3.scaleLinear()
+            .domain(dominio)
             .range([0, w]);
 
-        // scala y: da 0 al massimo score
+        // al massimo zoom restano visibili ~4 periodi del livello più fine
+        const zoom = svg.property('zoomTemporale');
+        zoom.scaleExtent([1, Math.max(1, fine.length / 4)])
+            .extent([[0, 0], [w, h]])
+            .translateExtent([[0, 0], [w, h]]);
+
+        // scala y: da 0 al massimo score (su tutti i livelli, non cambia con lo zoom)
+        const massimo = d3.max(livelli, l => d3.max(l.linee, d => d3.max(d.punti, p => p.score)));
         const y = d3.scaleLinear()
-            .domain([0, d3.max(linee, d => d3.max(d.punti, p => p.score))])
+            .domain([0, massimo || 1])
             .nice()
             .range([h, 0]);
 
@@ -64,132 +150,234 @@ class TemporalCharts {
             .domain([0, 1, 2, 3, 4])
             .range(CONFIG.colors.clusters);
 
-        // asse x con etichette settimane
-        g.append('g')
-            .attr('class', 'axis x-axis')
-            .attr('transform', `translate(0,${h})`)
-            .call(d3.axisBottom(x).ticks(8).tickFormat(d => `Sett. ${d}`))
-            .selectAll('text')
+        svg.property('statoTemporale', {
+            sorgente: serie, livelli, unit, w, h, x0, y, colorScale, primaVolta,
+            tooltip: getTooltip(containerId)
+        });
+
+        // al resize tengo lo stesso tratto visibile: lo spostamento dello zoom è in pixel
+        const area = svg.select('.area-grafico');
+        const zoomAttuale = d3.zoomTransform(area.node());
+        if (!primaVolta && larghezzaPrima !== width && zoomAttuale.k > 1) {
+            const scala = w / (larghezzaPrima - this.margin.left - this.margin.right);
+            area.call(zoom.transform, d3.zoomIdentity.translate(zoomAttuale.x * scala, 0).scale(zoomAttuale.k));
+        }
+
+        const t = svg.transition().duration(CONFIG.transition.duration);
+
+        // asse y
+        svg.select('.y-axis').transition(t).call(d3.axisLeft(y));
+
+        this.ridisegna(svg, primaVolta ? null : t);
+
+        // legenda con etichette descrittive (una riga per cluster presente)
+        const clusters = [...new Set(livelli[0].linee.map(d => d.cluster))].sort((a, b) => a - b);
+        svg.select('.legenda').selectAll('.riga-legenda')
+            .data(clusters, d => d)
+            .join(enter => enter.append('g')
+                .attr('class', 'riga-legenda')
+                .each(function(cluster) {
+                    const riga = d3.select(this);
+
+                    riga.append('line')
+                        .attr('x1', 0).attr('x2', 22)
+                        .attr('y1', 10).attr('y2', 10)
+                        .attr('stroke', colorScale(cluster))
+                        .attr('stroke-width', 2.5);
+
+                    riga.append('circle')
+                        .attr('cx', 11).attr('cy', 10).attr('r', 4)
+                        .attr('fill', colorScale(cluster))
+                        .attr('stroke', '#fff').attr('stroke-width', 1.5);
+
+                    riga.append('text')
+                        .attr('x', 27).attr('y', 14)
+                        .style('font-size', '11px')
+                        .style('font-weight', cluster === 4 ? '700' : '400')
+                        .style('fill', cluster === 4 ? '#e74c3c' : '#333')
+                        .text(`C${cluster}`);
+                }))
+            .attr('transform', (d, i) => `translate(0, ${i * 25})`);
+    }
+
+    // disegna assi, linee e punti per il tratto visibile (chiamata anche a ogni evento di zoom)
+    // t = transizione da usare per l'aggiornamento, null = subito
+    ridisegna(svg, t) {
+        const stato = svg.property('statoTemporale');
+        if (!stato) return;
+        const { livelli, unit, w, y, colorScale, tooltip } = stato;
+        const g = svg.select('.area-grafico');
+        const x = d3.zoomTransform(g.node()).rescaleX(stato.x0);
+        const [d0, d1] = x.domain();
+
+        // livello: il più fine che nel tratto visibile ha al massimo un punto ogni PX_PER_PUNTO pixel
+        const visibili = l => d3.bisectRight(l.mid, d1) - d3.bisectLeft(l.mid, d0);
+        const livello = livelli.find(l => visibili(l) <= w / PX_PER_PUNTO) || livelli[livelli.length - 1];
+        const nVisibili = visibili(livello);
+
+        // solo i punti visibili, più uno per lato così la linea arriva fino al bordo
+        const bisettore = d3.bisector(p => p.t);
+        const linee = livello.linee.map(linea => ({
+            cluster: linea.cluster,
+            punti: linea.punti.slice(
+                Math.max(0, bisettore.left(linea.punti, d0) - 1),
+                bisettore.right(linea.punti, d1) + 1)
+        }));
+
+        // asse x: date per i dati giornalieri, "Sett. n" per le settimane numerate
+        const asseX = svg.select('.x-axis');
+        if (unit === 'day') {
+            const xData = d3.scaleUtc()
+                .domain([d0, d1].map(d => new Date(d * 864e5)))
+                .range([0, w]);
+            asseX.call(d3.axisBottom(xData).ticks(Math.max(2, Math.floor(w / 90))));
+        } else {
+            asseX.call(d3.axisBottom(x)
+                .ticks(Math.max(2, Math.min(Math.floor(w / 60), Math.ceil(d1 - d0))))
+                .tickFormat(d => Number.isInteger(d) ? `Sett. ${d}` : ''));
+        }
+        asseX.selectAll('text')
             .style('text-anchor', 'end')
             .attr('dx', '-.8em')
             .attr('dy', '.15em')
             .attr('transform', 'rotate(-35)');
-
-        // asse y
-        g.append('g')
-            .attr('class', 'axis y-axis')
-            .call(d3.axisLeft(y));
-
-        // etichetta asse x
-        svg.append('text')
-            .attr('class', 'axis-label')
-            .attr('x', this.margin.left + w / 2)
-            .attr('y', height - 5)
-            .attr('text-anchor', 'middle')
-            .text('Settimana');
-
-        // etichetta asse y
-        g.append('text')
-            .attr('class', 'axis-label')
-            .attr('transform', 'rotate(-90)')
-            .attr('x', -h / 2)
-            .attr('y', -45)
-            .attr('text-anchor', 'middle')
-            .text('Score Anomalia Medio');
+        svg.select('.etichetta-x').text(livello.etichetta);
 
         // generatore di linea con curva smooth (no artefatti agli estremi)
         const lineGen = d3.line()
-            .x(d => x(d.week))
+            .x(d => x(d.t))
             .y(d => y(d.score))
             .curve(d3.curveMonotoneX);
 
-        // disegno le linee
-        const paths = g.selectAll('.linea-cluster')
-            .data(linee)
-            .join('path')
-            .attr('class', 'linea-cluster')
-            .attr('fill', 'none')
-            .attr('stroke', d => colorScale(d.cluster))
-            .attr('stroke-width', 2.5)
-            .attr('d', d => lineGen(d.punti));
-
-        // animazione: la linea si "disegna" da sinistra a destra
-        paths.each(function() {
-            const len = this.getTotalLength();
-            d3.select(this)
-                .attr('stroke-dasharray', `${len} ${len}`)
-                .attr('stroke-dashoffset', len)
-                .transition()
-                .duration(1500)
-                .ease(d3.easeLinear)
-                .attr('stroke-dashoffset', 0);
-        });
+        // disegno le linee (chiave = cluster)
+        const paths = g.select('.linee').selectAll('.linea-cluster')
+            .data(linee, d => d.cluster)
+            .join(
+                enter => enter.append('path')
+                    .attr('class', 'linea-cluster')
+                    .attr('fill', 'none')
+                    .attr('stroke', d => colorScale(d.cluster))
+                    .attr('stroke-width', 2.5),
+                update => update,
+                exit => exit.remove()
+            );
 
-        // punti interattivi su ogni settimana
-        linee.forEach(linea => {
-            const punti = g.selectAll(`.punto-cluster-${linea.cluster}`)
-                .data(linea.punti)
-                .join('circle')
-                .attr('class', `punto-cluster-${linea.cluster}`)
-                .attr('cx', d => x(d.week))
-                .attr('cy', d => y(d.score))
-                .attr('r', 0)
-                .attr('fill', colorScale(linea.cluster))
-                .attr('stroke', '#fff')
-                .attr('stroke-width', 1.5);
-
-            // i punti appaiono dopo che la linea è finita di disegnarsi
-            punti.transition()
-                .delay(1500)
-                .duration(400)
-                .attr('r', 4);
-
-            // tooltip al hover
-            punti.on('mouseover', function(event, d) {
-                d3.select(this).transition().duration(150).attr('r', 7);
-                d3.select('body').append('div')
-                    .attr('class', 'tooltip')
-                    .style('opacity', 0)
-                    .html(`
-                        <strong>${getClusterLabel(linea.cluster)}</strong><br>
-                        Settimana: ${d.week}<br>
-                        Score medio: ${d.score.toFixed(3)}
-                    `)
-                    .style('left', (event.pageX + 10) + 'px')
-                    .style('top', (event.pageY - 28) + 'px')
-                    .transition().duration(200).style('opacity', 0.95);
-            })
-            .on('mouseout', function() {
-                d3.select(this).transition().duration(150).attr('r', 4);
-                d3.selectAll('.tooltip').remove();
+        if (stato.primaVolta) {
+            // animazione: la linea si "disegna" da sinistra a destra (solo al primo disegno)
+            stato.primaVolta = false;
+            paths.attr('d', d => lineGen(d.punti));
+            paths.each(function() {
+                const len = this.getTotalLength();
+                d3.select(this)
+                    .attr('stroke-dasharray', `${len} ${len}`)
+                    .attr('stroke-dashoffset', len)
+                    .transition()
+                    .duration(1500)
+                    .ease(d3.easeLinear)
+                    .attr('stroke-dashoffset', 0)
+                    .on('end', function() {
+                        d3.select(this).attr('stroke-dasharray', null).attr('stroke-dashoffset', null);
+                    });
             });
+        } else if (t) {
+            // aggiornamento dei filtri: la linea si sposta verso i nuovi valori
+            paths.attr('stroke-dasharray', null)
+                .attr('stroke-dashoffset', null)
+                .transition(t)
+                .attr('d', d => lineGen(d.punti));
+        } else {
+            // zoom: subito, senza transizioni
+            paths.interrupt()
+                .attr('stroke-dasharray', null)
+                .attr('stroke-dashoffset', null)
+                .attr('d', d => lineGen(d.punti));
+        }
+
+        // punti interattivi: un gruppo per cluster, un cerchio per periodo
+        // se i periodi visibili sono troppo fitti lascio solo le linee
+        const conCerchi = nVisibili <= w / PX_PER_CERCHIO;
+        const gruppi = g.select('.punti').selectAll('.punti-cluster')
+            .data(conCerchi ? linee : [], d => d.cluster)
+            .join('g')
+            .attr('class', 'punti-cluster');
+
+        const ritardo = svg.select('.linea-cluster').attr('stroke-dasharray') ? 1500 : 0;
+        gruppi.each(function(linea) {
+            d3.select(this).selectAll('circle')
+                .data(linea.punti, d => `${livello.name}:${d.t}`)
+                .join(
+                    enter => enter.append('circle')
+                        .attr('class', `punto-cluster-${linea.cluster}`)
+                        .attr('cx', d => x(d.t))
+                        .attr('cy', d => y(d.score))
+                        .attr('r', 0)
+                        .attr('fill', colorScale(linea.cluster))
+                        .attr('stroke', '#fff')
+                        .attr('stroke-width', 1.5)
+                        // tooltip al hover
+                        .on('mouseover', function(event, d) {
+                            d3.select(this).transition().duration(150).attr('r', 7);
+                            tooltip.html(`
+                                    <strong>${getClusterLabel(linea.cluster)}</strong><br>
+                                    ${d.periodo}<br>
+                                    Score medio: ${d.score.toFixed(3)}
+                                `)
+                                .style('left', (event.pageX + 10) + 'px')
+                                .style('top', (event.pageY - 28) + 'px')
+                                .transition().duration(200).style('opacity', 0.95);
+                        })
+                        .on('mouseout', function() {
+                            d3.select(this).transition().duration(150).attr('r', 4);
+                            tooltip.interrupt().style('opacity', 0);
+                        })
+                        // al primo disegno i punti appaiono dopo che la linea è finita
+                        .call(e => e.transition()
+                            .delay(ritardo)
+                            .duration(t || ritardo ? 400 : 0)
+                            .attr('r', 4)),
+                    update => t
+                        ? update.call(u => u.transition(t)
+                            .attr('cx', d => x(d.t))
+                            .attr('cy', d => y(d.score)))
+                        : update.attr('cx', d => x(d.t)).attr('cy', d => y(d.score)),
+                    exit => exit.remove()
+                );
         });
+    }
 
-        // legenda con etichette descrittive
-        const legenda = svg.append('g')
-            .attr('transform', `translate(${width - this.margin.right + 5}, ${this.margin.top})`);
-
-        linee.forEach((linea, i) => {
-            const riga = legenda.append('g')
-                .attr('transform', `translate(0, ${i * 25})`);
-
-            riga.append('line')
-                .attr('x1', 0).attr('x2', 22)
-                .attr('y1', 10).attr('y2', 10)
-                .attr('stroke', colorScale(linea.cluster))
-                .attr('stroke-width', 2.5);
-
-            riga.append('circle')
-                .attr('cx', 11).attr('cy', 10).attr('r', 4)
-                .attr('fill', colorScale(linea.cluster))
-                .attr('stroke', '#fff').attr('stroke-width', 1.5);
-
-            riga.append('text')
-                .attr('x', 27).attr('y', 14)
-                .style('font-size', '11px')
-                .style('font-weight', linea.cluster === 4 ? '700' : '400')
-                .style('fill', linea.cluster === 4 ? '#e74c3c' : '#333')
-                .text(`C${linea.cluster}`);
+    // livelli {name, etichetta, mid, linee:[{cluster, punti:[{t, score, periodo}]}]}
+    // dalle somme del cubo temporale (un livello per risoluzione)
+    livelliDaSerie({ unit, clusters, levels }) {
+        return levels.map(level => {
+            const P = level.mid.length;
+            const formatta = this.formattaPeriodo(unit, level.name);
+            const linee = [];
+            clusters.forEach((cluster, c) => {
+                const punti = [];
+                for (let p = 0; p < P; p++) {
+                    const n = level.counts[c * P + p];
+                    if (n > 0) {
+                        const t = level.mid[p];
+                        punti.push({ t, score: level.sums[c * P + p] / n, periodo: formatta(t) });
+                    }
+                }
+                if (punti.length > 0) linee.push({ cluster, punti });
+            });
+            return { name: level.name, etichetta: ETICHETTE_LIVELLO[unit][level.name], mid: level.mid, linee };
         });
     }
+
+    // testo del periodo per il tooltip, a partire dal centro del periodo
+    formattaPeriodo(unit, livello) {
+        if (unit === 'day') {
+            const giorno = d3.utcFormat('%d/%m/%Y');
+            const mese = d3.utcFormat('%B %Y');
+            const data = d => new Date(d * 864e5);
+            if (livello === 'settimana') return t => `Settimana del ${giorno(data(t - 3))}`;
+            if (livello === 'mese') return t => mese(data(t));
+            return t => giorno(data(t));
+        }
+        if (livello === 'mese') return t => `Settimane ${t - 1.5}–${t + 1.5}`;
+        return t => `Settimana: ${t}`;
+    }
 }
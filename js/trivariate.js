@@ -5,36 +5,24 @@
 class TrivariateCharts {
     
     // scatterplot con 3 encoding: x, y, colore, dimensione
-    static createColoredScatter(data, containerId) {
-        // Aggrega per utente: media delle variabili continue, insider e cluster fissi
-        const byUser = d3.rollup(
-            data,
-            rows => ({
-                user_id: rows[0].user_id,
-                n_afterhourallact: d3.mean(rows, r => r.n_afterhourallact),
-                final_anomaly_score: d3.mean(rows, r => r.final_anomaly_score),
-                n_allact: d3.mean(rows, r => r.n_allact),
-                cluster: rows[0].cluster,
-                insider: rows[0].insider,
-            }),
-            d => d.user_id
-        );
-    const aggData = Array.from(byUser.values());
+    // users = tabella per-utente di DataLoader.getUserAggregates (se manca la calcolo)
+    static createColoredScatter(data, containerId, users = null) {
+        // un punto per utente: media delle variabili continue, insider e cluster fissi
+        const aggData = users || DataLoader.aggregateUsers(data);
     // Sposta la forzatura a intero PRIMA della creazione della colorScale
     aggData.forEach(d => d.cluster = Math.round(+d.cluster));
 
     // DEBUG: stampa i valori di cluster e la domain della colorScale
-    setTimeout(() => {
-      console.log('DEBUG cluster values:', aggData.map(d => d.cluster));
+    if (CONFIG.debug.log) setTimeout(() => {
+      debugLog('DEBUG cluster values:', aggData.map(d => d.cluster));
       const domain = [...new Set(aggData.map(d => d.cluster))].sort();
-      console.log('DEBUG colorScale domain:', domain);
+      debugLog('DEBUG colorScale domain:', domain);
       // La colorScale vera viene creata qui sotto, dopo la forzatura
       // quindi ora la domain sarà corretta
     }, 0);
         
         const margin = { top: 40, right: 150, bottom: 60, left: 60 };
         const container = d3.select(`#${containerId}`);
-        container.selectAll('*').remove();
         const containerWidth = Math.min(
             container.node().getBoundingClientRect().width || CONFIG.charts.parallel.width,
             CONFIG.charts.parallel.width
@@ -42,12 +30,67 @@ class TrivariateCharts {
         const width = containerWidth - margin.left - margin.right;
         const height = CONFIG.charts.scatter.height - margin.top - margin.bottom;
         
-        const svg = container
-            .append('svg')
-            .attr('width', width + margin.left + margin.right)
-            .attr('height', height + margin.top + margin.bottom)
-            .append('g')
-            .attr('transform', `translate(${margin.left},${margin.top})`);
+        // con troppi utenti i punti vanno su canvas (vedi canvas-layer.js)
+        const usaCanvas = CanvasLayer.usaCanvas(aggData.length);
+        
+        // scheletro solo la prima volta (o se è cambiata la larghezza del container,
+        // o se si passa da SVG a canvas e viceversa)
+        let svg = container.select('svg > g');
+        const primaVolta = svg.empty()
+            || usaCanvas !== (CanvasLayer.per(containerId) !== null);
+        if (primaVolta) {
+            container.selectAll('*').remove();
+            const parent = usaCanvas
+                ? CanvasLayer.crea(containerId, containerWidth,
+                                   height + margin.top + margin.bottom, margin).wrapper
+                : container;
+            svg = parent
+                .append('svg')
+                .attr('width', width + margin.left + margin.right)
+                .attr('height', height + margin.top + margin.bottom)
+                .append('g')
+                .attr('transform', `translate(${margin.left},${margin.top})`);
+            
+            // Assi
+            svg.append('g')
+                .attr('class', 'axis x-axis')
+                .attr('transform', `translate(0,${height})`);
+            
+            svg.append('g')
+                .attr('class', 'axis y-axis');
+            
+            // Label
+            svg.append('text')
+                .attr('class', 'axis-label etichetta-x')
+                .attr('y', height + 40)
+                .attr('text-anchor', 'middle')
+                .text('Attività After-Hour');
+            
+            svg.append('text')
+                .attr('class', 'axis-label')
+                .attr('transform', 'rotate(-90)')
+                .attr('x', -height / 2)
+                .attr('y', -45)
+                .attr('text-anchor', 'middle')
+                .text('Anomaly Score');
+            
+            svg.append('g').attr('class', 'punti');
+            
+            svg.append('g')
+                .attr('class', 'legend');
+        }
+        
+        // la larghezza segue il container: al resize aggiorno solo le dimensioni,
+        // i punti li riposiziona il join con la nuova scala x
+        const svgNode = d3.select(svg.node().ownerSVGElement);
+        if (+svgNode.attr('width') !== containerWidth) {
+            svgNode.attr('width', containerWidth);
+            if (usaCanvas) {
+                CanvasLayer.per(containerId).ridimensiona(containerWidth, height + margin.top + margin.bottom);
+            }
+        }
+        svg.select('.etichetta-x').attr('x', width / 2);
+        svg.select('.legend').attr('transform', `translate(${width + 20}, 0)`);
         
         // Scale
         const x = d3.scaleLinear()
@@ -69,83 +112,106 @@ class TrivariateCharts {
             .domain(d3.extent(aggData, d => d.n_allact))
             .range([3, 15]);
         
-        // Assi
-        svg.append('g')
-            .attr('class', 'axis x-axis')
-            .attr('transform', `translate(0,${height})`)
-            .call(d3.axisBottom(x));
-        
-        svg.append('g')
-            .attr('class', 'axis y-axis')
-            .call(d3.axisLeft(y));
-        
-        // Label
-        svg.append('text')
-            .attr('class', 'axis-label')
-            .attr('x', width / 2)
-            .attr('y', height + 40)
-            .attr('text-anchor', 'middle')
-            .text('Attività After-Hour');
-        
-        svg.append('text')
-            .attr('class', 'axis-label')
-            .attr('transform', 'rotate(-90)')
-            .attr('x', -height / 2)
-            .attr('y', -45)
-            .attr('text-anchor', 'middle')
-            .text('Anomaly Score');
+        const t = svg.transition().duration(CONFIG.transition.duration);
+        
+        svg.select('.x-axis').transition(t).call(d3.axisBottom(x));
+        svg.select('.y-axis').transition(t).call(d3.axisLeft(y));
         
         // Tooltip
-        const tooltip = d3.select('body').append('div').attr('class', 'tooltip');
-        
-        // Points
-        svg.selectAll('.dot')
-            .data(aggData)
-            .join('circle')
-            .attr('class', 'dot')
-            .attr('cx', d => x(d.n_afterhourallact))
-            .attr('cy', d => y(d.final_anomaly_score))
-            .attr('r', 0)
-            .attr('fill', d => {
-                const color = colorScale(d.cluster);
-                console.log('DEBUG fill', {cluster: d.cluster, color});
-                return color;
-            })
-            .attr('opacity', 0.7)
-            .attr('stroke', 'white')
-            .attr('stroke-width', 1)
-            .on('mouseover', function(event, d) {
-                d3.select(this)
-                    .attr('stroke-width', 2)
-                    .attr('opacity', 1);
-                
-                tooltip.html(`
-                    <strong>User ${d.user_id}</strong><br>
-                    After-hour medio: ${d.n_afterhourallact.toFixed(1)}<br>
-                    Score medio: ${d.final_anomaly_score.toFixed(2)}<br>
-                    Cluster: ${d.cluster}<br>
-                    Tot. Attività media: ${d.n_allact.toFixed(0)}<br>
-                    Tipo: ${d.insider === 1 ? '⚠ Insider' : 'Normale'}
-                `)
-                .style('opacity', 1)
-                .style('left', (event.pageX + 10) + 'px')
-                .style('top', (event.pageY - 20) + 'px');
-            })
-            .on('mouseout', function() {
-                d3.select(this)
-                    .attr('stroke-width', 1)
-                    .attr('opacity', 0.7);
-                tooltip.style('opacity', 0);
-            })
-            .transition()
-            .duration(CONFIG.transition.duration)
-            .delay((d, i) => i * 3)
-            .attr('r', d => sizeScale(d.n_allact));
-        
-        // Legenda Cluster
-        const legend = svg.append('g')
-            .attr('class', 'legend')
-            .attr('transform', `translate(${width + 20}, 0)`);
+        const tooltip = getTooltip(containerId);
+        
+        if (usaCanvas) {
+            // tutti gli utenti su canvas, tooltip col punto più vicino (quadtree)
+            CanvasLayer.per(containerId)
+                .cerchi(aggData, {
+                    x: d => x(d.n_afterhourallact),
+                    y: d => y(d.final_anomaly_score),
+                    r: d => sizeScale(d.n_allact),
+                    fill: d => colorScale(d.cluster),
+                    stroke: 'white',
+                    strokeWidth: 1,
+                    opacity: 0.7
+                })
+                .evidenziaCon((ctx, d) => {
+                    ctx.beginPath();
+                    ctx.arc(x(d.n_afterhourallact), y(d.final_anomaly_score),
+                            sizeScale(d.n_allact), 0, 2 * Math.PI);
+                    ctx.fillStyle = colorScale(d.cluster);
+                    ctx.fill();
+                    ctx.strokeStyle = 'white';
+                    ctx.lineWidth = 2;
+                    ctx.stroke();
+                })
+                .onHover((event, d) => {
+                    if (!d) {
+                        tooltip.style('opacity', 0);
+                        return;
+                    }
+                    tooltip.html(`
+                        <strong>User ${d.user_id}</strong><br>
+                        After-hour medio: ${d.n_afterhourallact.toFixed(1)}<br>
+                        Score medio: ${d.final_anomaly_score.toFixed(2)}<br>
+                        Cluster: ${d.cluster}<br>
+                        Tot. Attività media: ${d.n_allact.toFixed(0)}<br>
+                        Tipo: ${d.insider === 1 ? '⚠ Insider' : 'Normale'}
+                    `)
+                    .style('opacity', 1)
+                    .style('left', (event.pageX + 10) + 'px')
+                    .style('top', (event.pageY - 20) + 'px');
+                });
+        } else {
+            // Points: chiave = user_id, entrano/escono solo gli utenti cambiati
+            svg.select('.punti').selectAll('.dot')
+                .data(aggData, d => d.user_id)
+                .join(
+                    enter => enter.append('circle')
+                        .attr('class', 'dot')
+                        .attr('cx', d => x(d.n_afterhourallact))
+                        .attr('cy', d => y(d.final_anomaly_score))
+                        .attr('r', 0)
+                        .attr('opacity', 0.7)
+                        .attr('stroke', 'white')
+                        .attr('stroke-width', 1)
+                        .on('mouseover', function(event, d) {
+                            d3.select(this)
+                                .attr('stroke-width', 2)
+                                .attr('opacity', 1);
+                        
+                            tooltip.html(`
+                                <strong>User ${d.user_id}</strong><br>
+                                After-hour medio: ${d.n_afterhourallact.toFixed(1)}<br>
+                                Score medio: ${d.final_anomaly_score.toFixed(2)}<br>
+                                Cluster: ${d.cluster}<br>
+                                Tot. Attività media: ${d.n_allact.toFixed(0)}<br>
+                                Tipo: ${d.insider === 1 ? '⚠ Insider' : 'Normale'}
+                            `)
+                            .style('opacity', 1)
+                            .style('left', (event.pageX + 10) + 'px')
+                            .style('top', (event.pageY - 20) + 'px');
+                        })
+                        .on('mouseout', function() {
+                            d3.select(this)
+                                .attr('stroke-width', 1)
+                                .attr('opacity', 0.7);
+                            tooltip.style('opacity', 0);
+                        }),
+                    update => update,
+                    exit => exit.call(e => e.transition(t)
+                        .attr('r', 0)
+                        .remove())
+                )
+                // il dominio dei colori dipende dai cluster rimasti nel filtro
+                .attr('fill', d => colorScale(d.cluster))
+                .transition(t)
+                .delay((d, i) => primaVolta ? i * 3 : 0)
+                .attr('cx', d => x(d.n_afterhourallact))
+                .attr('cy', d => y(d.final_anomaly_score))
+                .attr('r', d => sizeScale(d.n_allact));
+        }
+        
+        // Legenda: dipende dai cluster e dalle attività filtrate, la ridisegno (pochi elementi)
+        const legend = svg.select('.legend');
+        legend.selectAll('*').remove();
         
         const clusters = [...new Set(aggData.map(d => d.cluster))].sort();
         
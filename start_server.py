@@ -1,15 +1,182 @@
 #!/usr/bin/env python3
 """
 Script per avviare un server HTTP locale per la dashboard InfoVis
+
+Uso:
+    python start_server.py                    # pool di thread (default)
+    python start_server.py --mode single      # un solo thread, come prima
+    python start_server.py --workers 16 --port 8080
+    python start_server.py --precompress      # genera i .gz/.br prima di partire
+    python start_server.py --cache-control js/="public, max-age=3600"
 """
 
+import argparse
+import datetime
+import email.utils
+import gzip
+import hashlib
 import http.server
+import io
+import queue
 import socketserver
+import threading
 import webbrowser
 import os
 import sys
 
+import csv_colonnare
+
+try:
+    import brotli  # opzionale: pip install brotli
+except ImportError:
+    brotli = None
+
 PORT = 8000
+WORKERS = 8
+MODI = ('thread', 'single')
+
+# ─── Compressione ────────────────────────────────────────────────────────────
+# I CSV esportati si comprimono 5-10x: li mando gzip/brotli se il browser li accetta.
+ESTENSIONI_COMPRESSE = ('.csv', '.js', '.css', '.html', '.json', '.svg', '.bin')
+CARTELLE_PRECOMPRESSE = ('index.html', 'css', 'js', 'data/results')
+SUFFISSI = {'br': '.br', 'gzip': '.gz'}
+MIN_BYTES_COMPRESSIONE = 1024  # sotto questa soglia non conviene
+
+# export colonnare del CSV (vedi csv_colonnare.py), rigenerato quando il CSV cambia
+CSV_URL = '/data/results/anomalies_temporal_v2.csv'
+BINARIO_URL = '/data/anomalies.bin'
+_binario_lock = threading.Lock()
+
+_cache_compressi = {}  # (path, encoding) -> (mtime_ns, bytes)
+_cache_lock = threading.Lock()
+
+def codifiche_disponibili():
+    """Codifiche che il server sa produrre, in ordine di preferenza."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def scegli_codifica(accept_encoding):
+    """Sceglie la codifica migliore tra quelle accettate dal client (None = identity)."""
+    accettate = {}
+    for parte in accept_encoding.split(','):
+        nome, _, param = parte.strip().partition(';')
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        param = param.strip()
+        if param.startswith('q='):
+            try:
+                q = float(param[2:])
+            except ValueError:
+                q = 0.0
+        accettate[nome] = q
+    for codifica in codifiche_disponibili():
+        if accettate.get(codifica, accettate.get('*', 0.0)) > 0:
+            return codifica
+    return None
+
+def comprimi(dati, encoding):
+    if encoding == 'br':
+        return brotli.compress(dati, quality=5)
+    return gzip.compress(dati, compresslevel=6, mtime=0)
+
+def comprimibile(path):
+    return path.lower().endswith(ESTENSIONI_COMPRESSE)
+
+def corpo_compresso(path, encoding):
+    """Byte compressi di `path`, in cache finche' non cambia il mtime del file.
+
+    Se accanto al file esiste un .gz/.br piu' recente (creato con --precompress)
+    uso quello, altrimenti comprimo al volo alla prima richiesta.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    chiave = (path, encoding)
+    with _cache_lock:
+        in_cache = _cache_compressi.get(chiave)
+    if in_cache is not None and in_cache[0] == mtime:
+        return in_cache[1]
+
+    fratello = path + SUFFISSI[encoding]
+    try:
+        if os.stat(fratello).st_mtime_ns >= mtime:
+            with open(fratello, 'rb') as f:
+                dati = f.read()
+        else:
+            dati = None
+    except OSError:
+        dati = None
+    if dati is None:
+        with open(path, 'rb') as f:
+            dati = comprimi(f.read(), encoding)
+
+    with _cache_lock:
+        _cache_compressi[chiave] = (mtime, dati)
+    return dati
+
+# ─── Cache HTTP ──────────────────────────────────────────────────────────────
+# Con ETag + 304 non serve piu' rinominare i file (_v2, ?v=8) per forzare il reload:
+# il browser rivalida e riscarica solo se il contenuto e' cambiato davvero.
+# Il prefisso piu' lungo vince; CACHE_CONTROL_DEFAULT per tutto il resto.
+CACHE_CONTROL = {
+    'js/': 'public, max-age=60, must-revalidate',
+    'css/': 'public, max-age=60, must-revalidate',
+    'data/results/': 'no-cache',
+}
+CACHE_CONTROL_DEFAULT = 'no-cache'
+
+_cache_hash = {}  # path -> (mtime_ns, size, hex digest)
+
+def hash_file(path, st=None):
+    """Hash del contenuto di `path`, ricalcolato solo quando cambiano mtime o dimensione."""
+    st = st or os.stat(path)
+    with _cache_lock:
+        in_cache = _cache_hash.get(path)
+    if in_cache is not None and in_cache[:2] == (st.st_mtime_ns, st.st_size):
+        return in_cache[2]
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for blocco in iter(lambda: f.read(1 << 20), b''):
+            h.update(blocco)
+    digest = h.hexdigest()
+    with _cache_lock:
+        _cache_hash[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+def etag_file(path, encoding=None, st=None):
+    """ETag forte: ogni codifica e' una rappresentazione diversa, quindi ha il suo tag."""
+    digest = hash_file(path, st)
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+def cache_control_per(url_path):
+    relativo = url_path.split('?', 1)[0].lstrip('/')
+    migliore = None
+    for prefisso in CACHE_CONTROL:
+        if relativo.startswith(prefisso) and (migliore is None or len(prefisso) > len(migliore)):
+            migliore = prefisso
+    return CACHE_CONTROL[migliore] if migliore is not None else CACHE_CONTROL_DEFAULT
+
+def precomprimi(root='.'):
+    """Scrive i fratelli .gz/.br degli asset della dashboard. Ritorna quanti file ha scritto."""
+    scritti = 0
+    for voce in CARTELLE_PRECOMPRESSE:
+        base = os.path.join(root, voce)
+        if os.path.isfile(base):
+            candidati = [base]
+        else:
+            candidati = [os.path.join(d, f) for d, _, files in os.walk(base) for f in files]
+        for path in candidati:
+            if not comprimibile(path) or os.path.getsize(path) < MIN_BYTES_COMPRESSIONE:
+                continue
+            with open(path, 'rb') as f:
+                dati = f.read()
+            for encoding in codifiche_disponibili():
+                fratello = path + SUFFISSI[encoding]
+                if os.path.exists(fratello) and os.path.getmtime(fratello) >= os.path.getmtime(path):
+                    continue
+                with open(fratello, 'wb') as f:
+                    f.write(comprimi(dati, encoding))
+                scritti += 1
+    return scritti
 
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
@@ -17,19 +184,173 @@ class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        # la risposta cambia in base ad Accept-Encoding: lo dico alle cache
+        if comprimibile(getattr(self, 'url_risolto', self.path).split('?', 1)[0]):
+            self.send_header('Vary', 'Accept-Encoding')
         super().end_headers()
 
-def main():
+    def send_head(self):
+        if self.path.split('?', 1)[0] == BINARIO_URL:
+            self.prepara_binario()
+        path = self.translate_path(self.path)
+        self.url_risolto = self.path.split('?', 1)[0]
+        # "/" e le altre cartelle: se c'e' l'index lo servo come un file qualsiasi
+        # (compressione, ETag, Cache-Control), altrimenti listing come prima
+        if self.url_risolto.endswith('/') and os.path.isdir(path):
+            for index in ('index.html', 'index.htm'):
+                if os.path.isfile(os.path.join(path, index)):
+                    path = os.path.join(path, index)
+                    self.url_risolto += index
+                    break
+        # redirect, listing e 404 li lascio gestire a SimpleHTTPRequestHandler
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        st = os.stat(path)
+        encoding = None
+        if comprimibile(path) and st.st_size >= MIN_BYTES_COMPRESSIONE:
+            encoding = scegli_codifica(self.headers.get('Accept-Encoding', ''))
+        etag = etag_file(path, encoding, st)
+
+        if self.non_modificato(etag, st.st_mtime):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control_per(self.url_risolto))
+            self.end_headers()
+            return None
+
+        if encoding is None:
+            corpo = open(path, 'rb')
+            lunghezza = st.st_size
+        else:
+            dati = corpo_compresso(path, encoding)
+            corpo = io.BytesIO(dati)
+            lunghezza = len(dati)
+
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(lunghezza))
+        self.send_header('Last-Modified', self.date_time_string(st.st_mtime))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control_per(self.url_risolto))
+        self.end_headers()
+        return corpo
+
+    def prepara_binario(self):
+        # un solo thread alla volta rigenera il .bin, gli altri aspettano e poi lo servono
+        with _binario_lock:
+            csv_colonnare.aggiorna(self.translate_path(CSV_URL), self.translate_path(BINARIO_URL))
+
+    def non_modificato(self, etag, mtime):
+        """True se la copia del client e' ancora valida (If-None-Match ha la precedenza)."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [t.strip() for t in if_none_match.split(',')]
+            # confronto debole, come prevede RFC 7232 per If-None-Match
+            return '*' in tags or any(t.removeprefix('W/') == etag for t in tags)
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is None:
+            return False
+        try:
+            data = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if data.tzinfo is None:
+            data = data.replace(tzinfo=datetime.timezone.utc)
+        return int(mtime) <= data.timestamp()
+
+class PooledTCPServer(socketserver.TCPServer):
+    """TCPServer che smista ogni connessione su un pool di thread di dimensione fissa.
+
+    A differenza di ThreadingTCPServer (un thread nuovo per richiesta) il numero
+    di thread resta limitato a `workers`: un client lento che scarica il CSV
+    occupa un solo worker e non blocca il caricamento di JS/CSS degli altri.
+
+    I worker sono thread daemon (come ThreadingMixIn con daemon_threads = True):
+    niente ThreadPoolExecutor, i cui thread l'interprete aspetta all'uscita, cosi'
+    Ctrl-C non resta appeso a un client lento o a una connessione keep-alive.
+    """
+    allow_reuse_address = True
+
+    def __init__(self, server_address, handler, workers=WORKERS):
+        super().__init__(server_address, handler)
+        self.coda = queue.Queue()  # (request, client_address); None = fermati
+        self.workers = [threading.Thread(target=self._worker, name=f'http_{i}', daemon=True)
+                        for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def process_request(self, request, client_address):
+        self.coda.put((request, client_address))
+
+    def _worker(self):
+        while True:
+            lavoro = self.coda.get()
+            if lavoro is None:
+                return
+            request, client_address = lavoro
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        # fermo i worker liberi; quelli ancora su una connessione non bloccano l'uscita
+        for _ in self.workers:
+            self.coda.put(None)
+
+def crea_server(mode='thread', port=PORT, workers=WORKERS, handler=MyHTTPRequestHandler):
+    """Crea il server nella modalita' richiesta ('thread' o 'single')."""
+    if mode == 'thread':
+        return PooledTCPServer(("", port), handler, workers=workers)
+    if mode == 'single':
+        return socketserver.TCPServer(("", port), handler)
+    raise ValueError(f"Modalita' server sconosciuta: {mode}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Server HTTP locale per la dashboard InfoVis")
+    parser.add_argument('--port', type=int, default=PORT, help=f"porta (default {PORT})")
+    parser.add_argument('--mode', choices=MODI, default='thread',
+                        help="thread = pool di worker, single = un thread solo")
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f"dimensione del pool in modalita' thread (default {WORKERS})")
+    parser.add_argument('--no-browser', action='store_true', help="non aprire il browser")
+    parser.add_argument('--precompress', action='store_true',
+                        help="scrive i .gz/.br accanto a CSV/JS/CSS prima di avviare il server")
+    parser.add_argument('--cache-control', action='append', default=[], metavar='PREFISSO=VALORE',
+                        help="Cache-Control per un prefisso di path (ripetibile), "
+                             "es. data/results/=\"max-age=600\"")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    port = args.port
+    for regola in args.cache_control:
+        prefisso, sep, valore = regola.partition('=')
+        if not sep:
+            sys.exit(f"--cache-control vuole PREFISSO=VALORE, ricevuto: {regola}")
+        CACHE_CONTROL[prefisso.lstrip('/')] = valore
+
     # Cambia directory alla root del progetto
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    
+
     print("=" * 60)
     print("SERVER HTTP LOCALE - Dashboard InfoVis")
     print("=" * 60)
     print(f"\nDirectory: {os.getcwd()}")
-    print(f"Porta: {PORT}")
-    print(f"URL: http://localhost:{PORT}\n")
-    
+    print(f"Porta: {port}")
+    if args.mode == 'thread':
+        print(f"Modalita': pool di {args.workers} thread")
+    else:
+        print("Modalita': single-thread")
+    print(f"URL: http://localhost:{port}\n")
+
     # Verifica che il file CSV esista (quello effettivamente usato dalla dashboard)
     csv_path = "data/results/anomalies_temporal_v2.csv"
     if os.path.exists(csv_path):
@@ -37,31 +358,35 @@ def main():
     else:
         print(f"ATTENZIONE: {csv_path} non trovato!")
         print("   La dashboard potrebbe non funzionare correttamente.\n")
-    
+
+    if args.precompress:
+        print(f"Precompressi {precomprimi()} file ({', '.join(codifiche_disponibili())})")
+    elif brotli is None:
+        print("brotli non installato: compressione solo gzip")
+
     print("=" * 60)
     print("Premi CTRL+C per fermare il server")
     print("=" * 60)
     print()
-    
+
     # Avvia server
-    Handler = MyHTTPRequestHandler
-    
     try:
-        with socketserver.TCPServer(("", PORT), Handler) as httpd:
+        with crea_server(args.mode, port, args.workers) as httpd:
             # Apri browser automaticamente
-            url = f"http://localhost:{PORT}"
-            print(f"Apertura browser su {url}...\n")
-            webbrowser.open(url)
-            
+            url = f"http://localhost:{port}"
+            if not args.no_browser:
+                print(f"Apertura browser su {url}...\n")
+                webbrowser.open(url)
+
             # Resta in ascolto
             httpd.serve_forever()
-            
+
     except KeyboardInterrupt:
         print("\nServer fermato.")
         sys.exit(0)
     except OSError as e:
-        if e.errno == 48:  # Address already in use
-            print(f"\nERRORE: La porta {PORT} e' gia' in uso!")
+        if e.errno in (48, 98):  # Address already in use (macOS / Linux)
+            print(f"\nERRORE: La porta {port} e' gia' in uso!")
             print(f"   Prova a cambiare porta o chiudi l'altra applicazione.\n")
             sys.exit(1)
         else:
@@ -0,0 +1,55 @@
+"""Fixture comuni: CSV piccoli scritti in una cartella temporanea."""
+
+import csv
+import os
+import sys
+
+import pytest
+
+# gli script stanno nella radice del repo, non in un pacchetto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COLONNE = ["user_id", "week", "role", "O", "n_logon", "final_anomaly_score",
+           "cluster", "cluster_distance", "rank", "insider"]
+
+
+def riga(utente, settimana, cluster, score, insider=0):
+    return [f"U{utente:03d}", settimana, "Eng", 20 + utente, 10 * settimana, score,
+            cluster, 0.5, utente + 1, insider]
+
+
+@pytest.fixture
+def cartella(tmp_path, monkeypatch):
+    # la cache dei grafici (_docs/cache_grafici) e i deck finiscono nella cartella temporanea
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def scrivi_csv(cartella):
+    def scrivi(nome, righe, colonne=COLONNE):
+        percorso = cartella / nome
+        with open(percorso, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(colonne)
+            writer.writerows(righe)
+        return str(percorso)
+    return scrivi
+
+
+@pytest.fixture
+def righe_temporal():
+    """6 utenti x 3 settimane, cluster 0-2, un insider nel cluster 2."""
+    return [riga(u, w, u % 3, round(0.1 * u + 0.05 * w, 3), insider=int(u == 5))
+            for u in range(6) for w in range(1, 4)]
+
+
+@pytest.fixture
+def temporal(scrivi_csv, righe_temporal):
+    return scrivi_csv("temporal.csv", righe_temporal)
+
+
+@pytest.fixture
+def profili(scrivi_csv):
+    return scrivi_csv("profili.csv", [[c, 0.1 * c, 10 + c] for c in range(3)],
+                      colonne=["cluster", "final_anomaly_score", "n_logon"])
@@ -0,0 +1,15 @@
+// carica gli script del browser (niente moduli) in un contesto vm
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+// ritorna { nome: valore } per i nomi richiesti: class e const non finiscono sul
+// globale del contesto, quindi li leggo con un'espressione nello stesso contesto
+function carica(file, nomi, globali = {}) {
+    const contesto = vm.createContext({ console, performance, setTimeout, ...globali });
+    const sorgente = fs.readFileSync(path.join(__dirname, '..', '..', 'js', file), 'utf8');
+    vm.runInContext(sorgente, contesto, { filename: file });
+    return Object.fromEntries(nomi.map(nome => [nome, vm.runInContext(nome, contesto)]));
+}
+
+module.exports = { carica };
@@ -0,0 +1,26 @@
+// node --test tests/js
+const test = require('node:test');
+const assert = require('node:assert');
+const { carica } = require('./carica');
+
+// del d3 vero a fromCsv serve solo extent
+const d3 = { extent: (righe, f) => [Math.min(...righe.map(f)), Math.max(...righe.map(f))] };
+const { ClusterProfiles } = carica('cluster-profiles.js', ['ClusterProfiles'], { d3 });
+
+// come d3.csv: oggetti con tutte le colonne come stringhe + rows.columns
+function csv(columns, righe) {
+    const rows = righe.map(valori => Object.fromEntries(columns.map((c, j) => [c, String(valori[j])])));
+    rows.columns = columns;
+    return rows;
+}
+
+test('fromCsv tiene il cluster 0 anche con una colonna senza nome', () => {
+    const profili = ClusterProfiles.fromCsv(csv(['', 'cluster', 'n_logon'], [[7, 0, 1], [8, 1, 2]]));
+    assert.deepStrictEqual(profili.clusters.map(d => d.cluster), [0, 1]);
+});
+
+test('fromCsv usa l\'indice senza nome se manca la colonna cluster', () => {
+    const profili = ClusterProfiles.fromCsv(csv(['', 'n_logon'], [[0, 1], [1, 2], [2, 3]]));
+    assert.deepStrictEqual(profili.clusters.map(d => d.cluster), [0, 1, 2]);
+    assert.deepStrictEqual(profili.features, ['n_logon']);
+});
@@ -0,0 +1,26 @@
+// node --test tests/js
+const test = require('node:test');
+const assert = require('node:assert');
+const { carica } = require('./carica');
+
+const { DataEngine } = carica('data-engine.js', ['DataEngine']);
+
+function stats(score) {
+    const engine = new DataEngine();
+    engine.columns = { final_anomaly_score: Float32Array.from(score) };
+    const users = { userCodes: [0], insider: [0] };
+    return engine.stats(score.map((_, i) => i), users);
+}
+
+test('stats salta gli score NaN', () => {
+    const risultato = stats([1, NaN, 3]);
+    assert.strictEqual(risultato.rows, 3);
+    assert.strictEqual(risultato.avgScore, 2);
+    assert.strictEqual(risultato.maxScore, 3);
+});
+
+test('stats senza score validi da null', () => {
+    const risultato = stats([NaN, NaN]);
+    assert.strictEqual(risultato.avgScore, null);
+    assert.strictEqual(risultato.maxScore, null);
+});
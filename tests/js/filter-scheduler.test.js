@@ -0,0 +1,60 @@
+// node --test tests/js
+const test = require('node:test');
+const assert = require('node:assert');
+const { carica } = require('./carica');
+
+// requestAnimationFrame a mano: i frame partono solo quando lo dice il test
+function nuovoScheduler(calcola, disegna = async () => {}) {
+    const frame = [];
+    const { FilterScheduler } = carica('filter-scheduler.js', ['FilterScheduler'], {
+        requestAnimationFrame: callback => frame.push(callback)
+    });
+    const scheduler = new FilterScheduler(calcola, disegna);
+    const prossimoFrame = () => frame.splice(0).forEach(callback => callback());
+    return { scheduler, prossimoFrame };
+}
+
+const filtri = (minScore) => ({ minScore, clusters: [0, 1] });
+const attesa = () => new Promise(resolve => setTimeout(resolve, 0));
+
+test('nello stesso frame calcola solo lo stato dei filtri piu\' recente', async () => {
+    const calcolati = [];
+    const { scheduler, prossimoFrame } = nuovoScheduler(async f => { calcolati.push(f.minScore); return f; });
+
+    scheduler.richiedi(filtri(1));
+    scheduler.richiedi(filtri(2));
+    scheduler.richiedi(filtri(3));
+    prossimoFrame();
+    await attesa();
+
+    assert.deepStrictEqual(calcolati, [3]);
+});
+
+test('i filtri superati durante un calcolo in corso non arrivano al motore', async () => {
+    const calcolati = [];
+    const disegnati = [];
+    let finisci;
+    const { scheduler, prossimoFrame } = nuovoScheduler(
+        f => {
+            calcolati.push(f.minScore);
+            // il primo calcolo resta in corso finche' il test non lo chiude
+            return f.minScore === 1 ? new Promise(resolve => { finisci = () => resolve(f); }) : Promise.resolve(f);
+        },
+        async (data, annullato) => { disegnati.push([data.minScore, annullato()]); }
+    );
+
+    scheduler.richiedi(filtri(1));
+    prossimoFrame();
+    await attesa();
+    scheduler.richiedi(filtri(2));   // superato da 3 prima di partire: scartato
+    scheduler.richiedi(filtri(3));
+    prossimoFrame();                 // nessun frame pianificato mentre 1 e' in corso
+    finisci();
+    await attesa();
+    prossimoFrame();
+    await attesa();
+
+    assert.deepStrictEqual(calcolati, [1, 3]);
+    // il risultato di 1 si disegna comunque, ma sa di essere superato
+    assert.deepStrictEqual(disegnati, [[1, true], [3, false]]);
+});
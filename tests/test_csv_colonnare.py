@@ -0,0 +1,69 @@
+import json
+import math
+import struct
+from array import array
+
+import pytest
+
+import csv_colonnare
+
+
+def leggi(dati):
+    """Byte del formato colonnare -> (header, {nome: lista di valori decodificati})."""
+    n_header = struct.unpack_from("<I", dati)[0]
+    header = json.loads(dati[4:4 + n_header])
+    righe = header["rows"]
+    colonne = {}
+    for col in header["columns"]:
+        valori = array("f" if col["type"] == "float32" else "i")
+        valori.frombytes(dati[col["offset"]:col["offset"] + 4 * righe])
+        assert col["offset"] % 4 == 0
+        if col["type"] == "dict":
+            valori = [col["dictionary"][codice] for codice in valori]
+        colonne[col["name"]] = list(valori)
+    return header, colonne
+
+
+def tipi(header):
+    return {col["name"]: col["type"] for col in header["columns"]}
+
+
+def test_andata_e_ritorno(scrivi_csv):
+    percorso = scrivi_csv("t.csv", [["U1", 1, "Eng", "0.25", 3, 0],
+                                    ["U2", 2, "IT", "", 4, 1, "campo in piu'"],
+                                    ["U1", 3]],  # riga troncata
+                          colonne=["user_id", "week", "role", "score", "cluster", "insider"])
+
+    header, colonne = leggi(csv_colonnare.converti(percorso))
+
+    assert header["rows"] == 3
+    assert tipi(header) == {"user_id": "dict", "week": "int32", "role": "dict",
+                            "score": "float32", "cluster": "int32", "insider": "int32"}
+    assert colonne["user_id"] == ["U1", "U2", "U1"]
+    assert colonne["week"] == [1, 2, 3]
+    assert colonne["role"] == ["Eng", "IT", ""]
+    assert colonne["score"] == [0.25, 0.0, 0.0]  # celle vuote = 0 come +'' in JS
+    assert colonne["cluster"] == [3, 4, 0]
+
+
+def test_colonna_intera_con_decimali_non_si_tronca(scrivi_csv):
+    percorso = scrivi_csv("t.csv", [[1, 0], [2.5, 1]], colonne=["week", "cluster"])
+
+    header, colonne = leggi(csv_colonnare.converti(percorso))
+
+    assert tipi(header) == {"week": "float32", "cluster": "int32"}
+    assert colonne["week"] == [1.0, 2.5]
+
+
+def test_colonna_intera_con_nan(scrivi_csv):
+    percorso = scrivi_csv("t.csv", [[1, 0], [2, "nan"]], colonne=["week", "cluster"])
+
+    header, colonne = leggi(csv_colonnare.converti(percorso))
+
+    assert tipi(header)["cluster"] == "float32"
+    assert colonne["cluster"][0] == 0 and math.isnan(colonne["cluster"][1])
+
+
+@pytest.mark.parametrize("valore, atteso", [("3", 3.0), (" 2.5 ", 2.5), ("", 0.0), ("abc", None)])
+def test_numero(valore, atteso):
+    assert csv_colonnare.numero(valore) == atteso
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+pytest.importorskip("pptx")
+
+from pptx import Presentation
+
+import genera_ppt
+import grafici_deck
+from conftest import riga
+
+
+def leggi_testi(percorso):
+    """Tutti i testi del deck, comprese le celle delle tabelle."""
+    for slide in Presentation(percorso).slides:
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                yield shape.text_frame.text
+            if shape.has_table:
+                for row in shape.table.rows:
+                    for cell in row.cells:
+                        yield cell.text
+
+
+@pytest.mark.parametrize("filtro", [{"cluster": [9]}, {"week": 99}])
+def test_filtro_senza_righe(temporal, profili, cartella, filtro):
+    out = str(cartella / "deck.pptx")
+
+    n_slide, righe = genera_ppt.genera(temporal, profili, out, filtro=filtro, workers_grafici=1)
+
+    assert righe == 0
+    assert os.path.exists(out)
+    # stesse slide con e senza grafici: i grafici vuoti diventano un segnaposto
+    con_grafici = 4 if grafici_deck.disponibile() else 0
+    senza, _ = genera_ppt.genera(temporal, profili, out, filtro=filtro, grafici=False)
+    assert n_slide == senza + con_grafici
+
+
+def test_score_nan(scrivi_csv, righe_temporal, profili, cartella):
+    righe_temporal.append(riga(0, 4, 0, "nan"))
+    temporal = scrivi_csv("temporal.csv", righe_temporal)
+
+    n_slide, righe = genera_ppt.genera(temporal, profili, str(cartella / "deck.pptx"),
+                                       top=3, workers_grafici=1)
+
+    assert righe == len(righe_temporal)
+    assert n_slide > 0
+
+
+def test_righe_troncate(scrivi_csv, righe_temporal, profili, cartella):
+    righe_temporal.append(["U009", 2, "Eng"])  # si ferma prima di score/cluster/insider
+    temporal = scrivi_csv("temporal.csv", righe_temporal)
+
+    t = genera_ppt.leggi_temporal(temporal, {"week": 2})
+    n_slide, righe = genera_ppt.genera(temporal, profili, str(cartella / "deck.pptx"),
+                                       top=3, grafici=False)
+
+    assert t["righe"] == 7 and t["utenti"] == 7
+    assert sum(c["righe"] for c in t["cluster"].values()) == 6  # la riga troncata non ha cluster
+    assert righe == len(righe_temporal)
+
+
+def test_settimane_dai_dati(temporal, profili, cartella):
+    out = str(cartella / "deck.pptx")
+    genera_ppt.genera(temporal, profili, out, grafici=False)
+
+    tutti = list(leggi_testi(out))
+
+    assert "asse X temporale (1-3)" in tutti
+    assert not any("(1-8)" in testo for testo in tutti)
+
+
+def test_cluster_in_tabella_nativa_paginata(scrivi_csv, profili, cartella):
+    # 12 cluster: la tabella dei cluster non sta in una slide sola
+    temporal = scrivi_csv("temporal.csv", [riga(u, 1, u, 0.1 * u, insider=int(u == 7))
+                                           for u in range(12)])
+    out = str(cartella / "deck.pptx")
+    genera_ppt.genera(temporal, profili, out, grafici=False)
+
+    slide_cluster = [sl for sl in Presentation(out).slides
+                     if any(sh.has_text_frame and sh.text_frame.text.startswith("Progetto Finale — I 12 Cluster")
+                            for sh in sl.shapes)]
+    tabelle = [sh.table for sl in slide_cluster for sh in sl.shapes if sh.has_table]
+
+    assert len(slide_cluster) > 1
+    assert len(tabelle) == len(slide_cluster)  # una tabella per slide, niente celle a mano
+    celle = {row.cells[0].text: row.cells for tab in tabelle for row in list(tab.rows)[1:]}
+    assert sorted(celle, key=lambda c: int(c[1:])) == [f"C{c}" for c in range(12)]
+    evidenziata = celle["C7"][0].text_frame.paragraphs[0].runs[0].font
+    assert evidenziata.bold and evidenziata.color.rgb == genera_ppt.ROSSO
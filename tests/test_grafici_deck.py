@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import grafici_deck
+from conftest import riga
+
+pytestmark = pytest.mark.skipif(not grafici_deck.disponibile(), reason="servono numpy e matplotlib")
+
+
+def test_score_nan_non_rompe_i_grafici(scrivi_csv, righe_temporal):
+    righe_temporal.append(riga(0, 4, 0, "nan"))
+    percorso = scrivi_csv("temporal.csv", righe_temporal)
+
+    percorsi = grafici_deck.renderizza(percorso, workers=1)
+
+    assert set(percorsi) == set(grafici_deck.GRAFICI)
+    assert all(os.path.exists(p) for p in percorsi.values())
+
+
+def test_media_per_utente_salta_nan(scrivi_csv):
+    percorso = scrivi_csv("temporal.csv", [riga(0, 1, 0, 1.0), riga(0, 2, 0, "nan"),
+                                           riga(0, 3, 0, 3.0), riga(1, 1, 1, "nan")])
+
+    score = grafici_deck.aggrega(percorso).per_utente()["final_anomaly_score"]
+
+    assert score[0] == pytest.approx(2.0)
+    assert score[1] != score[1]  # nessuno score valido -> NaN, non 0
+
+
+def test_blocchi_danno_le_stesse_medie(temporal, monkeypatch):
+    intero = grafici_deck.aggrega(temporal, {"week": [1, 2]})
+    monkeypatch.setattr(grafici_deck, "BLOCCO", 4)  # utenti nuovi a cavallo dei blocchi
+    a_blocchi = grafici_deck.aggrega(temporal, {"week": [1, 2]})
+
+    for nome, valori in intero.per_utente().items():
+        assert valori == pytest.approx(a_blocchi.per_utente()[nome], nan_ok=True)
+    cluster, settimane, medie = a_blocchi.cluster_settimane()
+    assert cluster == [0, 1, 2] and list(settimane) == [1, 2]
+    # cluster 0 = utenti 0 e 3, score 0.1 * u + 0.05 * settimana
+    assert medie[0, 0] == pytest.approx((0.05 + 0.35) / 2)
+    assert medie == pytest.approx(intero.cluster_settimane()[2])
+
+
+def test_renderizza_usa_gli_aggregati_di_leggi_temporal(temporal, monkeypatch):
+    genera_ppt = pytest.importorskip("genera_ppt")
+    aggregati = grafici_deck.Aggregati()
+    genera_ppt.leggi_temporal(temporal, {"cluster": [0, 1]}, aggregati)
+    # nessuna seconda passata sul CSV
+    monkeypatch.setattr(grafici_deck, "aggrega", lambda *a, **k: pytest.fail("passata in piu'"))
+
+    percorsi = grafici_deck.renderizza(temporal, {"cluster": [0, 1]}, workers=1, aggregati=aggregati)
+
+    assert aggregati.righe == 12
+    assert all(os.path.exists(p) for p in percorsi.values())
@@ -0,0 +1,129 @@
+import functools
+import gzip
+import http.client
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import start_server
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_uscita_con_client_appeso():
+    # un client apre la connessione e non manda niente: il worker resta bloccato a
+    # leggere la richiesta, ma l'interprete deve uscire lo stesso
+    codice = f"""
+import socket, sys, threading, time
+sys.path.insert(0, {RADICE!r})
+import start_server
+server = start_server.PooledTCPServer(("127.0.0.1", 0), start_server.MyHTTPRequestHandler, workers=2)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+client = socket.create_connection(server.server_address)
+time.sleep(0.3)
+server.shutdown()
+server.server_close()
+"""
+    subprocess.run([sys.executable, "-c", codice], check=True, timeout=15)
+
+
+def test_server_close_ferma_i_worker_liberi():
+    server = start_server.PooledTCPServer(("127.0.0.1", 0), start_server.MyHTTPRequestHandler, workers=3)
+    server.server_close()
+    for worker in server.workers:
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+
+
+# ─── Negoziazione: gzip, ETag, 304 ───────────────────────────────────────────
+
+JS = ("// " + "dashboard " * 300 + "\n").encode("utf-8")  # sopra MIN_BYTES_COMPRESSIONE
+
+
+class Silenzioso(start_server.MyHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "main.js").write_bytes(JS)
+    (tmp_path / "js" / "piccolo.js").write_bytes(b"// poco\n")
+    (tmp_path / "index.html").write_bytes(b"<!doctype html>" + b"<p>dashboard</p>" * 100)
+    handler = functools.partial(Silenzioso, directory=str(tmp_path))
+    srv = start_server.crea_server("thread", port=0, workers=2, handler=handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv.server_address[1]
+    srv.shutdown()
+    srv.server_close()
+
+
+def get(porta, percorso, **header):
+    conn = http.client.HTTPConnection("127.0.0.1", porta, timeout=5)
+    conn.request("GET", percorso, headers={k.replace("_", "-"): v for k, v in header.items()})
+    risposta = conn.getresponse()
+    corpo = risposta.read()
+    conn.close()
+    return risposta, corpo
+
+
+def test_gzip_se_il_client_lo_accetta(server):
+    risposta, corpo = get(server, "/js/main.js", Accept_Encoding="gzip, deflate")
+
+    assert risposta.status == 200
+    assert risposta.getheader("Content-Encoding") == "gzip"
+    assert risposta.getheader("Vary") == "Accept-Encoding"
+    assert int(risposta.getheader("Content-Length")) == len(corpo)
+    assert gzip.decompress(corpo) == JS
+
+
+def test_senza_accept_encoding_niente_compressione(server):
+    risposta, corpo = get(server, "/js/main.js")
+    assert risposta.getheader("Content-Encoding") is None
+    assert corpo == JS
+
+    risposta, _ = get(server, "/js/main.js", Accept_Encoding="gzip;q=0")
+    assert risposta.getheader("Content-Encoding") is None
+
+    risposta, _ = get(server, "/js/piccolo.js", Accept_Encoding="gzip")
+    assert risposta.getheader("Content-Encoding") is None  # sotto la soglia
+
+
+def test_etag_e_304(server):
+    risposta, _ = get(server, "/js/main.js", Accept_Encoding="gzip")
+    etag = risposta.getheader("ETag")
+    assert risposta.getheader("Cache-Control") == "public, max-age=60, must-revalidate"
+
+    risposta, corpo = get(server, "/js/main.js", Accept_Encoding="gzip", If_None_Match=etag)
+    assert risposta.status == 304 and corpo == b""
+    assert risposta.getheader("ETag") == etag
+
+    # la versione non compressa e' un'altra rappresentazione: il tag gzip non vale
+    risposta, corpo = get(server, "/js/main.js", If_None_Match=etag)
+    assert risposta.status == 200 and corpo == JS
+    assert risposta.getheader("ETag") != etag
+
+
+def test_if_modified_since(server):
+    risposta, _ = get(server, "/js/main.js")
+    ultima = risposta.getheader("Last-Modified")
+
+    risposta, _ = get(server, "/js/main.js", If_Modified_Since=ultima)
+    assert risposta.status == 304
+
+    risposta, _ = get(server, "/js/main.js", If_Modified_Since="Thu, 01 Jan 1970 00:00:00 GMT")
+    assert risposta.status == 200
+
+
+def test_indice_della_cartella_passa_da_compressione_ed_etag(server):
+    risposta, corpo = get(server, "/", Accept_Encoding="gzip")
+
+    assert risposta.status == 200
+    assert risposta.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(corpo).startswith(b"<!doctype html>")
+    risposta, _ = get(server, "/", Accept_Encoding="gzip", If_None_Match=risposta.getheader("ETag"))
+    assert risposta.status == 304